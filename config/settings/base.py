@@ -59,7 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "mood_diary.core.middleware.NoCacheMiddleware",
+    "mood_diary.core.middleware.CachePolicyMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -85,6 +85,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.request",
+                "notifications.context_processors.unread_notifications",
             ],
         },
     },
@@ -190,6 +191,10 @@ CELERY_TIMEZONE = "Europe/Berlin"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+# Rules
+# Seconds to wait for further edits of a client before evaluating event-based rules
+EVENT_BASED_RULES_EVALUATION_COUNTDOWN = 10
+
 # Email
 FROM_EMAIL = os.getenv("FROM_EMAIL")  # Must be a verified sender at sendgrid
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
@@ -203,6 +208,7 @@ EMAIL_USE_TLS = True
 VAPID_PUBLIC_KEY = os.getenv("VAPID_PUBLIC_KEY")
 VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY")
 WEB_PUSH_TTL = 60 * 60 * 24 * 2  # Two days
+WEB_PUSH_TIMEOUT = 10  # Seconds to wait for a push service before retrying later
 
 # PWA
 PWA_SERVICE_WORKER_PATH = os.path.join(BASE_DIR, "static/js/serviceworker.js")
@@ -2,6 +2,8 @@
 Django settings for a test environment.
 """
 
+import os
+
 from .base import *  # noqa: F401 F403
 
 SECRET_KEY = SECRET_KEY or "simpletestsecret"  # noqa: F405
@@ -16,3 +18,9 @@ ALLOWED_HOSTS = [
 ]
 
 FROM_EMAIL = "test@test.de"
+
+# Parallel test workers share the cache, but each of them has got its own database
+CACHES["default"]["KEY_PREFIX"] = os.getenv("PYTEST_XDIST_WORKER", "")  # noqa: F405
+
+# Key used to sign push notifications in tests, they are never actually delivered
+VAPID_PRIVATE_KEY = VAPID_PRIVATE_KEY or "54p7XIjnap0ZPk1HdGlW2N2vWg0o1bmvAqM4Klqjv6A"  # noqa: F405
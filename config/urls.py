@@ -15,13 +15,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import pwa.views
 import users.views
 from django.contrib import admin
 from django.urls import include, path
+from django.views.decorators.cache import cache_control
 
 urlpatterns = [
     path("", users.views.index, name="index"),
     path("admin/", admin.site.urls),
+    # The manifest hardly ever changes and is the same for all users
+    path(
+        "manifest.json",
+        cache_control(public=True, max_age=24 * 60 * 60)(pwa.views.manifest),
+        name="manifest",
+    ),
     path("", include("pwa.urls")),
     path("clients/", include("clients.urls", namespace="clients")),
     path("dashboards/", include("dashboards.urls", namespace="dashboards")),
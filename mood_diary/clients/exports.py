@@ -0,0 +1,141 @@
+import csv
+import json
+from typing import Iterable, Iterator
+
+from diaries.models import MoodDiaryEntry
+from diaries.reference import reference_data
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.utils import translation
+
+# Number of rows fetched from the server-side cursor at a time
+ENTRY_EXPORT_CHUNK_SIZE = 2000
+
+ENTRY_EXPORT_FIELDS = [
+    "client",
+    "date",
+    "start_time",
+    "end_time",
+    "mood",
+    "mood_label",
+    "activity",
+    "activity_category",
+    "details",
+    "created_at",
+    "updated_at",
+]
+
+
+class Echo:
+    """
+    Pseudo-buffer handing every line written by a csv.writer back instead of storing it,
+    so that CSV can be streamed row by row.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_entry_rows(entries: QuerySet[MoodDiaryEntry], language: str) -> Iterator[dict]:
+    """
+    Iterate over the rows of the export of the given mood diary entries.
+    Entries are fetched from a server-side cursor in chunks of `ENTRY_EXPORT_CHUNK_SIZE`,
+    with only the exported columns and without instantiating models, so that
+    exports of any size are held in memory one chunk at a time.
+    Moods and activities are taken from the reference data, in the given language.
+    The details are exported as they are stored, i.e. encrypted with the client's key.
+
+    Parameters
+    ----------
+    entries: QuerySet[MoodDiaryEntry]
+    language: str
+        Language to name moods and activities in. The rows are produced while the
+        response is streamed, after the request's language may have been reset.
+
+    Returns
+    -------
+    Iterator[dict]
+    """
+    rows = entries.values_list(
+        "mood_diary__client__identifier",
+        "date",
+        "start_time",
+        "end_time",
+        "mood_id",
+        "activity_id",
+        "details",
+        "created_at",
+        "updated_at",
+    ).iterator(chunk_size=ENTRY_EXPORT_CHUNK_SIZE)
+    for (
+        client,
+        day,
+        start_time,
+        end_time,
+        mood_id,
+        activity_id,
+        details,
+        created_at,
+        updated_at,
+    ) in rows:
+        mood = reference_data.get_mood(mood_id)
+        activity = reference_data.get_activity(activity_id)
+        with translation.override(language):
+            row = {
+                "client": client,
+                "date": day,
+                "start_time": start_time,
+                "end_time": end_time,
+                "mood": mood.value,
+                "mood_label": str(mood.label),
+                "activity": str(activity),
+                "activity_category": str(activity.category),
+                "details": details,
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+        yield row
+
+
+def stream_csv(rows: Iterable[dict]) -> Iterator[str]:
+    """
+    Stream the given rows as CSV, starting with a header line.
+
+    Parameters
+    ----------
+    rows: Iterable[dict]
+
+    Returns
+    -------
+    Iterator[str]
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=ENTRY_EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_json(rows: Iterable[dict]) -> Iterator[str]:
+    """
+    Stream the given rows as a JSON array of objects.
+
+    Parameters
+    ----------
+    rows: Iterable[dict]
+
+    Returns
+    -------
+    Iterator[str]
+    """
+    yield "["
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]"
+
+
+ENTRY_EXPORT_FORMATS = {
+    "csv": ("text/csv", stream_csv),
+    "json": ("application/json", stream_json),
+}
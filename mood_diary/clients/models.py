@@ -13,6 +13,13 @@ class Client(TrackCreationAndUpdates):
 
     class Meta:
         db_table = "clients_clients"
+        indexes = [
+            # Active clients of a counselor, in the ordering of the client list
+            models.Index(
+                fields=["counselor", "active", "-created_at", "-id"],
+                name="clients_counselor_list_idx",
+            ),
+        ]
 
     user = models.OneToOneField(
         to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="client"
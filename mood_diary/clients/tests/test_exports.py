@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from datetime import date, time
+
+import pytest
+from clients import exports
+from clients.exports import ENTRY_EXPORT_FIELDS, iter_entry_rows, stream_csv, stream_json
+from clients.tests.factories import ClientFactory
+from diaries.models import MoodDiaryEntry
+from diaries.tests.factories import MoodDiaryEntryFactory
+from django.utils import translation
+
+
+@pytest.fixture
+def entries():
+    client = ClientFactory.create(identifier="client-1")
+    return [
+        MoodDiaryEntryFactory.create(
+            mood_diary__client=client,
+            released=True,
+            date=date(2024, 3, day),
+            start_time=time(9, 0),
+            end_time=time(10, 30),
+            details='encrypted,\n"details"',
+        )
+        for day in range(1, 6)
+    ]
+
+
+@pytest.mark.django_db
+def test_iter_entry_rows(entries, mocker):
+    iterator = mocker.spy(exports.QuerySet, "iterator")
+    entry = entries[0]
+
+    rows = list(iter_entry_rows(MoodDiaryEntry.objects.order_by("date"), "en"))
+
+    iterator.assert_called_once_with(mocker.ANY, chunk_size=exports.ENTRY_EXPORT_CHUNK_SIZE)
+    assert len(rows) == 5
+    with translation.override("en"):
+        assert rows[0] == {
+            "client": "client-1",
+            "date": date(2024, 3, 1),
+            "start_time": time(9, 0),
+            "end_time": time(10, 30),
+            "mood": entry.mood.value,
+            "mood_label": str(entry.mood.label),
+            "activity": str(entry.activity),
+            "activity_category": str(entry.activity.category),
+            "details": 'encrypted,\n"details"',
+            "created_at": entry.created_at,
+            "updated_at": entry.updated_at,
+        }
+
+
+@pytest.mark.django_db
+def test_iter_entry_rows_queries(entries, django_assert_num_queries):
+    list(iter_entry_rows(MoodDiaryEntry.objects.all(), "en"))
+
+    # Moods and activities come from the reference data, not once per row
+    with django_assert_num_queries(1):
+        list(iter_entry_rows(MoodDiaryEntry.objects.all(), "en"))
+
+
+@pytest.mark.django_db
+def test_stream_csv(entries):
+    rows = iter_entry_rows(MoodDiaryEntry.objects.order_by("date"), "en")
+
+    content = "".join(stream_csv(rows))
+
+    exported = list(csv.DictReader(io.StringIO(content)))
+    assert list(exported[0].keys()) == ENTRY_EXPORT_FIELDS
+    assert [row["date"] for row in exported] == [f"2024-03-0{day}" for day in range(1, 6)]
+    # Encrypted details are passed through unchanged, even with separators or newlines
+    assert exported[0]["details"] == 'encrypted,\n"details"'
+    assert exported[0]["start_time"] == "09:00:00"
+
+
+def test_stream_csv_is_lazy():
+    def rows():
+        yield dict.fromkeys(ENTRY_EXPORT_FIELDS, "value")
+        raise AssertionError("Rows must be consumed one at a time")
+
+    chunks = stream_csv(rows())
+
+    assert next(chunks) == ",".join(ENTRY_EXPORT_FIELDS) + "\r\n"
+    assert next(chunks) == ",".join(["value"] * len(ENTRY_EXPORT_FIELDS)) + "\r\n"
+
+
+@pytest.mark.django_db
+def test_stream_json(entries):
+    rows = iter_entry_rows(MoodDiaryEntry.objects.order_by("date"), "en")
+
+    exported = json.loads("".join(stream_json(rows)))
+
+    assert len(exported) == 5
+    assert exported[0]["date"] == "2024-03-01"
+    assert exported[0]["end_time"] == "10:30:00"
+    assert exported[0]["details"] == 'encrypted,\n"details"'
+    assert json.loads("".join(stream_json([]))) == []
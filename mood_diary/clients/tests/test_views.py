@@ -1,11 +1,14 @@
 import http
+import json
 
 import pytest
 from clients.forms import ClientCreationForm
 from clients.models import Client
 from clients.tests.factories import ClientFactory
+from clients.views import MoodDiaryEntryListCounselorView
 from core.utils import hash_email
 from diaries.models import MoodDiary, MoodDiaryEntry
+from diaries.reference import reference_data
 from diaries.tests.factories import MoodDiaryEntryFactory
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -208,7 +211,7 @@ def test_mood_diary_entry_list_counselor_view(counselor_with_client, create_resp
 
     assert response.status_code == http.HTTPStatus.OK
     assert entry in (response_entries := response.context_data["entries"])
-    assert response_entries.count() == 1
+    assert len(response_entries) == 1
     assert "clients/mood_diary_entries_list.html" in response.template_name
 
 
@@ -224,10 +227,27 @@ def test_client_list_view(create_user, create_response):
 
     assert response.status_code == http.HTTPStatus.OK
     assert client in (response_clients := response.context_data["clients"])
-    assert response_clients.count() == 1
+    assert len(response_clients) == 1
     assert "clients/clients_list.html" in response.template_name
 
 
+@pytest.mark.django_db
+def test_client_list_view_conditional(create_user, client):
+    counselor = create_user(User.Role.COUNSELOR)
+    ClientFactory.create(counselor=counselor, active=True)
+    url = reverse("clients:list_clients")
+    client.force_login(counselor)
+    # The first response sets the CSRF cookie the pages depend on
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == http.HTTPStatus.NOT_MODIFIED
+
+    ClientFactory.create(counselor=counselor, active=True)
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == http.HTTPStatus.OK
+
+
 @pytest.mark.django_db
 def test_client_update_to_inactive_view(create_user, create_response):
     counselor = create_user(User.Role.COUNSELOR)
@@ -250,3 +270,103 @@ def test_client_update_to_inactive_view(create_user, create_response):
 
     assert response.status_code == http.HTTPStatus.FOUND
     assert Client.objects.filter(active=True).count() == 1
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_list_counselor_view_queries(
+    counselor_with_client, create_response, monkeypatch, assert_constant_queries
+):
+    counselor, client = counselor_with_client
+    MoodDiaryEntryFactory.create_batch(5, mood_diary__client=client, released=True)
+    url = reverse("clients:list_mood_diary_entries_client", kwargs={"client_pk": client.id})
+
+    def list_entries(page_size):
+        monkeypatch.setattr(MoodDiaryEntryListCounselorView, "page_size", page_size)
+        assert len(create_response(counselor, url).context_data["entries"]) == page_size
+
+    assert_constant_queries(list_entries)
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_detail_client_view_queries(
+    counselor_with_client, client, django_assert_max_num_queries
+):
+    counselor, mood_diary_client = counselor_with_client
+    entry = MoodDiaryEntryFactory.create(mood_diary__client=mood_diary_client, released=True)
+    url = reverse(
+        "clients:get_mood_diary_entry_client",
+        kwargs={"client_pk": mood_diary_client.pk, "entry_pk": entry.pk},
+    )
+    client.force_login(counselor)
+    # The mood scale is served from the process-local reference data
+    reference_data.load()
+
+    # Session, user, the state of the entry (see ConditionalGetMixin) and the entry with its
+    # mood, activity and client
+    with django_assert_max_num_queries(4):
+        response = client.get(url)
+    assert response.status_code == http.HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_export_view(counselor_with_client, create_response):
+    counselor, client = counselor_with_client
+    other_client = ClientFactory.create(counselor=counselor, active=True)
+    entry = MoodDiaryEntryFactory.create(mood_diary__client=client, released=True)
+    MoodDiaryEntryFactory.create(mood_diary__client=client, released=False)
+    MoodDiaryEntryFactory.create(mood_diary__client=other_client, released=True)
+    MoodDiaryEntryFactory.create(released=True)
+    url = reverse("clients:export_mood_diary_entries_client", kwargs={"client_pk": client.id})
+
+    response = create_response(counselor, url)
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+    assert response["Content-Disposition"] == (
+        f'attachment; filename="mood_diary_entries_{client.id}.csv"'
+    )
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 2
+    assert entry.details in lines[1]
+
+    response = create_response(counselor, url, data={"format": "json"})
+
+    assert response["Content-Type"] == "application/json"
+    exported = json.loads(b"".join(response.streaming_content))
+    assert [row["details"] for row in exported] == [entry.details]
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_export_view_caseload(create_user, create_response):
+    counselor = create_user(User.Role.COUNSELOR)
+    clients = ClientFactory.create_batch(2, counselor=counselor, active=True)
+    inactive_client = ClientFactory.create(counselor=counselor, active=False)
+    for client in [*clients, inactive_client]:
+        MoodDiaryEntryFactory.create(mood_diary__client=client, released=True)
+    MoodDiaryEntryFactory.create(released=True)
+    url = reverse("clients:export_mood_diary_entries")
+
+    response = create_response(counselor, url, data={"format": "json"})
+
+    assert response.status_code == http.HTTPStatus.OK
+    exported = json.loads(b"".join(response.streaming_content))
+    assert sorted(row["client"] for row in exported) == sorted(
+        client.identifier for client in clients
+    )
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_export_view_restricted(counselor_with_client, create_response):
+    counselor, client = counselor_with_client
+    other_client = ClientFactory.create()
+
+    url = reverse("clients:export_mood_diary_entries_client", kwargs={"client_pk": other_client.id})
+    assert create_response(counselor, url).status_code == http.HTTPStatus.NOT_FOUND
+
+    url = reverse("clients:export_mood_diary_entries_client", kwargs={"client_pk": client.id})
+    response = create_response(counselor, url, data={"format": "xml"})
+    assert response.status_code == http.HTTPStatus.NOT_FOUND
+
+    response = create_response(client.user, url)
+    assert response.status_code == http.HTTPStatus.FORBIDDEN
@@ -10,6 +10,11 @@ app_name = "clients"
 urlpatterns = [
     path("create/", views.CreateClientView.as_view(), name="create_client"),
     path("get_all/", views.ClientListView.as_view(), name="list_clients"),
+    path(
+        "mood_diary_entries/export/",
+        views.MoodDiaryEntryExportView.as_view(),
+        name="export_mood_diary_entries",
+    ),
     path(
         "<int:pk>/update_to_inactive/",
         views.ClientUpdateToInactiveView.as_view(),
@@ -25,4 +30,9 @@ urlpatterns = [
         views.MoodDiaryEntryListCounselorView.as_view(),
         name="list_mood_diary_entries_client",
     ),
+    path(
+        "<int:client_pk>/mood_diary_entries/export/",
+        views.MoodDiaryEntryExportView.as_view(),
+        name="export_mood_diary_entries_client",
+    ),
 ]
@@ -1,21 +1,24 @@
+from clients.exports import ENTRY_EXPORT_FORMATS, iter_entry_rows
 from clients.forms import ClientCreationForm
 from clients.models import Client
 from clients.utils import send_account_creation_email
+from core.pagination import KeysetAjaxListView
 from core.utils import hash_email
-from core.views import AuthenticatedCounselorRoleMixin
-from diaries.models import Mood, MoodDiary, MoodDiaryEntry
+from core.views import AuthenticatedCounselorRoleMixin, ConditionalGetMixin
+from diaries.models import MoodDiary, MoodDiaryEntry
+from diaries.reference import reference_data
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.utils.crypto import get_random_string
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic import DetailView
-from el_pagination.views import AjaxListView
 from rules.models import Rule
 
 User = get_user_model()
@@ -116,7 +119,7 @@ class CreateClientView(AuthenticatedCounselorRoleMixin, View):
         return render(request, self.template_name, {"form": form})
 
 
-class ClientListView(AuthenticatedCounselorRoleMixin, AjaxListView):
+class ClientListView(AuthenticatedCounselorRoleMixin, ConditionalGetMixin, KeysetAjaxListView):
     """
     View for listing all active clients of the counselor.
     """
@@ -125,6 +128,7 @@ class ClientListView(AuthenticatedCounselorRoleMixin, AjaxListView):
     template_name = "clients/clients_list.html"
     page_template = "clients/clients_list_page.html"
     context_object_name = "clients"
+    ordering = ("-created_at", "-id")
 
     def get_queryset(self) -> QuerySet[Client]:
         """
@@ -133,10 +137,13 @@ class ClientListView(AuthenticatedCounselorRoleMixin, AjaxListView):
         Returns
         -------
         Queryset
-            All active clients of the counselor, ordered by creation date.
+            All active clients of the counselor.
         """
         counselor_id = self.request.user.id
-        return Client.objects.filter(counselor_id=counselor_id, active=True).order_by("-created_at")
+        return Client.objects.filter(counselor_id=counselor_id, active=True)
+
+    def get_conditional_queryset(self) -> QuerySet[Client]:
+        return self.get_queryset()
 
 
 class ClientUpdateToInactiveView(AuthenticatedCounselorRoleMixin, View):
@@ -168,7 +175,9 @@ class ClientUpdateToInactiveView(AuthenticatedCounselorRoleMixin, View):
         return redirect(reverse_lazy("clients:list_clients"))
 
 
-class MoodDiaryEntryListCounselorView(AuthenticatedCounselorRoleMixin, AjaxListView):
+class MoodDiaryEntryListCounselorView(
+    AuthenticatedCounselorRoleMixin, ConditionalGetMixin, KeysetAjaxListView
+):
     """
     View for listing all released mood diary entries of a client.
     """
@@ -177,7 +186,9 @@ class MoodDiaryEntryListCounselorView(AuthenticatedCounselorRoleMixin, AjaxListV
     template_name = "clients/mood_diary_entries_list.html"
     page_template = "clients/mood_diary_entries_list_page.html"
     context_object_name = "entries"
+    ordering = ("-date", "-start_time", "-id")
     pk_url_kwarg = "client_pk"
+    conditional_dependencies = (reference_data.get_version,)
 
     def get_queryset(self) -> QuerySet[MoodDiaryEntry]:
         """
@@ -195,10 +206,19 @@ class MoodDiaryEntryListCounselorView(AuthenticatedCounselorRoleMixin, AjaxListV
             client_id=client_id,
             client__counselor_id=self.request.user.id,
         )
-        return mood_diary.entries.filter(released=True)
+        return mood_diary.entries.filter(released=True).select_related(
+            "mood", "activity", "mood_diary"
+        )
 
+    def get_conditional_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        return MoodDiaryEntry.objects.filter(
+            released=True,
+            mood_diary__client_id=self.kwargs.get(self.pk_url_kwarg),
+            mood_diary__client__counselor_id=self.request.user.id,
+        )
 
-class MoodDiaryEntryDetailView(AuthenticatedCounselorRoleMixin, DetailView):
+
+class MoodDiaryEntryDetailView(AuthenticatedCounselorRoleMixin, ConditionalGetMixin, DetailView):
     """
     View for displaying a mood diary entry of a client in detail.
     """
@@ -208,6 +228,7 @@ class MoodDiaryEntryDetailView(AuthenticatedCounselorRoleMixin, DetailView):
     context_object_name = "entry"
     pk_client_kwarg = "client_pk"
     pk_url_kwarg = "entry_pk"
+    conditional_dependencies = (reference_data.get_version,)
 
     def get_queryset(self) -> QuerySet[MoodDiaryEntry]:
         """
@@ -224,7 +245,10 @@ class MoodDiaryEntryDetailView(AuthenticatedCounselorRoleMixin, DetailView):
             released=True,
             mood_diary__client_id=client_id,
             mood_diary__client__counselor_id=self.request.user.id,
-        )
+        ).select_related("mood", "activity", "mood_diary__client")
+
+    def get_conditional_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        return self.get_queryset().filter(pk=self.kwargs.get(self.pk_url_kwarg))
 
     def get_context_data(self, **kwargs) -> dict:
         """
@@ -241,8 +265,80 @@ class MoodDiaryEntryDetailView(AuthenticatedCounselorRoleMixin, DetailView):
             Response context
         """
         context = super().get_context_data(**kwargs)
-        context["moods"] = Mood.objects.all()
-        context["label_left"] = Mood.objects.first().label
-        context["label_right"] = Mood.objects.last().label
+        context["moods"] = moods = reference_data.moods()
+        context["label_left"] = moods[0].label
+        context["label_right"] = moods[-1].label
         context["encrypted_client_key"] = self.object.mood_diary.client.client_key_encrypted
         return context
+
+
+class MoodDiaryEntryExportView(AuthenticatedCounselorRoleMixin, View):
+    """
+    View for exporting the released mood diary entries of a client or, if no client is
+    given, of all active clients of the counselor, as CSV or JSON.
+    """
+
+    pk_url_kwarg = "client_pk"
+    format_kwarg = "format"
+
+    def get_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        """
+        Restrict the exported MoodDiaryEntry entities to the released ones of the requested
+        client or of all active clients of the counselor requesting the view.
+
+        Returns
+        -------
+        QuerySet
+            Released MoodDiaryEntry entities, ordered by client and time.
+
+        Raises
+        ------
+        Http404
+            If the client does not exist or is not a client of the counselor.
+        """
+        counselor_id = self.request.user.id
+        client_id = self.kwargs.get(self.pk_url_kwarg)
+        entries = MoodDiaryEntry.objects.filter(
+            released=True, mood_diary__client__counselor_id=counselor_id
+        )
+        if client_id is None:
+            entries = entries.filter(mood_diary__client__active=True)
+        elif Client.objects.filter(id=client_id, counselor_id=counselor_id).exists():
+            entries = entries.filter(mood_diary__client_id=client_id)
+        else:
+            raise Http404("Client not found.")
+        return entries.order_by("mood_diary_id", "date", "start_time", "id")
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> StreamingHttpResponse:
+        """
+        Stream the export in the format passed as query parameter ("csv" by default).
+        The entries are read from a server-side cursor chunk by chunk while they
+        are sent, so that exports of any size neither pile up in memory nor wait for
+        the whole export to be generated before the first bytes are sent.
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        StreamingHttpResponse
+
+        Raises
+        ------
+        Http404
+            If the format is not supported.
+        """
+        export_format = request.GET.get(self.format_kwarg, "csv")
+        if export_format not in ENTRY_EXPORT_FORMATS:
+            raise Http404(f"Unsupported export format: {export_format}")
+        content_type, stream = ENTRY_EXPORT_FORMATS[export_format]
+        rows = iter_entry_rows(self.get_queryset(), get_language())
+        filename = "mood_diary_entries"
+        if (client_id := self.kwargs.get(self.pk_url_kwarg)) is not None:
+            filename += f"_{client_id}"
+        return StreamingHttpResponse(
+            stream(rows),
+            content_type=content_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+        )
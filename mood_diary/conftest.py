@@ -5,7 +5,11 @@ to avoid code duplication.
 
 import pytest
 from clients.tests.factories import ClientFactory
+from diaries.reference import reference_data
 from diaries.tests.factories import MoodDiaryEntryFactory
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rules.registry import rule_registry
 
 
 @pytest.fixture
@@ -21,6 +25,28 @@ def create_response(client):
     return _create_response
 
 
+@pytest.fixture
+def assert_constant_queries():
+    """
+    Assert that a function runs the same number of queries no matter the page size it
+    is called with, e.g. that a list view does not query related objects row by row.
+    The function is called once before counting, so that caches are warmed up.
+    """
+
+    def _assert_constant_queries(func, page_sizes=(1, 5)):
+        func(page_sizes[0])
+        query_counts = []
+        for page_size in page_sizes:
+            with CaptureQueriesContext(connection) as queries:
+                func(page_size)
+            query_counts.append(len(queries))
+        assert (
+            len(set(query_counts)) == 1
+        ), f"Number of queries {query_counts} grows with page sizes {page_sizes}"
+
+    return _assert_constant_queries
+
+
 @pytest.fixture
 def user():
     client = ClientFactory.create(push_notifications_granted=None)
@@ -30,3 +56,15 @@ def user():
 @pytest.fixture
 def entry(user):
     return MoodDiaryEntryFactory.create(mood_diary__client=user.client, released=False)
+
+
+@pytest.fixture(autouse=True)
+def clear_rule_registry():
+    # Rules are rolled back after each test, so they must not be kept in memory
+    rule_registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_data():
+    # Moods and activities are rolled back after each test, so they must not be kept in memory
+    reference_data.clear()
@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import models
+from django.http import HttpRequest
+
+
+class VersionedProcessCache:
+    """
+    Base class of process-local caches of tables that hardly ever change, e.g. the
+    reference data of mood diaries or the rules.
+    The tables are loaded from the database once per process and then served from memory.
+    Whenever they are edited, the version stored in the cache is renewed (see
+    `invalidate`). Each process compares its version with the one in the cache at most
+    every `check_interval` seconds and reloads the tables if it is outdated.
+    Looking up an unknown key reloads the tables at most once per `check_interval` as
+    well, as the item might have been created by another process after the tables were
+    loaded, so that lookups of keys that do not exist do not cost any queries.
+    Subclasses define the `version_cache_key` and implement `fetch`.
+    """
+
+    version_cache_key: str
+    check_interval = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._version = None
+        self._checked_at = None
+        self._loaded_at = None
+
+    def fetch(self) -> dict[str, Any]:
+        """
+        Fetch the tables from the database.
+
+        Returns
+        -------
+        dict[str, Any]
+            The collections of items held in memory, by name.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Drop all items held in memory, so that they are reloaded on next access.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._data = {}
+            self._version = None
+            self._checked_at = None
+            self._loaded_at = None
+
+    def invalidate(self):
+        """
+        Renew the version in the cache, so that all processes reload their items,
+        and clear the items held by this process.
+
+        Returns
+        -------
+        None
+        """
+        cache.set(self.version_cache_key, uuid.uuid4().hex, timeout=None)
+        self.clear()
+
+    def get_version(self, request: HttpRequest = None) -> Optional[str]:
+        """
+        Get the current version of the items, e.g. as a dependency of pages showing them
+        (see core.views.ConditionalGetMixin).
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        Optional[str]
+        """
+        return cache.get(self.version_cache_key)
+
+    def load(self) -> dict[str, Any]:
+        """
+        (Re-)load the items from the database.
+
+        Returns
+        -------
+        dict[str, Any]
+            The loaded collections of items, by name.
+        """
+        version = cache.get(self.version_cache_key)
+        data = self.fetch()
+        with self._lock:
+            self._data = data
+            self._version = version
+            self._checked_at = self._loaded_at = time.monotonic()
+        return data
+
+    def _is_outdated(self) -> bool:
+        if self._checked_at is None:
+            return True
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return False
+        if cache.get(self.version_cache_key) != self._version:
+            return True
+        self._checked_at = time.monotonic()
+        return False
+
+    def _collection(self, name: str):
+        # Read once, as the items might be cleared by another thread meanwhile
+        data = self._data
+        if not data or self._is_outdated():
+            data = self.load()
+        return data[name]
+
+    def _get(self, name: str, key, model: type[models.Model]):
+        item = self._collection(name).get(key)
+        loaded_at = self._loaded_at
+        if item is None and (
+            loaded_at is None or time.monotonic() - loaded_at >= self.check_interval
+        ):
+            item = self.load()[name].get(key)
+        if item is None:
+            raise model.DoesNotExist(f"{model.__name__} matching {key} does not exist.")
+        return item
@@ -2,9 +2,13 @@ from django.http import HttpResponse
 from django.utils.cache import add_never_cache_headers
 
 
-class NoCacheMiddleware:
+class CachePolicyMiddleware:
     """
-    Middleware to add no-cache headers to all responses.
+    Middleware to add no-cache headers to all responses that do not declare a cache policy
+    of their own, e.g. static files with long cache lifetimes (see WhiteNoise), the PWA
+    manifest (see config.urls) or pages answered conditionally
+    (see core.views.ConditionalGetMixin).
+    The service worker is not cached, so that browsers pick up its changes right away.
     """
 
     def __init__(self, get_response):
@@ -12,5 +16,6 @@ class NoCacheMiddleware:
 
     def __call__(self, request) -> HttpResponse:
         response = self.get_response(request)
-        add_never_cache_headers(response)
+        if not response.has_header("Cache-Control"):
+            add_never_cache_headers(response)
         return response
@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+from datetime import date, time
+from typing import Any, Optional
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+from django.views.generic import ListView
+
+
+def get_ordering_value(obj: Model, field: str) -> Any:
+    """
+    Get the value an object is ordered by for a field of an ordering, which may span
+    relations (e.g. "-rule__title").
+
+    Parameters
+    ----------
+    obj: Model
+    field: str
+
+    Returns
+    -------
+    Any
+    """
+    value = obj
+    for attribute in field.lstrip("-").split("__"):
+        value = getattr(value, attribute)
+    return value
+
+
+def get_ordering_field(model: type[Model], field: str):
+    """
+    Get the model field an ordering field refers to, following relations.
+
+    Parameters
+    ----------
+    model: type[Model]
+    field: str
+
+    Returns
+    -------
+    Field
+
+    Raises
+    ------
+    FieldDoesNotExist
+    """
+    *relations, name = field.lstrip("-").split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Encode the ordering values of the last object of a page as an opaque cursor.
+    Dates and times are encoded in full precision (unlike by DjangoJSONEncoder, which
+    truncates microseconds), as the cursor must match the last object exactly.
+
+    Parameters
+    ----------
+    values: list
+
+    Returns
+    -------
+    str
+    """
+    values = [value.isoformat() if isinstance(value, (date, time)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, model: type[Model], ordering: tuple[str, ...]) -> list:
+    """
+    Decode a cursor into the ordering values it was created from.
+
+    Parameters
+    ----------
+    cursor: str
+    model: type[Model]
+    ordering: tuple[str, ...]
+
+    Returns
+    -------
+    list
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed or does not fit the ordering.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError(f"Cursor does not fit the ordering {ordering}: {cursor}")
+    try:
+        return [
+            get_ordering_field(model, field).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (FieldDoesNotExist, ValidationError) as e:
+        raise ValueError(f"Cursor does not fit the ordering {ordering}: {cursor}") from e
+
+
+def filter_after(queryset: QuerySet, ordering: tuple[str, ...], values: list) -> QuerySet:
+    """
+    Restrict the queryset to the objects following the object with the given ordering values,
+    e.g. for the ordering ("-date", "-start_time", "-id") to those with
+    `date < d OR (date = d AND start_time < t) OR (date = d AND start_time = t AND id < i)`.
+    This condition can be answered from an index matching the ordering, so that
+    it costs the same no matter how far the objects are into the ordering.
+
+    Parameters
+    ----------
+    queryset: QuerySet
+    ordering: tuple[str, ...]
+        Ordering of the queryset, the last field of which must be unique (e.g. the id).
+    values: list
+
+    Returns
+    -------
+    QuerySet
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        preceding = {
+            preceding_field.lstrip("-"): value
+            for preceding_field, value in zip(ordering[:index], values[:index])
+        }
+        condition |= Q(**preceding, **{f"{name}__{lookup}": values[index]})
+    return queryset.filter(condition)
+
+
+class KeysetAjaxListView(ListView):
+    """
+    List view paging through its objects with a cursor instead of an offset, to be
+    scrolled through endlessly.
+    A page consists of the `page_size` objects following the object the cursor points to
+    in the view's `ordering`, so that no objects need to be counted or skipped and
+    every page costs the same, however deep into the list it is.
+    Like el_pagination's AjaxListView, it renders the `page_template` only for AJAX
+    requests and provides a link to the next page that el_pagination's script follows
+    (see core/show_more.html).
+    """
+
+    # The last field must be unique, so that the ordering is total
+    ordering: tuple[str, ...] = ("-id",)
+    page_size = 10
+    page_template: str = None
+    cursor_kwarg = "cursor"
+
+    def get_template_names(self) -> list[str]:
+        if self.request.headers.get("x-requested-with") == "XMLHttpRequest":
+            return [self.page_template]
+        return super().get_template_names()
+
+    def get_cursor(self) -> Optional[list]:
+        """
+        Decode the cursor passed with the request, if any.
+
+        Returns
+        -------
+        Optional[list]
+
+        Raises
+        ------
+        Http404
+            If the cursor is invalid.
+        """
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor, self.model, self.ordering)
+        except ValueError:
+            raise Http404("Invalid cursor.")
+
+    def get_next_page_url(self, cursor: str) -> str:
+        query = self.request.GET.copy()
+        query.pop("querystring_key", None)
+        query[self.cursor_kwarg] = cursor
+        return f"{self.request.path}?{query.urlencode()}"
+
+    def get_context_data(self, **kwargs) -> dict:
+        """
+        Restrict the objects to the requested page and add the page template as well
+        as the link to the next page, if there is one, to the context.
+
+        Parameters
+        ----------
+        kwargs: dict
+            Keyword arguments for the parent method.
+
+        Returns
+        -------
+        dict
+            Response context
+        """
+        queryset = kwargs.pop("object_list", self.object_list).order_by(*self.ordering)
+        if (cursor := self.get_cursor()) is not None:
+            queryset = filter_after(queryset, self.ordering, cursor)
+        # Fetch one more object to know if there is a next page
+        objects = list(queryset[: self.page_size + 1])
+        page = objects[: self.page_size]
+        next_page_url = None
+        if len(objects) > self.page_size:
+            next_page_url = self.get_next_page_url(
+                encode_cursor([get_ordering_value(page[-1], field) for field in self.ordering])
+            )
+        context = super().get_context_data(object_list=page, **kwargs)
+        context["page_template"] = self.page_template
+        context["next_page_url"] = next_page_url
+        return context
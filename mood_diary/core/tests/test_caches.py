@@ -0,0 +1,43 @@
+import pytest
+from core.caches import VersionedProcessCache
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+
+class GroupCache(VersionedProcessCache):
+    version_cache_key = "core:tests:groups:version"
+
+    def __init__(self):
+        super().__init__()
+        self.fetch_count = 0
+
+    def fetch(self) -> dict:
+        self.fetch_count += 1
+        return {"groups_by_name": {"counselors": "counselors"}}
+
+    def get(self, name: str) -> str:
+        return self._get("groups_by_name", name, Group)
+
+
+def test_versioned_process_cache(mocker):
+    mocked_monotonic = mocker.patch("core.caches.time.monotonic", return_value=100)
+    groups = GroupCache()
+    assert groups.get("counselors") == "counselors"
+
+    # Misses reload the items at most once per check interval
+    for _ in range(3):
+        with pytest.raises(Group.DoesNotExist):
+            groups.get("clients")
+    assert groups.fetch_count == 1
+    mocked_monotonic.return_value = 100 + GroupCache.check_interval
+    with pytest.raises(Group.DoesNotExist):
+        groups.get("clients")
+    assert groups.fetch_count == 2
+
+    # Invalidation renews the version and reloads the items on next access
+    version = groups.get_version()
+    groups.invalidate()
+    assert groups.get_version() != version
+    assert groups.get("counselors") == "counselors"
+    assert groups.fetch_count == 3
+    cache.delete(GroupCache.version_cache_key)
@@ -1,12 +1,13 @@
 import pytest
-from core.middleware import NoCacheMiddleware
+from core.middleware import CachePolicyMiddleware
 from django.http import HttpResponse
 from django.test import RequestFactory
+from django.utils.cache import patch_cache_control
 
 
 @pytest.fixture
 def middleware():
-    return NoCacheMiddleware(lambda request: HttpResponse())
+    return CachePolicyMiddleware(lambda request: HttpResponse())
 
 
 def test_no_cache_headers_added(middleware, request):
@@ -19,3 +20,17 @@ def test_no_cache_headers_added(middleware, request):
     assert "no-store" in response["Cache-Control"]
     assert "must-revalidate" in response["Cache-Control"]
     assert "max-age=0" in response["Cache-Control"]
+
+
+def test_own_cache_policy_kept():
+    def get_response(request):
+        response = HttpResponse()
+        patch_cache_control(response, public=True, max_age=3600)
+        return response
+
+    middleware = CachePolicyMiddleware(get_response)
+
+    response = middleware(RequestFactory().get("/some-path/"))
+
+    assert response["Cache-Control"] == "public, max-age=3600"
+    assert not response.has_header("Expires")
@@ -0,0 +1,64 @@
+from datetime import date, time
+
+import pytest
+from core.pagination import decode_cursor, encode_cursor, filter_after, get_ordering_value
+from diaries.models import MoodDiaryEntry
+from diaries.tests.factories import MoodDiaryEntryFactory, MoodDiaryFactory
+from rules.models import RuleClient
+from rules.tests.factories import RuleClientFactory
+
+ORDERING = ("-date", "-start_time", "-id")
+
+
+def test_cursor_roundtrip():
+    values = [date(2023, 10, 1), time(12, 30, 15, 500), 42]
+    cursor = encode_cursor(values)
+    assert decode_cursor(cursor, MoodDiaryEntry, ORDERING) == values
+    assert decode_cursor(
+        encode_cursor([True, "A", 1]), RuleClient, ("-active", "rule__title", "id")
+    ) == [
+        True,
+        "A",
+        1,
+    ]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        encode_cursor([date(2023, 10, 1), 42]),  # too few values
+        encode_cursor({"date": "2023-10-01"}),
+        encode_cursor(["2023-13-01", "12:00", 42]),  # invalid date
+    ],
+)
+def test_decode_cursor_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, MoodDiaryEntry, ORDERING)
+
+
+@pytest.mark.django_db
+def test_filter_after():
+    mood_diary = MoodDiaryFactory.create()
+    for day, hour in [(1, 8), (1, 12), (1, 12), (2, 8), (3, 8), (3, 20)]:
+        MoodDiaryEntryFactory.create(
+            mood_diary=mood_diary, date=date(2023, 10, day), start_time=time(hour, 0)
+        )
+    entries = list(MoodDiaryEntry.objects.order_by(*ORDERING))
+
+    # Paging through the entries yields each of them exactly once, in order
+    paged_entries = []
+    queryset = MoodDiaryEntry.objects.order_by(*ORDERING)
+    page = list(queryset[:2])
+    while page:
+        paged_entries += page
+        values = [get_ordering_value(page[-1], field) for field in ORDERING]
+        page = list(filter_after(queryset, ORDERING, values)[:2])
+    assert paged_entries == entries
+
+
+@pytest.mark.django_db
+def test_get_ordering_value():
+    rule_client = RuleClientFactory.create(rule__title="A")
+    assert get_ordering_value(rule_client, "rule__title") == "A"
+    assert get_ordering_value(rule_client, "-id") == rule_client.id
@@ -1,17 +1,24 @@
 import http
+import time
 
 import pytest
+from clients.models import Client
+from clients.tests.factories import ClientFactory
 from core.views import (
     AuthenticatedClientRoleMixin,
     AuthenticatedCounselorOrClientRoleMixin,
     AuthenticatedCounselorRoleMixin,
+    ConditionalGetMixin,
 )
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, HttpResponseNotFound
 from django.test import RequestFactory
 from django.urls import reverse
+from django.utils.http import http_date
 from django.views import View
+from pytest_mock import MockerFixture
 from users.tests.factories import UserFactory
 
 
@@ -113,3 +120,122 @@ def test_authenticated_counselor_or_client_mixin(django_user_model):
     response = view(request)
 
     assert response == "ok"
+
+
+class ClientConditionalView(ConditionalGetMixin, View):
+    def get_conditional_queryset(self):
+        return Client.objects.all()
+
+    def get(self, request):
+        return HttpResponse("ok")
+
+
+@pytest.mark.django_db
+def test_conditional_get_mixin_headers():
+    client = ClientFactory.create()
+    request = RequestFactory().get("/")
+    request.user = client.user
+
+    response = ClientConditionalView.as_view()(request)
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response["ETag"]
+    assert not response.has_header("Last-Modified")
+    assert "private" in response["Cache-Control"]
+    assert "no-cache" in response["Cache-Control"]
+    assert "Cookie" in response["Vary"]
+    assert "X-Requested-With" in response["Vary"]
+
+
+@pytest.mark.django_db
+def test_conditional_get_mixin_not_modified(mocker: MockerFixture):
+    client = ClientFactory.create()
+    view = ClientConditionalView.as_view()
+    request = RequestFactory().get("/")
+    request.user = client.user
+    etag = view(request)["ETag"]
+    spy = mocker.spy(ClientConditionalView, "get")
+
+    request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+    request.user = client.user
+    response = view(request)
+
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+    assert response["ETag"] == etag
+    assert "private" in response["Cache-Control"]
+    spy.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_conditional_get_mixin_etag_changes(freezer):
+    freezer.move_to("2023-10-10 12:00:00")
+    client = ClientFactory.create()
+    view = ClientConditionalView.as_view()
+
+    def get_etag(path="/", user=client.user, **headers):
+        request = RequestFactory().get(path, **headers)
+        request.user = user
+        return view(request)["ETag"]
+
+    etag = get_etag()
+    assert get_etag() == etag
+    # Other pages, users and requests via AJAX
+    assert get_etag("/?cursor=1") != etag
+    assert get_etag(user=UserFactory.create()) != etag
+    assert get_etag(HTTP_X_REQUESTED_WITH="XMLHttpRequest") != etag
+
+    freezer.move_to("2023-10-10 12:01:00")
+    client.save()
+    assert get_etag() != etag
+
+    # Deleting rows does not change the last modification, but the number of rows
+    other_client = ClientFactory.create()
+    created_etag = get_etag()
+    other_client.delete()
+    assert get_etag() != created_etag
+
+    # Requests validated by their last modification only are answered in full
+    request = RequestFactory().get("/", HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+    request.user = client.user
+    assert view(request).status_code == http.HTTPStatus.OK
+
+
+@pytest.mark.django_db
+def test_conditional_get_mixin_dependencies():
+    client = ClientFactory.create()
+    dependency = {"version": 1}
+
+    class DependentView(ClientConditionalView):
+        conditional_dependencies = (lambda request: dependency["version"],)
+
+    view = DependentView.as_view()
+
+    def get_etag():
+        request = RequestFactory().get("/")
+        request.user = client.user
+        return view(request)["ETag"]
+
+    etag = get_etag()
+    dependency["version"] = 2
+
+    assert get_etag() != etag
+
+
+@pytest.mark.django_db
+def test_conditional_get_mixin_only_get_and_successful_responses():
+    class MyView(ClientConditionalView):
+        def get(self, request):
+            return HttpResponseNotFound()
+
+        def post(self, request):
+            return HttpResponse("ok")
+
+    client = ClientFactory.create()
+    view = MyView.as_view()
+
+    for request in [RequestFactory().get("/"), RequestFactory().post("/")]:
+        request.user = client.user
+        response = view(request)
+
+        assert not response.has_header("ETag")
+        assert not response.has_header("Cache-Control")
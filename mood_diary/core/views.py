@@ -1,5 +1,13 @@
+import hashlib
+from typing import Any, Callable
+
+from django.conf import settings
 from django.contrib.auth.mixins import AccessMixin
-from django.http import HttpRequest
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
 
 
 class AuthenticatedCounselorRoleMixin(AccessMixin):
@@ -36,3 +44,67 @@ class AuthenticatedCounselorOrClientRoleMixin(AccessMixin):
         ):
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Mixin to answer GET requests of authenticated users conditionally.
+    Responses are private and have to be revalidated whenever they are used. They carry an
+    ETag derived from the rows the page shows (the number and the newest `updated_at` of
+    the rows of `get_conditional_queryset`, by default), so that unchanged pages are
+    answered with 304 Not Modified without being rendered.
+    There is no Last-Modified header, as deleting rows does not change the newest
+    `updated_at`, only the number of rows.
+    Besides the rows, the ETag covers everything else a page depends on: the user and their
+    CSRF token, the language, the URL (e.g. the cursor of a page), whether the page is
+    requested via AJAX and any `conditional_dependencies` of the view, e.g. the unread
+    notifications shown in the navigation bar.
+    """
+
+    conditional_aggregates = {"count": Count("pk"), "updated_at": Max("updated_at")}
+    conditional_dependencies: tuple[Callable[[HttpRequest], Any], ...] = ()
+
+    def get_conditional_queryset(self) -> QuerySet:
+        """
+        Return the rows whose changes the page reflects.
+
+        Returns
+        -------
+        QuerySet
+        """
+        raise NotImplementedError
+
+    def get_conditional_etag(self) -> str:
+        """
+        Calculate the ETag of the page with a single query.
+
+        Returns
+        -------
+        str
+        """
+        request = self.request
+        aggregates = self.get_conditional_queryset().aggregate(**self.conditional_aggregates)
+        state = [
+            request.user.id,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            get_language(),
+            request.get_full_path(),
+            request.headers.get("x-requested-with"),
+            sorted(aggregates.items()),
+            *(dependency(request) for dependency in self.conditional_dependencies),
+        ]
+        return quote_etag(hashlib.sha1(repr(state).encode()).hexdigest())
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        etag = self.get_conditional_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        response.headers.setdefault("ETag", etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Cookie", "X-Requested-With"])
+        return response
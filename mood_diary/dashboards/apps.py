@@ -8,3 +8,6 @@ class DashboardsConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "dashboards"
+
+    def ready(self):
+        import dashboards.signals  # noqa: F401
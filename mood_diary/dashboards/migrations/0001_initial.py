@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clients', '0003_client_client_key_encrypted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientStatistics',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='clients.client')),
+                ('mood_avg_7_days', models.FloatField(default=None, null=True)),
+                ('mood_avg_30_days', models.FloatField(default=None, null=True)),
+                ('entry_streak', models.PositiveIntegerField(default=0)),
+                ('last_entry_at', models.DateTimeField(default=None, null=True)),
+                ('rule_triggers_7_days', models.PositiveIntegerField(default=0)),
+                ('last_rule_triggered_at', models.DateTimeField(default=None, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dashboards_client_statistics',
+            },
+        ),
+    ]
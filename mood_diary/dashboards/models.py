@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable
+
+from diaries.models import DailyMoodSummary, MoodDiaryEntry
+from django.db import models
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from rules.models import RuleTriggeredLog
+
+
+class ClientStatistics(models.Model):
+    """
+    This is the ClientStatistics model holding pre-aggregated statistics of a client
+    for the counselor dashboard.
+    The statistics are refreshed whenever the client writes mood diary entries or a rule
+    is triggered for them, and nightly for all active clients, as the windows they cover
+    move on day by day (see dashboards.signals and dashboards.tasks).
+    """
+
+    class Meta:
+        db_table = "dashboards_client_statistics"
+
+    client = models.OneToOneField(
+        to="clients.Client",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="statistics",
+    )
+    # Null if no entries have been logged within the respective window
+    mood_avg_7_days = models.FloatField(null=True, default=None)
+    mood_avg_30_days = models.FloatField(null=True, default=None)
+    # Number of consecutive days with entries up to today (or yesterday, if there are
+    # no entries for today yet)
+    entry_streak = models.PositiveIntegerField(default=0)
+    last_entry_at = models.DateTimeField(null=True, default=None)
+    rule_triggers_7_days = models.PositiveIntegerField(default=0)
+    last_rule_triggered_at = models.DateTimeField(null=True, default=None)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def calculate_streak(days: set[date], today: date) -> int:
+        """
+        Count the consecutive days with entries up to today, or up to yesterday if there
+        are no entries for today yet.
+
+        Parameters
+        ----------
+        days: set[date]
+            Days with entries.
+        today: date
+
+        Returns
+        -------
+        int
+        """
+        day = today if today in days else today - timedelta(days=1)
+        streak = 0
+        while day in days:
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
+
+    @staticmethod
+    def average_mood(summaries: list[tuple[date, int, float]], since: date) -> float | None:
+        """
+        Calculate the average mood of all entries summarized from the given day on.
+
+        Parameters
+        ----------
+        summaries: list[tuple[date, int, float]]
+            Date, entry count and average mood of daily summaries.
+        since: date
+
+        Returns
+        -------
+        float | None
+            None if there are no entries in the window.
+        """
+        window = [(count, average) for day, count, average in summaries if day >= since]
+        entry_count = sum(count for count, _average in window)
+        if not entry_count:
+            return None
+        return sum(count * average for count, average in window) / entry_count
+
+    @classmethod
+    def refresh(cls, client_ids: Iterable[int]) -> list[ClientStatistics]:
+        """
+        Recalculate the statistics of the given clients using a constant number of queries:
+        The daily mood summaries and the latest entries (by date) within the 30-day window,
+        as well as the rule triggerings of all clients are fetched together and the statistics are
+        inserted or updated with a single bulk upsert.
+        Data before the window is only queried for the clients it matters for, i.e. those
+        whose streak spans the whole window or who have not logged entries within it.
+
+        Parameters
+        ----------
+        client_ids: Iterable[int]
+
+        Returns
+        -------
+        list[ClientStatistics]
+        """
+        client_ids = set(client_ids)
+        if not client_ids:
+            return []
+        now = timezone.now()
+        today = now.date()
+        since = today - timedelta(days=29)
+
+        summaries_per_client = defaultdict(list)
+        for client_id, day, entry_count, average_mood in (
+            DailyMoodSummary.objects.filter(mood_diary__client_id__in=client_ids, date__gte=since)
+            .order_by()
+            .values_list("mood_diary__client_id", "date", "entry_count", "average_mood")
+        ):
+            summaries_per_client[client_id].append((day, entry_count, average_mood))
+        days_per_client = {
+            client_id: {day for day, *_ in summaries_per_client[client_id]}
+            for client_id in client_ids
+        }
+        # Streaks reaching back to the start of the window may continue before it
+        if continued_client_ids := {
+            client_id
+            for client_id, days in days_per_client.items()
+            if since in days and cls.calculate_streak(days, today) >= (today - since).days
+        }:
+            for client_id, day in DailyMoodSummary.objects.filter(
+                mood_diary__client_id__in=continued_client_ids, date__lt=since
+            ).values_list("mood_diary__client_id", "date"):
+                days_per_client[client_id].add(day)
+
+        entries = MoodDiaryEntry.objects.order_by().values_list("mood_diary__client_id")
+        last_entry_at = dict(
+            entries.filter(mood_diary__client_id__in=client_ids, date__gte=since).annotate(
+                Max("created_at")
+            )
+        )
+        # Clients without entries within the window
+        if outdated_client_ids := client_ids - set(last_entry_at):
+            last_entry_at |= dict(
+                entries.filter(mood_diary__client_id__in=outdated_client_ids).annotate(
+                    Max("created_at")
+                )
+            )
+        triggers = {
+            log["client_id"]: log
+            for log in RuleTriggeredLog.objects.filter(client_id__in=client_ids)
+            .order_by()
+            .values("client_id")
+            .annotate(
+                recent_count=Count("id", filter=Q(requested_at__gte=now - timedelta(days=7))),
+                last_requested_at=Max("requested_at"),
+            )
+        }
+
+        statistics = []
+        for client_id in sorted(client_ids):
+            summaries = summaries_per_client[client_id]
+            client_triggers = triggers.get(client_id, {})
+            statistics.append(
+                cls(
+                    client_id=client_id,
+                    mood_avg_7_days=cls.average_mood(summaries, today - timedelta(days=6)),
+                    mood_avg_30_days=cls.average_mood(summaries, today - timedelta(days=29)),
+                    entry_streak=cls.calculate_streak(days_per_client[client_id], today),
+                    last_entry_at=last_entry_at.get(client_id),
+                    rule_triggers_7_days=client_triggers.get("recent_count", 0),
+                    last_rule_triggered_at=client_triggers.get("last_requested_at"),
+                    refreshed_at=now,
+                )
+            )
+        return cls.objects.bulk_create(
+            statistics,
+            update_conflicts=True,
+            unique_fields=["client"],
+            update_fields=[
+                "mood_avg_7_days",
+                "mood_avg_30_days",
+                "entry_streak",
+                "last_entry_at",
+                "rule_triggers_7_days",
+                "last_rule_triggered_at",
+                "refreshed_at",
+            ],
+        )
@@ -0,0 +1,124 @@
+from datetime import date, time
+from typing import NamedTuple
+
+from diaries.models import DailyMoodSummary, MoodDiaryEntry
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language, get_supported_language_variant
+from django.utils.translation import gettext as _
+
+# Payloads are invalidated whenever entries change, the timeout only bounds memory usage
+CLIENT_DASHBOARD_TIMEOUT = 60 * 60 * 24
+MOOD_SCORES_DAYS = 7
+MOOD_HIGHLIGHTS_COUNT = 3
+
+
+class MoodHighlight(NamedTuple):
+    """
+    Compact representation of a mood diary entry as shown on the client dashboard."""
+
+    id: int
+    date: date
+    start_time: time
+    end_time: time
+    mood: str
+    activity: str
+
+
+class ClientDashboardPayload(NamedTuple):
+    """
+    All data shown on the client dashboard, rendered in one language."""
+
+    mood_scores_dates: list[str]
+    mood_scores_values: list[float]
+    mood_highlights: list[MoodHighlight]
+
+
+def get_client_dashboard_cache_key(user_id: int, language: str) -> str:
+    return f"dashboards:client:{user_id}:{language}"
+
+
+def build_client_dashboard_payload(user_id: int) -> ClientDashboardPayload:
+    """
+    Build the dashboard payload of the client with the given user id in the active language.
+    The chart data are read from the daily mood summaries with a single query and the
+    weekdays are localized in Python.
+
+    Parameters
+    ----------
+    user_id: int
+
+    Returns
+    -------
+    ClientDashboardPayload
+    """
+    mood_scores = list(
+        reversed(
+            DailyMoodSummary.objects.filter(mood_diary__client__user_id=user_id)
+            .order_by("-date")
+            .values_list("date", "average_mood")[:MOOD_SCORES_DAYS]
+        )
+    )
+    mood_highlights = [
+        MoodHighlight(
+            id=entry.id,
+            date=entry.date,
+            start_time=entry.start_time,
+            end_time=entry.end_time,
+            mood=str(entry.mood),
+            activity=str(entry.activity),
+        )
+        for entry in MoodDiaryEntry.objects.filter(mood_diary__client__user_id=user_id)
+        .select_related("mood", "activity")
+        .order_by("-mood__value", "-date", "-start_time")[:MOOD_HIGHLIGHTS_COUNT]
+    ]
+    return ClientDashboardPayload(
+        mood_scores_dates=[_(day.strftime("%A")) for day, _average_mood in mood_scores],
+        mood_scores_values=[round(average_mood, 1) for _day, average_mood in mood_scores],
+        mood_highlights=mood_highlights,
+    )
+
+
+def get_client_dashboard_payload(user_id: int) -> ClientDashboardPayload:
+    """
+    Get the dashboard payload of the client with the given user id in the active language
+    from the cache, building it if it is not cached (anymore).
+
+    Parameters
+    ----------
+    user_id: int
+
+    Returns
+    -------
+    ClientDashboardPayload
+    """
+    # The active language may be a variant (e.g. the default "en-us") of one of the languages
+    # the payloads are invalidated in
+    language = get_supported_language_variant(get_language())
+    cache_key = get_client_dashboard_cache_key(user_id, language)
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = build_client_dashboard_payload(user_id)
+        cache.set(cache_key, payload, timeout=CLIENT_DASHBOARD_TIMEOUT)
+    return payload
+
+
+def invalidate_client_dashboard_payload(user_ids: list[int]):
+    """
+    Drop the cached dashboard payloads of the clients with the given user ids in all languages.
+
+    Parameters
+    ----------
+    user_ids: list[int]
+
+    Returns
+    -------
+    None
+    """
+    cache.delete_many(
+        [
+            get_client_dashboard_cache_key(user_id, language)
+            for user_id in user_ids
+            for language, _name in settings.LANGUAGES
+        ]
+    )
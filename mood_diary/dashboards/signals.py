@@ -0,0 +1,53 @@
+from dashboards.models import ClientStatistics
+from dashboards.payloads import invalidate_client_dashboard_payload
+from diaries.dispatch import mood_diary_entries_bulk_created
+from diaries.models import MoodDiary, MoodDiaryEntry
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rules.dispatch import rules_triggered
+
+
+def refresh_mood_diary_dashboards(mood_diary_id: int):
+    """
+    Refresh the statistics of the client owning the mood diary and drop their cached
+    dashboard payload once the transaction writing the entries has been committed
+    (and the daily mood summaries have been refreshed).
+    Dropping the payload any earlier would let concurrent requests cache it again from
+    the entries as they were before the transaction.
+    """
+    clients = list(
+        MoodDiary.objects.filter(id=mood_diary_id).values_list("client_id", "client__user_id")
+    )
+
+    def refresh():
+        ClientStatistics.refresh([client_id for client_id, _user_id in clients])
+        invalidate_client_dashboard_payload([user_id for _client_id, user_id in clients])
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=MoodDiaryEntry)
+@receiver(post_delete, sender=MoodDiaryEntry)
+def refresh_client_dashboards_on_change(sender, instance: MoodDiaryEntry, **kwargs):
+    """
+    Update the dashboards of the client (and their counselor) when an entry is written.
+    """
+    refresh_mood_diary_dashboards(instance.mood_diary_id)
+
+
+@receiver(mood_diary_entries_bulk_created, sender=MoodDiaryEntry)
+def refresh_client_dashboards_on_bulk_creation(sender, mood_diary_id: int, **kwargs):
+    """
+    Update the dashboards of the client (and their counselor) when entries are created in bulk.
+    """
+    refresh_mood_diary_dashboards(mood_diary_id)
+
+
+@receiver(rules_triggered)
+def refresh_client_statistics_on_rule_triggering(sender, client_ids: set[int], **kwargs):
+    """
+    Refresh the statistics of the clients a rule has been triggered for, at once for all
+    clients of a batch evaluation.
+    """
+    transaction.on_commit(lambda: ClientStatistics.refresh(client_ids))
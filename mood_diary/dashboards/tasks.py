@@ -0,0 +1,36 @@
+import logging
+from itertools import batched
+
+from celery import shared_task
+from clients.models import Client
+from dashboards.models import ClientStatistics
+
+logger = logging.getLogger("mood_diary.dashboards.tasks")
+
+CLIENT_STATISTICS_CHUNK_SIZE = 500
+
+
+@shared_task
+def task_refresh_client_statistics():
+    """
+    Refresh the statistics of all active clients.
+    This task will run daily shortly after midnight, as the windows the statistics cover
+    move on with every day even if the clients do not write any entries.
+    The ids of the clients are streamed from the database and the statistics are refreshed
+    in chunks of `CLIENT_STATISTICS_CHUNK_SIZE` clients, each with a constant number of
+    queries.
+
+    Returns
+    -------
+    None
+    """
+    client_ids = (
+        Client.objects.filter(active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+        .iterator(chunk_size=CLIENT_STATISTICS_CHUNK_SIZE)
+    )
+    refreshed = 0
+    for chunk in batched(client_ids, CLIENT_STATISTICS_CHUNK_SIZE):
+        refreshed += len(ClientStatistics.refresh(chunk))
+    logger.info(f"Client Statistics: Refreshed statistics of {refreshed} clients")
@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from clients.tests.factories import ClientFactory
+from dashboards.models import ClientStatistics
+from diaries.tests.factories import MoodDiaryEntryFactory
+from rules.dispatch import rules_triggered
+from rules.rules import BaseRule
+from rules.tests.factories import RuleTriggeredLogFactory
+
+
+@pytest.mark.django_db
+def test_client_statistics_refresh(freezer, django_assert_num_queries):
+    freezer.move_to("2023-10-10 12:00:00")
+    client, other_client, inactive_client = ClientFactory.create_batch(3)
+    for day, mood_value in [
+        (date(2023, 9, 1), -3),  # outside of both windows
+        (date(2023, 9, 20), -2),
+        (date(2023, 10, 7), 1),
+        (date(2023, 10, 8), 3),
+        (date(2023, 10, 9), 2),
+        (date(2023, 10, 9), 0),
+    ]:
+        MoodDiaryEntryFactory.create(mood_diary__client=client, date=day, mood__value=mood_value)
+    MoodDiaryEntryFactory.create(
+        mood_diary__client=other_client, date=date(2023, 10, 10), mood__value=-1
+    )
+    RuleTriggeredLogFactory.create(client=client, requested_at=datetime(2023, 9, 1))
+    RuleTriggeredLogFactory.create(client=client, requested_at=datetime(2023, 10, 9))
+
+    # Summaries and latest entries within the window, latest entries of the inactive client,
+    # rule triggerings and the upsert
+    with django_assert_num_queries(5):
+        statistics = ClientStatistics.refresh([client.id, other_client.id, inactive_client.id])
+    assert len(statistics) == 3
+
+    statistics = ClientStatistics.objects.get(client=client)
+    assert statistics.mood_avg_7_days == 1.5
+    assert statistics.mood_avg_30_days == pytest.approx(0.8)
+    # No entries for today yet, so the streak ends yesterday
+    assert statistics.entry_streak == 3
+    assert statistics.last_entry_at == datetime(2023, 10, 10, 12, 0)
+    assert statistics.rule_triggers_7_days == 1
+    assert statistics.last_rule_triggered_at == datetime(2023, 10, 9)
+
+    statistics = ClientStatistics.objects.get(client=other_client)
+    assert statistics.mood_avg_7_days == -1
+    assert statistics.entry_streak == 1
+    assert statistics.rule_triggers_7_days == 0
+    assert statistics.last_rule_triggered_at is None
+
+    statistics = ClientStatistics.objects.get(client=inactive_client)
+    assert statistics.mood_avg_7_days is None
+    assert statistics.mood_avg_30_days is None
+    assert statistics.entry_streak == 0
+    assert statistics.last_entry_at is None
+
+    # The windows move on, even without new entries
+    freezer.move_to("2023-10-12 12:00:00")
+    ClientStatistics.refresh([client.id])
+    statistics = ClientStatistics.objects.get(client=client)
+    assert statistics.entry_streak == 0
+    assert statistics.mood_avg_7_days == 1.5
+    assert ClientStatistics.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_client_statistics_refresh_before_window(freezer):
+    freezer.move_to("2023-08-01 12:00:00")
+    returning_client, absent_client = ClientFactory.create_batch(2)
+    MoodDiaryEntryFactory.create(mood_diary__client=absent_client, date=date(2023, 8, 1))
+    freezer.move_to("2023-10-10 12:00:00")
+    day = date(2023, 9, 1)
+    while day < date(2023, 10, 10):
+        MoodDiaryEntryFactory.create(mood_diary__client=returning_client, date=day)
+        day += timedelta(days=1)
+
+    ClientStatistics.refresh([returning_client.id, absent_client.id])
+
+    # Streaks are counted beyond the window
+    statistics = ClientStatistics.objects.get(client=returning_client)
+    assert statistics.entry_streak == 39
+    assert statistics.last_entry_at == datetime(2023, 10, 10, 12, 0)
+    # The latest entry is found even if it was logged before the window
+    statistics = ClientStatistics.objects.get(client=absent_client)
+    assert statistics.entry_streak == 0
+    assert statistics.mood_avg_30_days is None
+    assert statistics.last_entry_at == datetime(2023, 8, 1, 12, 0)
+
+
+def test_client_statistics_calculate_streak():
+    today = date(2023, 10, 10)
+    assert ClientStatistics.calculate_streak(set(), today) == 0
+    days = {today - timedelta(days=delta) for delta in [0, 1, 2, 4]}
+    assert ClientStatistics.calculate_streak(days, today) == 3
+    assert ClientStatistics.calculate_streak(days - {today}, today) == 2
+    assert ClientStatistics.calculate_streak(days, today + timedelta(days=2)) == 0
+
+
+@pytest.mark.django_db
+def test_client_statistics_refreshed_on_writes(django_capture_on_commit_callbacks):
+    client = ClientFactory.create()
+    with django_capture_on_commit_callbacks(execute=True):
+        entry = MoodDiaryEntryFactory.create(mood_diary__client=client, mood__value=2)
+    assert client.statistics.mood_avg_7_days == 2
+    assert client.statistics.rule_triggers_7_days == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        log = RuleTriggeredLogFactory.create(client=client)
+        rules_triggered.send(sender=BaseRule, rule=log.rule, client_ids={client.id})
+    client.statistics.refresh_from_db()
+    assert client.statistics.rule_triggers_7_days == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        entry.delete()
+    client.statistics.refresh_from_db()
+    assert client.statistics.mood_avg_7_days is None
+    assert client.statistics.entry_streak == 0
@@ -0,0 +1,89 @@
+from datetime import date, time
+
+import pytest
+from dashboards.payloads import (
+    build_client_dashboard_payload,
+    get_client_dashboard_payload,
+    invalidate_client_dashboard_payload,
+)
+from diaries.models import MoodDiaryEntry
+from diaries.tests.factories import MoodDiaryEntryFactory, MoodDiaryFactory, MoodFactory
+from django.utils import translation
+
+
+@pytest.mark.django_db
+def test_build_client_dashboard_payload(django_assert_num_queries):
+    mood_diary = MoodDiaryFactory.create()
+    user_id = mood_diary.client.user_id
+    for day in range(1, 10):
+        MoodDiaryEntryFactory.create(
+            mood_diary=mood_diary, date=date(2023, 9, day), mood__value=day % 3
+        )
+    MoodDiaryEntryFactory.create(
+        mood_diary=mood_diary, date=date(2023, 9, 9), mood__value=-3, activity__value="Reading"
+    )
+    MoodDiaryEntryFactory.create(date=date(2023, 9, 10), mood__value=3)  # other client
+
+    with django_assert_num_queries(2):
+        payload = build_client_dashboard_payload(user_id)
+    # The previous seven days with entries, oldest first
+    assert payload.mood_scores_dates == [
+        "Sunday",
+        "Monday",
+        "Tuesday",
+        "Wednesday",
+        "Thursday",
+        "Friday",
+        "Saturday",
+    ]
+    assert payload.mood_scores_values == [0, 1, 2, 0, 1, 2, -1.5]
+    assert [highlight.date for highlight in payload.mood_highlights] == [
+        date(2023, 9, 8),
+        date(2023, 9, 5),
+        date(2023, 9, 2),
+    ]
+
+    with translation.override("de"):
+        payload = build_client_dashboard_payload(user_id)
+    assert payload.mood_scores_dates[0] == "Sonntag"
+
+
+@pytest.mark.django_db
+def test_get_client_dashboard_payload(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    mood_diary = MoodDiaryFactory.create()
+    user_id = mood_diary.client.user_id
+    invalidate_client_dashboard_payload([user_id])
+    with django_capture_on_commit_callbacks(execute=True):
+        entry = MoodDiaryEntryFactory.create(
+            mood_diary=mood_diary, date=date(2023, 9, 1), mood__value=1
+        )
+    assert get_client_dashboard_payload(user_id).mood_scores_values == [1]
+    # Served from the cache
+    with django_assert_num_queries(0):
+        assert get_client_dashboard_payload(user_id).mood_scores_values == [1]
+
+    # Writing entries invalidates the cache once the transaction has been committed
+    with django_capture_on_commit_callbacks(execute=True):
+        entry.mood = MoodFactory.create(value=3)
+        entry.save()
+        assert get_client_dashboard_payload(user_id).mood_scores_values == [1]
+    assert get_client_dashboard_payload(user_id).mood_scores_values == [3]
+    with django_capture_on_commit_callbacks(execute=True):
+        MoodDiaryEntry.bulk_create_days(
+            MoodDiaryEntryFactory.build(
+                mood_diary=mood_diary,
+                date=date(2023, 9, 2),
+                start_time=time(12, 0),
+                end_time=time(13, 0),
+                mood=entry.mood,
+                activity=entry.activity,
+            ),
+            date(2023, 9, 3),
+        )
+    assert get_client_dashboard_payload(user_id).mood_scores_values == [3, 3, 3]
+    with django_capture_on_commit_callbacks(execute=True):
+        entry.delete()
+    assert get_client_dashboard_payload(user_id).mood_scores_values == [3, 3]
+    invalidate_client_dashboard_payload([user_id])
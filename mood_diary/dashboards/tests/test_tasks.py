@@ -0,0 +1,19 @@
+import pytest
+from clients.tests.factories import ClientFactory
+from dashboards.models import ClientStatistics
+from dashboards.tasks import task_refresh_client_statistics
+
+
+@pytest.mark.django_db
+def test_task_refresh_client_statistics(mocker):
+    mocker.patch("dashboards.tasks.CLIENT_STATISTICS_CHUNK_SIZE", 2)
+    clients = ClientFactory.create_batch(3, active=True)
+    ClientFactory.create(active=False)
+    spy = mocker.spy(ClientStatistics, "refresh")
+
+    task_refresh_client_statistics()
+
+    assert spy.call_count == 2
+    assert set(ClientStatistics.objects.values_list("client_id", flat=True)) == {
+        client.id for client in clients
+    }
@@ -1,12 +1,15 @@
 import http
-from datetime import datetime
-from unittest import mock
+from datetime import date
 
 import pytest
 from clients.tests.factories import ClientFactory
-from diaries.models import Activity, Mood, MoodDiary, MoodDiaryEntry
+from dashboards.models import ClientStatistics
+from dashboards.payloads import invalidate_client_dashboard_payload
+from diaries.models import MoodDiary
+from diaries.tests.factories import MoodDiaryEntryFactory
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from users.tests.factories import UserFactory
 
 User = get_user_model()
 
@@ -22,61 +25,70 @@ def mood_diary(user):
     return MoodDiary.objects.create(client=user.client)
 
 
-@pytest.fixture
-def mood_scores(mood_diary):
-    class MockQuerySet:
-        data = [
-            {"date": datetime(2023, 10, 3).date(), "average_mood": 10},
-            {"date": datetime(2023, 10, 2).date(), "average_mood": 9},
-            {"date": datetime(2023, 10, 1).date(), "average_mood": 8},
-        ]
-
-        def values_list(self, *args, **kwargs):
-            if args[0] == "date":
-                return [item["date"] for item in self.data]
-            if args[0] == "average_mood":
-                return [item["average_mood"] for item in self.data]
-
-    return MockQuerySet()
-
-
-@pytest.fixture
-def mood_highlights(mood_diary):
-    return [
-        MoodDiaryEntry(
-            id=1,
-            date="2023-09-23",
-            mood=Mood(value=7, label="Happiest"),
-            activity=Activity(value="A1"),
-        ),
-        MoodDiaryEntry(
-            id=2,
-            date="2023-09-24",
-            mood=Mood(value=6, label="Happier"),
-            activity=Activity(value="A2"),
-        ),
-        MoodDiaryEntry(
-            id=3,
-            date="2023-09-25",
-            mood=Mood(value=5, label="Happy"),
-            activity=Activity(value="A3"),
-        ),
-    ]
-
-
 @pytest.mark.django_db
-@mock.patch("diaries.models.MoodDiary.average_mood_scores_previous_days")
-@mock.patch("diaries.models.MoodDiary.most_recent_mood_highlights")
 def test_dashboard_client_view(
-    mock_highlights, mock_scores, user, mood_diary, mood_scores, mood_highlights, create_response
+    user,
+    mood_diary,
+    client,
+    create_response,
+    django_assert_max_num_queries,
+    django_capture_on_commit_callbacks,
 ):
     url = reverse("dashboards:dashboard_client")
-    mock_scores.return_value = mood_scores
-    mock_highlights.return_value = mood_highlights
+    for day, mood_value in [
+        (date(2023, 10, 1), 3),
+        (date(2023, 10, 2), -1),
+        (date(2023, 10, 3), 2),
+    ]:
+        MoodDiaryEntryFactory.create(mood_diary=mood_diary, date=day, mood__value=mood_value)
+    MoodDiaryEntryFactory.create(date=date(2023, 10, 4), mood__value=3)  # other client
 
     response = create_response(user, url)
 
     assert response.status_code == http.HTTPStatus.OK
     assert response.context["mood_scores_dates"] == ["Sunday", "Monday", "Tuesday"]
-    assert response.context["mood_scores_values"] == [8, 9, 10]
-    assert response.context["mood_highlights"] == mock_highlights.return_value
+    assert response.context["mood_scores_values"] == [3, -1, 2]
+    assert [highlight.date for highlight in response.context["mood_highlights"]] == [
+        date(2023, 10, 1),
+        date(2023, 10, 3),
+        date(2023, 10, 2),
+    ]
+
+    # Served from the cache until entries are written
+    client.force_login(user)
+    with django_assert_max_num_queries(3):  # session and user
+        response = client.get(url)
+    assert response.context["mood_scores_values"] == [3, -1, 2]
+    with django_capture_on_commit_callbacks(execute=True):
+        MoodDiaryEntryFactory.create(mood_diary=mood_diary, date=date(2023, 10, 4), mood__value=0)
+    response = create_response(user, url)
+    assert response.context["mood_scores_values"] == [3, -1, 2, 0]
+    invalidate_client_dashboard_payload([user.id])
+
+
+@pytest.mark.django_db
+def test_dashboard_counselor_view(client, django_assert_max_num_queries):
+    counselor = UserFactory.create(role=User.Role.COUNSELOR)
+    clients = ClientFactory.create_batch(3, counselor=counselor, active=True)
+    ClientFactory.create(counselor=counselor, active=False)
+    ClientFactory.create()  # client of another counselor
+    MoodDiaryEntryFactory.create(mood_diary__client=clients[0], mood__value=2)
+    ClientStatistics.refresh([client.id for client in clients])
+    url = reverse("dashboards:dashboard_counselor")
+
+    # Session, user and the clients with their statistics
+    client.force_login(counselor)
+    with django_assert_max_num_queries(3):
+        response = client.get(url)
+
+    assert response.status_code == http.HTTPStatus.OK
+    overview = {client.id: client for client in response.context["clients"]}
+    assert len(overview) == 3
+    assert overview[clients[0].id].statistics.mood_avg_7_days == 2
+    assert overview[clients[1].id].statistics.mood_avg_7_days is None
+
+
+@pytest.mark.django_db
+def test_dashboard_counselor_view_forbidden_for_clients(user, create_response):
+    response = create_response(user, reverse("dashboards:dashboard_counselor"))
+    assert response.status_code == http.HTTPStatus.FORBIDDEN
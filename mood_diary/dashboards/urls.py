@@ -13,4 +13,9 @@ urlpatterns = [
         views.DashboardClientView.as_view(),
         name="dashboard_client",
     ),
+    path(
+        "counselor/",
+        views.DashboardCounselorView.as_view(),
+        name="dashboard_counselor",
+    ),
 ]
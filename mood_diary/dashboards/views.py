@@ -1,4 +1,6 @@
-from core.views import AuthenticatedClientRoleMixin
+from clients.models import Client
+from core.views import AuthenticatedClientRoleMixin, AuthenticatedCounselorRoleMixin
+from dashboards.payloads import get_client_dashboard_payload
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.utils.translation import gettext_lazy as _
@@ -15,7 +17,8 @@ class DashboardClientView(AuthenticatedClientRoleMixin, View):
     def get(self, request: HttpRequest) -> HttpResponse:
         """
         Upon receiving a GET request, render the client dashboard.
-        That includes providing data for the mood score chart and the mood highlights.
+        That includes providing data for the mood score chart and the mood highlights,
+        which are served from the cache as long as no entries have been written.
 
         Parameters
         ----------
@@ -25,33 +28,43 @@ class DashboardClientView(AuthenticatedClientRoleMixin, View):
         -------
         HttpResponse
         """
-        user = request.user
-        mood_diary = user.client.mood_diary
-        mood_scores = mood_diary.average_mood_scores_previous_days(7)
-        mood_scores_dates = list(
-            reversed(
-                [
-                    _(mood_score_date.strftime("%A"))
-                    for mood_score_date in mood_scores.values_list("date", flat=True)
-                ]
-            )
-        )
-        mood_scores_values = list(
-            reversed(
-                [
-                    round(mood_score_value, 1)
-                    for mood_score_value in mood_scores.values_list("average_mood", flat=True)
-                ]
-            )
-        )
-        mood_highlights = mood_diary.most_recent_mood_highlights(3)
+        payload = get_client_dashboard_payload(request.user.id)
         return render(
             request,
             self.template_name,
             {
-                "mood_scores_values": mood_scores_values,
-                "mood_scores_dates": mood_scores_dates,
+                "mood_scores_values": payload.mood_scores_values,
+                "mood_scores_dates": payload.mood_scores_dates,
                 "mood_score_data_name": _("Average Mood"),
-                "mood_highlights": mood_highlights,
+                "mood_highlights": payload.mood_highlights,
             },
         )
+
+
+class DashboardCounselorView(AuthenticatedCounselorRoleMixin, View):
+    """
+    View for the counselor dashboard.
+    """
+
+    template_name = "dashboards/dashboard_counselor.html"
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """
+        Upon receiving a GET request, render the counselor dashboard.
+        That includes an overview of the mood and rule triggers of all active clients of
+        the counselor, which is read from their pre-aggregated statistics with a single query.
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        HttpResponse
+        """
+        clients = (
+            Client.objects.filter(counselor_id=request.user.id, active=True)
+            .select_related("statistics")
+            .order_by("identifier")
+        )
+        return render(request, self.template_name, {"clients": clients})
@@ -8,3 +8,6 @@ class DiariesConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "diaries"
+
+    def ready(self):
+        import diaries.signals  # noqa: F401
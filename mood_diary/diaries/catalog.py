@@ -0,0 +1,197 @@
+import json
+import threading
+import unicodedata
+from functools import lru_cache
+from itertools import groupby
+from typing import NamedTuple
+
+from diaries.models import Activity
+from diaries.reference import reference_data
+from django.conf import settings
+from django.utils import translation
+from django.utils.module_loading import import_string
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a text for searching, ignoring case and accents (e.g. "Ä" matches "a").
+
+    Parameters
+    ----------
+    text: str
+
+    Returns
+    -------
+    str
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Split a text into all of its substrings of length three.
+
+    Parameters
+    ----------
+    text: str
+
+    Returns
+    -------
+    set[str]
+    """
+    return {text[index : index + 3] for index in range(len(text) - 2)}
+
+
+class CatalogEntry(NamedTuple):
+    """
+    An activity of the catalog as shown in one language, along with the normalized text
+    it can be found by."""
+
+    id: int
+    text: str
+    category: str
+    search_text: str
+
+
+class ActivityCatalog:
+    """
+    In-memory search index over the activity catalog for one language.
+    Activities are found if each word of the search term is contained in their value or
+    the value of their category in any language, like the icontains lookups of the
+    ActivityWidget (e.g. "food snack").
+    Words of at least three characters are looked up in a trigram index first, so that
+    only candidates holding all of their trigrams are checked.
+    The JSON responses are prebuilt for the whole catalog and cached per search term
+    and page.
+    """
+
+    cache_size = 1024
+
+    def __init__(self, activities: list[Activity], language: str):
+        self.language = language
+        with translation.override(language):
+            entries = [
+                CatalogEntry(
+                    id=activity.id,
+                    text=str(activity),
+                    category=str(activity.category),
+                    search_text="\n".join(
+                        normalize(getattr(obj, f"value_{code}") or "")
+                        for obj in [activity, activity.category]
+                        for code, _name in settings.LANGUAGES
+                    ),
+                )
+                for activity in activities
+            ]
+        # Grouping by category requires the activities to be ordered by category
+        self.entries = sorted(
+            entries, key=lambda entry: (normalize(entry.category), normalize(entry.text))
+        )
+        self.index = {}
+        for position, entry in enumerate(self.entries):
+            for trigram in trigrams(entry.search_text):
+                self.index.setdefault(trigram, set()).add(position)
+        self._search = lru_cache(maxsize=self.cache_size)(self._build_response)
+
+    def find(self, term: str) -> list[CatalogEntry]:
+        """
+        Find all activities matching each word of the given (normalized) search term.
+
+        Parameters
+        ----------
+        term: str
+
+        Returns
+        -------
+        list[CatalogEntry]
+            Matching activities, ordered by category.
+        """
+        words = term.split()
+        if not words:
+            return self.entries
+        postings = [
+            self.index.get(trigram, set())
+            for word in words
+            if len(word) >= 3
+            for trigram in trigrams(word)
+        ]
+        candidates = sorted(set.intersection(*postings)) if postings else range(len(self.entries))
+        return [
+            self.entries[position]
+            for position in candidates
+            if all(word in self.entries[position].search_text for word in words)
+        ]
+
+    def _build_response(self, term: str, max_results: int, page: int) -> bytes:
+        entries = self.find(term)
+        start = (page - 1) * max_results
+        results = [
+            {
+                "text": category,
+                "children": [{"id": entry.id, "text": entry.text} for entry in activities],
+            }
+            for category, activities in groupby(
+                entries[start : start + max_results], key=lambda entry: entry.category
+            )
+        ]
+        return json.dumps(
+            {"results": results, "more": len(entries) > start + max_results},
+            cls=import_string(settings.SELECT2_JSON_ENCODER),
+        ).encode()
+
+    def search(self, term: str, max_results: int, page: int = 1) -> bytes:
+        """
+        Get the JSON response of the select2 widget for the given search term and page,
+        listing the matching activities grouped by their categories.
+        For an example, see https://select2.org/data-sources/formats#grouped-data.
+
+        Parameters
+        ----------
+        term: str
+        max_results: int
+            Number of activities per page
+        page: int
+            Page requested by the widget when scrolling, starting at 1
+
+        Returns
+        -------
+        bytes
+        """
+        return self._search(normalize(term.strip()), max_results, page)
+
+
+class ActivitySearch:
+    """
+    Process-local activity catalogs per language, built from the reference data on first
+    use and rebuilt whenever the reference data is reloaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._activities = None
+        self._catalogs = {}
+
+    def get_catalog(self, language: str) -> ActivityCatalog:
+        """
+        Get the activity catalog for the given language.
+
+        Parameters
+        ----------
+        language: str
+
+        Returns
+        -------
+        ActivityCatalog
+        """
+        activities = reference_data.activities()
+        with self._lock:
+            if activities is not self._activities:
+                self._activities = activities
+                self._catalogs = {}
+            if (catalog := self._catalogs.get(language)) is None:
+                catalog = self._catalogs[language] = ActivityCatalog(activities, language)
+        return catalog
+
+
+activity_search = ActivitySearch()
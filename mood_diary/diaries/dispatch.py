@@ -0,0 +1,9 @@
+"""
+Custom signals of the diaries app.
+"""
+
+from django.dispatch import Signal
+
+# Sent after mood diary entries were created in bulk, as bulk creation does not send
+# `post_save`. Arguments: `mood_diary_id` and `entries`.
+mood_diary_entries_bulk_created = Signal()
@@ -1,5 +1,6 @@
 from core.forms import BaseModelForm
-from diaries.models import Mood, MoodDiaryEntry
+from diaries.models import MoodDiaryEntry
+from diaries.reference import reference_data
 from django import forms
 from django.urls import reverse_lazy
 from django.utils import timezone
@@ -66,7 +67,7 @@ class MoodDiaryEntryForm(BaseModelForm):
         self.fields["activity"].label = _("Activity")
         self.fields["mood"].label = _("Mood")
         self.fields["mood"].empty_label = None
-        self.fields["mood"].initial = Mood.objects.get(value=0)
+        self.fields["mood"].initial = reference_data.get_mood_by_value(0)
         self.fields["details"].label = _("Details")
         self.fields["details"].widget.attrs.update(
             {
@@ -124,3 +125,99 @@ class MoodDiaryEntryCreateForm(MoodDiaryEntryForm):
                 self.add_error("end_date", _("End date must be after start date."))
 
         return cleaned_data
+
+
+class ReferenceDataChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField looking up the chosen object in the process-local reference data
+    instead of querying the database, so that many forms can be validated at once.
+    """
+
+    def __init__(self, *args, get_object: callable, **kwargs):
+        self.get_object = get_object
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.get_object(int(value))
+        except (ValueError, TypeError, self.queryset.model.DoesNotExist):
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+
+
+class ReferenceDataFormMixin:
+    """
+    Mixin for mood diary entry forms validating many entries at once, e.g. entries recorded
+    while offline, which looks up moods and activities in the reference data instead of
+    querying the database for each form.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, get_object in [
+            ("mood", reference_data.get_mood),
+            ("activity", reference_data.get_activity),
+        ]:
+            field = self.fields[name]
+            self.fields[name] = ReferenceDataChoiceField(
+                queryset=field.queryset, get_object=get_object, label=field.label
+            )
+
+    def _get_validation_exclusions(self) -> set[str]:
+        # Moods and activities have been validated against the reference data already,
+        # so the model must not check their existence in the database once more
+        return super()._get_validation_exclusions() | {"mood", "activity"}
+
+
+class MoodDiaryEntryImportForm(ReferenceDataFormMixin, MoodDiaryEntryCreateForm):
+    """
+    Form for validating one of many mood diary entries created at once.
+    Validates the same way as MoodDiaryEntryCreateForm, but limits the number of days an
+    entry may span, as each day is stored as a separate entry.
+    """
+
+    max_days = 31
+
+    def clean(self) -> dict:
+        """
+        Ensure that the entry does not span more than `max_days` days.
+
+        Returns
+        -------
+        dict
+            Cleaned form data
+        """
+        cleaned_data = super().clean()
+        if self.get_days() > self.max_days:
+            self.add_error(
+                "end_date",
+                _("An entry must not span more than %(max_days)s days.")
+                % {"max_days": self.max_days},
+            )
+        return cleaned_data
+
+    def get_days(self) -> int:
+        """
+        Get the number of days the entry spans, i.e. the number of entries created from it.
+
+        Returns
+        -------
+        int
+        """
+        start_date = self.cleaned_data.get("date")
+        end_date = self.cleaned_data.get("end_date")
+        if not start_date or not end_date:
+            return 1
+        return max((end_date - start_date).days + 1, 1)
+
+
+class MoodDiaryEntrySyncUpdateForm(ReferenceDataFormMixin, MoodDiaryEntryForm):
+    """
+    Form for validating one of many mood diary entries updated at once.
+    Validates the same way as MoodDiaryEntryForm.
+    """
@@ -0,0 +1,49 @@
+from itertools import groupby
+
+from diaries.models import DailyMoodSummary, MoodDiaryEntry
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+
+class Command(BaseCommand):
+    """
+    Management command to (re-)calculate the daily mood summaries
+    from all existing mood diary entries.
+    """
+
+    help = "Calculate the daily mood summaries from all existing mood diary entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--client",
+            type=int,
+            default=None,
+            help="Only calculate the summaries for the client with the given id.",
+        )
+
+    def handle(self, *args, **options):
+        entries = MoodDiaryEntry.objects.all()
+        summaries = DailyMoodSummary.objects.all()
+        if options["client"] is not None:
+            entries = entries.filter(mood_diary__client_id=options["client"])
+            summaries = summaries.filter(mood_diary__client_id=options["client"])
+        # Summaries of days without any entries left
+        summaries.exclude(
+            Exists(
+                MoodDiaryEntry.objects.filter(
+                    mood_diary_id=OuterRef("mood_diary_id"), date=OuterRef("date")
+                )
+            )
+        ).delete()
+        days = (
+            entries.order_by("mood_diary_id", "date")
+            .values_list("mood_diary_id", "date")
+            .distinct()
+        )
+        count = 0
+        # Refresh all days of a mood diary at once, using a constant number of queries
+        for mood_diary_id, diary_days in groupby(days.iterator(), key=lambda day: day[0]):
+            count += len(
+                DailyMoodSummary.refresh_days(mood_diary_id, [day for _, day in diary_days])
+            )
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} daily mood summaries."))
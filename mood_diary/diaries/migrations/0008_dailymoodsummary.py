@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0007_remove_mooddiaryentry_emotion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMoodSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('entry_count', models.PositiveIntegerField()),
+                ('average_mood', models.FloatField()),
+                ('max_mood', models.IntegerField()),
+                ('min_mood', models.IntegerField()),
+                ('meal_count', models.PositiveIntegerField()),
+                ('media_duration', models.DurationField(default=None, null=True)),
+                ('sports_duration', models.DurationField(default=None, null=True)),
+                ('mood_diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='diaries.mooddiary')),
+            ],
+            options={
+                'db_table': 'diaries_daily_mood_summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailymoodsummary',
+            constraint=models.UniqueConstraint(fields=('mood_diary', 'date'), name='unique_daily_mood_summary_per_day'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0008_dailymoodsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mooddiaryentry',
+            index=models.Index(fields=['mood_diary', '-date', '-start_time'], name='diaries_entry_diary_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mooddiaryentry',
+            index=models.Index(fields=['mood_diary', '-updated_at'], name='diaries_entry_diary_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mooddiaryentry',
+            index=models.Index(condition=models.Q(('released', True)), fields=['mood_diary', '-date', '-start_time'], name='diaries_entry_released_idx'),
+        ),
+    ]
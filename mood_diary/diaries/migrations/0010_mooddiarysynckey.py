@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaries', '0009_mooddiaryentry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodDiarySyncKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mood_diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_keys', to='diaries.mooddiary')),
+            ],
+            options={
+                'db_table': 'diaries_mood_diary_sync_keys',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mooddiarysynckey',
+            constraint=models.UniqueConstraint(fields=('mood_diary', 'key'), name='diaries_sync_key_unique'),
+        ),
+    ]
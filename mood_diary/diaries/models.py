@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from datetime import date
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
 
 from clients.models import Client
 from core.models import NormalizedScaleModel, NormalizedStringValueModel, TrackCreationAndUpdates
-from django.db import models
-from django.db.models import Avg, QuerySet
+from diaries.dispatch import mood_diary_entries_bulk_created
+from django.db import models, transaction
+from django.db.models import QuerySet
 
 
 class MoodDiary(models.Model):
@@ -33,13 +36,10 @@ class MoodDiary(models.Model):
         Returns
         -------
         QuerySet
-            MoodDiary entities grouped by date and with an aggregated average mood score.
+            Dates with the average mood score of the respective day, read from the
+            daily mood summaries.
         """
-        return (
-            self.entries.order_by("-date")
-            .values("date")
-            .annotate(average_mood=Avg("mood__value"))[:n_days]
-        )
+        return self.daily_summaries.order_by("-date").values("date", "average_mood")[:n_days]
 
     def most_recent_mood_highlights(self, n_highlights: int) -> QuerySet[MoodDiaryEntry]:
         """
@@ -75,6 +75,20 @@ class MoodDiaryEntry(TrackCreationAndUpdates):
     class Meta:
         db_table = "diaries_mood_diary_entries"
         ordering = ["-date", "-start_time"]
+        indexes = [
+            # Entries of a diary by date, in the default ordering (lists, rules)
+            models.Index(
+                fields=["mood_diary", "-date", "-start_time"], name="diaries_entry_diary_date_idx"
+            ),
+            # Entry of a diary edited last (event-based rules)
+            models.Index(fields=["mood_diary", "-updated_at"], name="diaries_entry_diary_upd_idx"),
+            # Released entries of a diary, in the default ordering (counselor views)
+            models.Index(
+                fields=["mood_diary", "-date", "-start_time"],
+                condition=models.Q(released=True),
+                name="diaries_entry_released_idx",
+            ),
+        ]
 
     mood_diary = models.ForeignKey(to=MoodDiary, on_delete=models.CASCADE, related_name="entries")
     released = models.BooleanField(default=False)
@@ -89,6 +103,263 @@ class MoodDiaryEntry(TrackCreationAndUpdates):
     )
     details = models.TextField(null=True, blank=True, default=None)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values to be able to tell which day an entry was moved from
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @property
+    def duration(self) -> timedelta:
+        return datetime.combine(self.date, self.end_time) - datetime.combine(
+            self.date, self.start_time
+        )
+
+    def split_into_days(self, end_date: date) -> list[MoodDiaryEntry]:
+        """
+        Split an (unsaved) entry lasting from its date and start time until the given end date
+        and its end time into one unsaved entry per day. All days but the first one start at
+        midnight and all days but the last one end just before midnight.
+
+        Parameters
+        ----------
+        end_date: date
+
+        Returns
+        -------
+        list[MoodDiaryEntry]
+        """
+        values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+        }
+        days_between = (end_date - self.date).days
+        slices = []
+        for index in range(days_between + 1):
+            entry = MoodDiaryEntry(**values)
+            entry.date = self.date + timedelta(days=index)
+            entry.start_time = self.start_time if index == 0 else time(0, 0, 0)
+            entry.end_time = self.end_time if index == days_between else time(23, 59, 59)
+            slices.append(entry)
+        return slices
+
+    @classmethod
+    def bulk_create_days(cls, entry: MoodDiaryEntry, end_date: date) -> list[MoodDiaryEntry]:
+        """
+        Create one entry per day for an (unsaved) entry spanning several days
+        (see `bulk_create_entries`).
+
+        Parameters
+        ----------
+        entry: MoodDiaryEntry
+            Unsaved entry holding the first day, start time, end time and all other values.
+        end_date: date
+
+        Returns
+        -------
+        list[MoodDiaryEntry]
+            The created entries, ordered by date.
+        """
+        return cls.bulk_create_entries(entry.mood_diary_id, [(entry, end_date)])
+
+    @classmethod
+    def bulk_create_entries(
+        cls, mood_diary_id: int, entries: list[tuple[MoodDiaryEntry, date]]
+    ) -> list[MoodDiaryEntry]:
+        """
+        Create many (unsaved) entries of a mood diary at once, each of which may span
+        several days and is split into one entry per day.
+        All entries are inserted with a single query within one transaction and the
+        daily mood summaries of the affected days are refreshed in bulk, as bulk
+        creation does not send `post_save` (`mood_diary_entries_bulk_created` is sent
+        once for all entries instead).
+
+        Parameters
+        ----------
+        mood_diary_id: int
+        entries: list[tuple[MoodDiaryEntry, date]]
+            Unsaved entries holding the first day, start time, end time and all other
+            values, each along with its end date.
+
+        Returns
+        -------
+        list[MoodDiaryEntry]
+            The created entries, in the given order and ordered by date per given entry.
+        """
+        days = []
+        for entry, end_date in entries:
+            entry.mood_diary_id = mood_diary_id
+            days.extend(entry.split_into_days(end_date))
+        with transaction.atomic():
+            days = cls.objects.bulk_create(days)
+            DailyMoodSummary.refresh_days(mood_diary_id, {day.date for day in days})
+        mood_diary_entries_bulk_created.send(sender=cls, mood_diary_id=mood_diary_id, entries=days)
+        return days
+
+
+class MoodDiarySyncKey(models.Model):
+    """
+    This is the MoodDiarySyncKey model representing the idempotency key of a write to
+    a mood diary that was queued by the PWA while offline and has been applied.
+    Queued writes may be replayed more than once (e.g. if the connection drops before the
+    response arrives), so writes with keys that have been applied already are skipped.
+    """
+
+    class Meta:
+        db_table = "diaries_mood_diary_sync_keys"
+        constraints = [
+            models.UniqueConstraint(fields=["mood_diary", "key"], name="diaries_sync_key_unique")
+        ]
+
+    # Keys are kept for as long as queued writes might be replayed
+    retention = timedelta(days=30)
+
+    mood_diary = models.ForeignKey(to=MoodDiary, on_delete=models.CASCADE, related_name="sync_keys")
+    key = models.UUIDField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class DailyMoodSummary(models.Model):
+    """
+    This is the DailyMoodSummary model holding aggregated values of all mood diary
+    entries of a mood diary for one day.
+    Summaries are kept up to date whenever mood diary entries are created, updated
+    or deleted, so that evaluations spanning several days do not need to aggregate
+    the entries again.
+    """
+
+    class Meta:
+        db_table = "diaries_daily_mood_summaries"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["mood_diary", "date"], name="unique_daily_mood_summary_per_day"
+            )
+        ]
+
+    mood_diary = models.ForeignKey(
+        to=MoodDiary, on_delete=models.CASCADE, related_name="daily_summaries"
+    )
+    date = models.DateField()
+    entry_count = models.PositiveIntegerField()
+    average_mood = models.FloatField()
+    max_mood = models.IntegerField()
+    min_mood = models.IntegerField()
+    meal_count = models.PositiveIntegerField()
+    # Null if no entries of the respective kind exist for the day
+    media_duration = models.DurationField(null=True, default=None)
+    sports_duration = models.DurationField(null=True, default=None)
+
+    @classmethod
+    def refresh(cls, mood_diary_id: int, day: date) -> DailyMoodSummary | None:
+        """
+        Recalculate the summary of a mood diary for a given day from its entries.
+        If there are no entries for the day (anymore), the summary is deleted.
+
+        Parameters
+        ----------
+        mood_diary_id: int
+        day: date
+
+        Returns
+        -------
+        DailyMoodSummary | None
+        """
+        entries = list(
+            MoodDiaryEntry.objects.filter(mood_diary_id=mood_diary_id, date=day).select_related(
+                "mood", "activity__category"
+            )
+        )
+        if not entries:
+            cls.objects.filter(mood_diary_id=mood_diary_id, date=day).delete()
+            return None
+        summary, _ = cls.objects.update_or_create(
+            mood_diary_id=mood_diary_id, date=day, defaults=cls.aggregate_entries(entries)
+        )
+        return summary
+
+    @classmethod
+    def refresh_days(cls, mood_diary_id: int, days: Iterable[date]) -> list[DailyMoodSummary]:
+        """
+        Recalculate the summaries of a mood diary for several days at once, using a constant
+        number of queries: All entries of the days are fetched together and the summaries
+        are inserted or updated with a single bulk upsert.
+        Summaries of days without any entries (anymore) are deleted.
+
+        Parameters
+        ----------
+        mood_diary_id: int
+        days: Iterable[date]
+
+        Returns
+        -------
+        list[DailyMoodSummary]
+        """
+        days = set(days)
+        entries_per_day = defaultdict(list)
+        for entry in MoodDiaryEntry.objects.filter(
+            mood_diary_id=mood_diary_id, date__in=days
+        ).select_related("mood", "activity__category"):
+            entries_per_day[entry.date].append(entry)
+        if empty_days := days - set(entries_per_day):
+            cls.objects.filter(mood_diary_id=mood_diary_id, date__in=empty_days).delete()
+        summaries = [
+            cls(mood_diary_id=mood_diary_id, date=day, **cls.aggregate_entries(entries))
+            for day, entries in sorted(entries_per_day.items())
+        ]
+        return cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["mood_diary", "date"],
+            update_fields=[
+                "entry_count",
+                "average_mood",
+                "max_mood",
+                "min_mood",
+                "meal_count",
+                "media_duration",
+                "sports_duration",
+            ],
+        )
+
+    @staticmethod
+    def aggregate_entries(entries: list[MoodDiaryEntry]) -> dict:
+        """
+        Calculate the values of a summary from the (non-empty) list of entries of one day.
+
+        Parameters
+        ----------
+        entries: list[MoodDiaryEntry]
+
+        Returns
+        -------
+        dict
+            Values of the summary fields.
+        """
+        mood_values = [entry.mood.value for entry in entries]
+        media_durations = [
+            entry.duration
+            for entry in entries
+            if entry.activity.category.value == ActivityCategory.media_usage_value
+        ]
+        sports_durations = [
+            entry.duration for entry in entries if entry.activity.value == Activity.sports_value
+        ]
+        return {
+            "entry_count": len(entries),
+            "average_mood": sum(mood_values) / len(mood_values),
+            "max_mood": max(mood_values),
+            "min_mood": min(mood_values),
+            "meal_count": sum(
+                entry.activity.category.value == ActivityCategory.food_intake_value
+                for entry in entries
+            ),
+            "media_duration": sum(media_durations, timedelta()) if media_durations else None,
+            "sports_duration": sum(sports_durations, timedelta()) if sports_durations else None,
+        }
+
 
 class Mood(NormalizedScaleModel):
     """
@@ -113,17 +384,6 @@ class Mood(NormalizedScaleModel):
         """
         return int(self.value / 7 * 100)
 
-    @staticmethod
-    def max_value() -> int:
-        """
-        Return the maximum value of the mood scale.
-
-        Returns
-        -------
-        int
-        """
-        return 3
-
 
 class Activity(NormalizedStringValueModel):
     """
@@ -0,0 +1,140 @@
+from core.caches import VersionedProcessCache
+from diaries.models import Activity, ActivityCategory, Mood
+
+
+class ReferenceData(VersionedProcessCache):
+    """
+    Process-local cache of the reference data of mood diaries, i.e. the mood scale and
+    the activity catalog, keyed by id (and value for moods).
+    The version is renewed whenever a mood, activity or activity category is edited
+    (e.g. in the admin, see diaries.signals).
+    """
+
+    version_cache_key = "diaries:reference-data:version"
+
+    def fetch(self) -> dict:
+        moods = list(Mood.objects.order_by("value"))
+        categories_by_id = {category.id: category for category in ActivityCategory.objects.all()}
+        activities = list(Activity.objects.all())
+        for activity in activities:
+            activity.category = categories_by_id[activity.category_id]
+        return {
+            "moods": moods,
+            "moods_by_id": {mood.id: mood for mood in moods},
+            "moods_by_value": {mood.value: mood for mood in moods},
+            "activities": activities,
+            "activities_by_id": {activity.id: activity for activity in activities},
+            "categories_by_id": categories_by_id,
+        }
+
+    def moods(self) -> list[Mood]:
+        """
+        Get the mood scale, ordered by value.
+
+        Returns
+        -------
+        list[Mood]
+        """
+        return self._collection("moods")
+
+    def get_mood(self, mood_id: int) -> Mood:
+        """
+        Get the mood with the given id.
+
+        Parameters
+        ----------
+        mood_id: int
+
+        Returns
+        -------
+        Mood
+
+        Raises
+        ------
+        Mood.DoesNotExist
+        """
+        return self._get("moods_by_id", mood_id, Mood)
+
+    def get_mood_by_value(self, value: int) -> Mood:
+        """
+        Get the mood with the given value on the mood scale.
+
+        Parameters
+        ----------
+        value: int
+
+        Returns
+        -------
+        Mood
+
+        Raises
+        ------
+        Mood.DoesNotExist
+        """
+        return self._get("moods_by_value", value, Mood)
+
+    def mood_max_value(self) -> int:
+        """
+        Get the maximum value of the mood scale.
+
+        Returns
+        -------
+        int
+
+        Raises
+        ------
+        Mood.DoesNotExist
+            If there are no moods.
+        """
+        if not (moods := self.moods()):
+            raise Mood.DoesNotExist("The mood scale is empty.")
+        return moods[-1].value
+
+    def activities(self) -> list[Activity]:
+        """
+        Get all activities along with their categories, in the default ordering.
+
+        Returns
+        -------
+        list[Activity]
+        """
+        return self._collection("activities")
+
+    def get_activity(self, activity_id: int) -> Activity:
+        """
+        Get the activity with the given id, along with its category.
+
+        Parameters
+        ----------
+        activity_id: int
+
+        Returns
+        -------
+        Activity
+
+        Raises
+        ------
+        Activity.DoesNotExist
+        """
+        return self._get("activities_by_id", activity_id, Activity)
+
+    def get_category(self, category_id: int) -> ActivityCategory:
+        """
+        Get the activity category with the given id.
+
+        Parameters
+        ----------
+        category_id: int
+
+        Returns
+        -------
+        ActivityCategory
+
+        Raises
+        ------
+        ActivityCategory.DoesNotExist
+        """
+        return self._get("categories_by_id", category_id, ActivityCategory)
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,47 @@
+from diaries.models import Activity, ActivityCategory, DailyMoodSummary, Mood, MoodDiaryEntry
+from diaries.reference import reference_data
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=MoodDiaryEntry)
+def refresh_daily_mood_summary_on_save(sender, instance: MoodDiaryEntry, **kwargs):
+    """
+    Refresh the daily mood summary of the day the saved entry belongs to.
+    If the entry was moved to another day (or mood diary), the summary of
+    the day it was moved from is refreshed as well.
+    """
+    loaded_values = getattr(instance, "_loaded_values", {})
+    previous_day = (loaded_values.get("mood_diary_id"), loaded_values.get("date"))
+    current_day = (instance.mood_diary_id, instance.date)
+    DailyMoodSummary.refresh(*current_day)
+    if None not in previous_day and previous_day != current_day:
+        DailyMoodSummary.refresh(*previous_day)
+    instance._loaded_values = {
+        **loaded_values,
+        "mood_diary_id": current_day[0],
+        "date": current_day[1],
+    }
+
+
+@receiver(post_delete, sender=MoodDiaryEntry)
+def refresh_daily_mood_summary_on_delete(sender, instance: MoodDiaryEntry, **kwargs):
+    """
+    Refresh the daily mood summary of the day the deleted entry belonged to.
+    """
+    DailyMoodSummary.refresh(instance.mood_diary_id, instance.date)
+
+
+@receiver(post_save, sender=Mood)
+@receiver(post_delete, sender=Mood)
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+@receiver(post_save, sender=ActivityCategory)
+@receiver(post_delete, sender=ActivityCategory)
+def invalidate_reference_data(sender, **kwargs):
+    """
+    Make all processes reload the mood scale and the activity catalog when they are edited,
+    once the transaction has been committed (see rules.signals.invalidate_rule_registry).
+    """
+    transaction.on_commit(reference_data.invalidate)
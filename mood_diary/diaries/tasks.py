@@ -1,19 +1,76 @@
 import logging
+from bisect import bisect_right
 from datetime import timedelta
+from itertools import batched
 
-from celery import shared_task
+from celery import group, shared_task
 from clients.models import Client
+from diaries.models import MoodDiarySyncKey
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from rules.rules import EVENT_BASED_RULES, TIME_BASED_RULES
-from rules.utils import RuleMessage
+from rules.snapshots import ClientFeatureSnapshot
+from rules.subscriptions import RuleSubscriptions
+from rules.triggers import RuleTriggerHistory
+from rules.utils import RuleBatchMessage, RuleMessage
 
 logger = logging.getLogger("mood_diary.diaries.tasks")
 
+TIME_BASED_RULES_CHUNK_SIZE = 500
+# Progress of a run of time-based rule evaluation can be resumed until the next run
+TIME_BASED_RULES_PROGRESS_TIMEOUT = 60 * 60 * 24
+# Upper bound for how long an evaluation may be pending, e.g. if a worker dies before running it
+EVENT_BASED_RULES_PENDING_TIMEOUT = 5 * 60
+
+
+def get_pending_evaluation_cache_key(client_id: int) -> str:
+    return f"rules:event-based:{client_id}:pending"
+
+
+def get_latest_timestamp_cache_key(client_id: int) -> str:
+    return f"rules:event-based:{client_id}:latest-timestamp"
+
+
+def schedule_event_based_rules_evaluation(msg: RuleMessage):
+    """
+    Schedule the evaluation of event-based rules for a client, coalescing bursts of requests.
+    The latest requested timestamp of the client is kept in the cache. Only the first request
+    of a burst enqueues an evaluation task (delayed by a short countdown) and marks it as
+    pending. All further requests arriving until the task starts only update the timestamp,
+    so that a single evaluation covers all of them.
+
+    Parameters
+    ----------
+    msg: RuleMessage
+        Holding a timestamp at which rule evaluation was requested and a client id.
+
+    Returns
+    -------
+    None
+    """
+    timestamp_key = get_latest_timestamp_cache_key(msg.client_id)
+    latest_timestamp = cache.get(timestamp_key)
+    if latest_timestamp is None or msg.timestamp > latest_timestamp:
+        cache.set(timestamp_key, msg.timestamp, timeout=EVENT_BASED_RULES_PENDING_TIMEOUT)
+    # The timestamp has to be stored before checking the marker: Once the marker is gone,
+    # the pending task is about to read the latest timestamp.
+    if cache.add(
+        get_pending_evaluation_cache_key(msg.client_id),
+        True,
+        timeout=EVENT_BASED_RULES_PENDING_TIMEOUT,
+    ):
+        task_event_based_rules_evaluation.apply_async(
+            (msg,), countdown=settings.EVENT_BASED_RULES_EVALUATION_COUNTDOWN
+        )
+
 
 @shared_task
 def task_event_based_rules_evaluation(msg: RuleMessage):
     """
     Task to evaluate event-based rules for a client.
+    If further evaluations have been requested for the client since the task was scheduled
+    (see `schedule_event_based_rules_evaluation`), the latest timestamp is evaluated instead.
 
     Parameters
     ----------
@@ -24,46 +81,176 @@ def task_event_based_rules_evaluation(msg: RuleMessage):
     -------
     None
     """
+    # Messages arrive as plain lists from the JSON serializer
+    msg = RuleMessage(*msg)
+    # Requests arriving from now on schedule a new evaluation
+    cache.delete(get_pending_evaluation_cache_key(msg.client_id))
+    latest_timestamp = cache.get(get_latest_timestamp_cache_key(msg.client_id))
+    if latest_timestamp is not None and latest_timestamp > msg.timestamp:
+        msg = RuleMessage(client_id=msg.client_id, timestamp=latest_timestamp)
     logger.info(f"Event-based Rule Evaluation: {msg}")
+    subscriptions = RuleSubscriptions.load([msg.client_id])
+    if not subscriptions.has_subscriptions(msg.client_id):
+        return
+    snapshot = ClientFeatureSnapshot.load(*msg)
+    trigger_history = RuleTriggerHistory.load([msg.client_id])
     for rule_class in EVENT_BASED_RULES:
-        rule = rule_class(*msg)
+        rule = rule_class(
+            *msg, snapshot=snapshot, subscriptions=subscriptions, trigger_history=trigger_history
+        )
         rule.evaluate()
 
 
+def get_chunk_bounds_cache_key(timestamp: timezone.datetime) -> str:
+    return f"rules:time-based:{timestamp.isoformat()}:chunk-bounds"
+
+
+def get_chunk_done_cache_key(
+    timestamp: timezone.datetime, after_client_id: int, last_client_id: int
+) -> str:
+    return f"rules:time-based:{timestamp.isoformat()}:chunk:{after_client_id}-{last_client_id}:done"
+
+
+def split_into_chunks(client_ids: list[int], bounds: list[int]) -> list[tuple[int, list[int]]]:
+    """
+    Split the sorted ids of clients into chunks at the given bounds, i.e. the ids of the
+    last client of each chunk. Chunk i holds all ids greater than bound i-1 and up to
+    bound i, so that clients (de)activated in the meantime do not shift the other chunks.
+    Ids greater than the last bound are split into new chunks of at most
+    `TIME_BASED_RULES_CHUNK_SIZE` ids, whose bounds are appended to the given ones.
+
+    Parameters
+    ----------
+    client_ids: list[int]
+        Sorted ids of the clients.
+    bounds: list[int]
+        Sorted ids of the last client of each chunk, extended in place.
+
+    Returns
+    -------
+    list[tuple[int, list[int]]]
+        The id after which each chunk starts, along with the ids of its clients.
+    """
+    chunks = []
+    position = 0
+    after_client_id = 0
+    for bound in bounds:
+        end = bisect_right(client_ids, bound, lo=position)
+        chunks.append((after_client_id, client_ids[position:end]))
+        position, after_client_id = end, bound
+    for chunk in batched(client_ids[position:], TIME_BASED_RULES_CHUNK_SIZE):
+        chunks.append((after_client_id, list(chunk)))
+        bounds.append(after_client_id := chunk[-1])
+    return chunks
+
+
 @shared_task
-def task_time_based_rules_init():
+def task_time_based_rules_init(timestamp: timezone.datetime = None):
     """
-    Task to initialize the evaluation of event-based rules for all clients.
+    Task to initialize the evaluation of time-based rules for all clients.
     This task will run daily at 6 am, setting the timestamp for rule evaluation
     to the previous day at 23:59:59.
+    The ids of all active clients are loaded at once (a few bytes per client) and split
+    into chunks of `TIME_BASED_RULES_CHUNK_SIZE` clients, each of which is evaluated as a batch by
+    one task of a group, so that the number of queries and messages scales with the
+    number of chunks instead of the number of clients.
+    The id ranges of the chunks are stored with the run, and chunks that have already been
+    evaluated for the timestamp are skipped, so that a crashed run can be resumed by
+    running the task again with the same timestamp, even if clients have been
+    (de)activated since.
+
+    Parameters
+    ----------
+    timestamp: timezone.datetime
+        Timestamp of a previous run to resume, defaults to the end of the previous day.
 
     Returns
     -------
     None
     """
-    for client in Client.objects.filter(active=True):
-        timestamp = (timezone.now() - timedelta(days=1)).replace(
-            hour=23, minute=59, second=59, microsecond=999999
+    timestamp = timestamp or (timezone.now() - timedelta(days=1)).replace(
+        hour=23, minute=59, second=59, microsecond=999999
+    )
+    client_ids = list(
+        Client.objects.filter(active=True).order_by("id").values_list("id", flat=True)
+    )
+    bounds_key = get_chunk_bounds_cache_key(timestamp)
+    bounds = cache.get(bounds_key) or []
+    chunks = [
+        (after_client_id, chunk)
+        for after_client_id, chunk in split_into_chunks(client_ids, bounds)
+        if chunk
+    ]
+    cache.set(bounds_key, bounds, timeout=TIME_BASED_RULES_PROGRESS_TIMEOUT)
+    done = cache.get_many(
+        [
+            get_chunk_done_cache_key(timestamp, after_client_id, chunk[-1])
+            for after_client_id, chunk in chunks
+        ]
+    )
+    tasks = [
+        task_time_based_rules_batch_evaluation.s(
+            RuleBatchMessage(chunk, timestamp), chunk=(after_client_id, chunk[-1])
         )
-        msg = RuleMessage(client.id, timestamp)
-        task_time_based_rules_evaluation.delay(msg)
+        for after_client_id, chunk in chunks
+        if get_chunk_done_cache_key(timestamp, after_client_id, chunk[-1]) not in done
+    ]
+    logger.info(
+        f"Time-based Rule Evaluation: {len(tasks)} of {len(chunks)} chunks pending for {timestamp}"
+    )
+    if tasks:
+        group(tasks).apply_async()
 
 
 @shared_task
-def task_time_based_rules_evaluation(msg: RuleMessage):
+def task_time_based_rules_batch_evaluation(msg: RuleBatchMessage, chunk: tuple[int, int] = None):
     """
-    Task to evaluate time-based rules for a client.
+    Task to evaluate time-based rules for a cohort of clients at once.
+    If the cohort is a chunk of a scheduled run (see `task_time_based_rules_init`),
+    its completion is recorded once all rules have been evaluated.
 
     Parameters
     ----------
-    msg: RuleMessage
-        Holding a timestamp at which rule evaluation was requested and a client id.
+    msg: RuleBatchMessage
+        Holding a timestamp at which rule evaluation was requested and the client ids.
+    chunk: tuple[int, int]
+        Id range of the chunk within the run, i.e. the id after which it starts and the id
+        of its last client.
 
     Returns
     -------
     None
     """
-    logger.info(f"Time-based Rule Evaluation: {msg}")
+    # Messages arrive as plain lists from the JSON serializer
+    msg = RuleBatchMessage(*msg)
+    logger.info(f"Time-based Rule Batch Evaluation: {msg}")
+    subscriptions = RuleSubscriptions.load(msg.client_ids)
+    trigger_history = RuleTriggerHistory.load(msg.client_ids)
     for rule_class in TIME_BASED_RULES:
-        rule = rule_class(*msg)
-        rule.evaluate()
+        triggered_client_ids = rule_class.evaluate_batch(
+            *msg, subscriptions=subscriptions, trigger_history=trigger_history
+        )
+        logger.info(f"{rule_class.rule_title} triggered for {len(triggered_client_ids)} clients")
+    if chunk is not None:
+        cache.set(
+            get_chunk_done_cache_key(msg.timestamp, *chunk),
+            True,
+            timeout=TIME_BASED_RULES_PROGRESS_TIMEOUT,
+        )
+
+
+@shared_task
+def task_prune_sync_keys():
+    """
+    Task to delete idempotency keys of writes replayed from the offline queue of the PWA
+    once they are past their retention period.
+    This task will run daily.
+
+    Returns
+    -------
+    None
+    """
+    _, deleted = MoodDiarySyncKey.objects.filter(
+        created_at__lt=timezone.now() - MoodDiarySyncKey.retention
+    ).delete()
+    logger.info(f"Pruned {deleted.get('diaries.MoodDiarySyncKey', 0)} sync keys")
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from diaries.catalog import ActivityCatalog, activity_search, normalize, trigrams
+from diaries.reference import reference_data
+from diaries.tests.factories import ActivityCategoryFactory, ActivityFactory
+from django.utils import translation
+
+
+@pytest.fixture
+def activities():
+    food = ActivityCategoryFactory.create(value="Food", value_de="Essen", value_en="Food")
+    social = ActivityCategoryFactory.create(value="Social", value_de="Soziales", value_en="Social")
+    return [
+        ActivityFactory.create(category=food, value="Meal", value_de="Mahlzeit", value_en="Meal"),
+        ActivityFactory.create(category=food, value="Snack", value_de="Snack", value_en="Snack"),
+        ActivityFactory.create(
+            category=social,
+            value="Meeting friends",
+            value_de="Freund*innen treffen",
+            value_en="Meeting friends",
+        ),
+        ActivityFactory.create(
+            category=social, value="Phone call", value_de="Telefonat", value_en="Phone call"
+        ),
+    ]
+
+
+def test_normalize():
+    assert normalize("Ärger Über") == "arger uber"
+    assert trigrams("snack") == {"sna", "nac", "ack"}
+    assert trigrams("sn") == set()
+
+
+@pytest.mark.django_db
+def test_activity_catalog_search(activities):
+    meal, snack, meeting, phone_call = activities
+    catalog = ActivityCatalog(reference_data.activities(), "de")
+
+    def search(term, max_results=200, page=1):
+        return json.loads(catalog.search(term, max_results, page))
+
+    def group(*activities):
+        with translation.override("de"):
+            return {
+                "text": str(activities[0].category),
+                "children": [{"id": activity.id, "text": str(activity)} for activity in activities],
+            }
+
+    assert search("") == {
+        "results": [group(meal, snack), group(meeting, phone_call)],
+        "more": False,
+    }
+    # Activities are found by their values and categories in any language
+    assert [entry.id for entry in catalog.find("meal")] == [meal.id]
+    assert [entry.id for entry in catalog.find(normalize("SOZIAL"))] == [meeting.id, phone_call.id]
+    assert [entry.id for entry in catalog.find("food")] == [meal.id, snack.id]
+    # Short terms are matched without the trigram index
+    assert [entry.id for entry in catalog.find("ph")] == [phone_call.id]
+    assert catalog.find("xyz") == []
+    # Each word of a term has to match the value or category of an activity
+    assert [entry.id for entry in catalog.find("essen snack")] == [snack.id]
+    assert [entry.id for entry in catalog.find("social ph")] == [phone_call.id]
+    assert [entry.id for entry in catalog.find("meeting friends")] == [meeting.id]
+    assert catalog.find("food friends") == []
+    assert search("Food  Snack") == {"results": [group(snack)], "more": False}
+    assert search(" Telefonat ") == {"results": [group(phone_call)], "more": False}
+    assert search("", max_results=1) == {"results": [group(meal)], "more": True}
+    # Further pages are requested when scrolling
+    assert search("", max_results=3, page=2) == {"results": [group(phone_call)], "more": False}
+    assert search("", max_results=3, page=3) == {"results": [], "more": False}
+
+    catalog = ActivityCatalog(reference_data.activities(), "en")
+    with translation.override("en"):
+        assert [group["text"] for group in json.loads(catalog.search("", 200))["results"]] == [
+            str(meal.category),
+            str(meeting.category),
+        ]
+
+
+@pytest.mark.django_db
+def test_activity_search(activities, django_assert_num_queries, django_capture_on_commit_callbacks):
+    catalog = activity_search.get_catalog("de")
+    with django_assert_num_queries(0):
+        assert activity_search.get_catalog("de") is catalog
+        catalog.search("snack", 200)
+
+    # The catalog is rebuilt when activities are edited
+    with django_capture_on_commit_callbacks(execute=True):
+        activities[1].value_de = "Zwischenmahlzeit"
+        activities[1].save()
+    catalog = activity_search.get_catalog("de")
+    assert [entry.id for entry in catalog.find("zwischen")] == [activities[1].id]
@@ -0,0 +1,54 @@
+import pytest
+from diaries.models import DailyMoodSummary
+from diaries.tests.factories import MoodDiaryEntryFactory
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+def test_backfill_daily_mood_summaries():
+    entry = MoodDiaryEntryFactory.create(date="2023-10-01", mood__value=1)
+    MoodDiaryEntryFactory.create(mood_diary=entry.mood_diary, date="2023-10-01", mood__value=3)
+    MoodDiaryEntryFactory.create(mood_diary=entry.mood_diary, date="2023-10-02", mood__value=-1)
+    other_entry = MoodDiaryEntryFactory.create(date="2023-10-01")
+    # Simulate summaries that are missing or outdated
+    DailyMoodSummary.objects.all().delete()
+    DailyMoodSummary.objects.create(
+        mood_diary=entry.mood_diary,
+        date="2023-09-01",
+        entry_count=1,
+        average_mood=0,
+        max_mood=0,
+        min_mood=0,
+        meal_count=0,
+    )
+
+    call_command("backfill_daily_mood_summaries", client=other_entry.mood_diary.client_id)
+    assert DailyMoodSummary.objects.count() == 2
+
+    call_command("backfill_daily_mood_summaries")
+    assert DailyMoodSummary.objects.count() == 3
+    assert not DailyMoodSummary.objects.filter(date="2023-09-01").exists()
+    summary = DailyMoodSummary.objects.get(mood_diary=entry.mood_diary, date="2023-10-01")
+    assert summary.entry_count == 2
+    assert summary.average_mood == 2
+
+
+@pytest.mark.django_db
+def test_backfill_daily_mood_summaries_queries():
+    entry = MoodDiaryEntryFactory.create(date="2023-10-01")
+    MoodDiaryEntryFactory.create(date="2023-10-01")
+
+    query_counts = []
+    for days in [1, 5]:
+        for day in range(2, days + 1):
+            MoodDiaryEntryFactory.create(mood_diary=entry.mood_diary, date=f"2023-10-{day:02}")
+        DailyMoodSummary.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("backfill_daily_mood_summaries")
+        query_counts.append(len(queries))
+        assert DailyMoodSummary.objects.count() == days + 1
+
+    # The number of queries only grows with the number of mood diaries, not of days
+    assert query_counts[0] == query_counts[1]
@@ -1,5 +1,10 @@
 import pytest
-from diaries.forms import ActivityWidget, MoodDiaryEntryCreateForm, MoodDiaryEntryForm
+from diaries.forms import (
+    ActivityWidget,
+    MoodDiaryEntryCreateForm,
+    MoodDiaryEntryForm,
+    MoodDiaryEntryImportForm,
+)
 from diaries.tests.factories import ActivityFactory, MoodFactory
 from django.urls import reverse
 
@@ -59,6 +64,28 @@ def test_mood_diary_entry_create_form_clean(valid_mood_diary_entry_form_data):
     assert form.cleaned_data["end_date"] == form.cleaned_data["date"]
 
 
+@pytest.mark.django_db
+def test_mood_diary_entry_import_form(
+    valid_mood_diary_entry_create_form_data, django_assert_num_queries
+):
+    form = MoodDiaryEntryImportForm(data=valid_mood_diary_entry_create_form_data)
+    assert form.is_valid()
+    assert form.cleaned_data["mood"].id == valid_mood_diary_entry_create_form_data["mood"]
+    assert form.cleaned_data["activity"].id == valid_mood_diary_entry_create_form_data["activity"]
+
+    # Moods and activities are looked up in the reference data
+    with django_assert_num_queries(0):
+        assert MoodDiaryEntryImportForm(data=valid_mood_diary_entry_create_form_data).is_valid()
+
+    # The rules of the create form apply
+    form = MoodDiaryEntryImportForm(
+        data={**valid_mood_diary_entry_create_form_data, "end_date": "2023-10-11", "mood": 0}
+    )
+    assert not form.is_valid()
+    assert "end_date" in form.errors
+    assert form.errors["mood"][0].startswith("Select a valid choice.")
+
+
 def test_activity_widget_search_fields():
     widget = ActivityWidget()
     expected_search_fields = [
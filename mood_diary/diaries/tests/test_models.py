@@ -1,5 +1,8 @@
+from datetime import date, datetime, time, timedelta
+
 import pytest
-from diaries.models import MoodDiaryEntry
+from diaries.dispatch import mood_diary_entries_bulk_created
+from diaries.models import Activity, ActivityCategory, DailyMoodSummary, MoodDiaryEntry
 from diaries.tests.factories import (
     ActivityFactory,
     MoodDiaryEntryFactory,
@@ -132,3 +135,185 @@ def test_release_entries():
     assert unreleased_entries.count() == 0
     released_entries = mood_diary.entries.filter(released=True)
     assert released_entries.count() == 5
+
+
+@pytest.mark.django_db
+def test_daily_mood_summary():
+    mood_diary = MoodDiaryFactory.create()
+    assert not DailyMoodSummary.objects.exists()
+
+    MoodDiaryEntryFactory.create(
+        mood_diary=mood_diary,
+        date="2023-10-01",
+        mood__value=-1,
+        activity__category__value=ActivityCategory.media_usage_value,
+        start_time=datetime(2023, 10, 1, 10, 0),
+        end_time=datetime(2023, 10, 1, 10, 45),
+    )
+    summary = DailyMoodSummary.objects.get(mood_diary=mood_diary, date=date(2023, 10, 1))
+    assert summary.entry_count == 1
+    assert summary.average_mood == -1
+    assert summary.max_mood == -1
+    assert summary.min_mood == -1
+    assert summary.meal_count == 0
+    assert summary.media_duration == timedelta(minutes=45)
+    assert summary.sports_duration is None
+
+    MoodDiaryEntryFactory.create(
+        mood_diary=mood_diary,
+        date="2023-10-01",
+        mood__value=2,
+        activity__category__value=ActivityCategory.food_intake_value,
+        start_time=datetime(2023, 10, 1, 12, 0),
+        end_time=datetime(2023, 10, 1, 12, 30),
+    )
+    sports_entry = MoodDiaryEntryFactory.create(
+        mood_diary=mood_diary,
+        date="2023-10-01",
+        mood__value=3,
+        activity=ActivityFactory.create(
+            category__value=ActivityCategory.physical_activity_value, value=Activity.sports_value
+        ),
+        start_time=datetime(2023, 10, 1, 17, 0),
+        end_time=datetime(2023, 10, 1, 18, 30),
+    )
+    summary.refresh_from_db()
+    assert summary.entry_count == 3
+    assert summary.average_mood == 4 / 3
+    assert summary.max_mood == 3
+    assert summary.min_mood == -1
+    assert summary.meal_count == 1
+    assert summary.media_duration == timedelta(minutes=45)
+    assert summary.sports_duration == timedelta(minutes=90)
+
+    # Moving an entry to another day refreshes both days
+    sports_entry = MoodDiaryEntry.objects.get(id=sports_entry.id)
+    sports_entry.date = date(2023, 10, 2)
+    sports_entry.save()
+    summary.refresh_from_db()
+    assert summary.entry_count == 2
+    assert summary.sports_duration is None
+    other_summary = DailyMoodSummary.objects.get(mood_diary=mood_diary, date=date(2023, 10, 2))
+    assert other_summary.entry_count == 1
+    assert other_summary.sports_duration == timedelta(minutes=90)
+
+    # Deleting the last entry of a day deletes its summary
+    sports_entry.delete()
+    assert not DailyMoodSummary.objects.filter(date=date(2023, 10, 2)).exists()
+    assert DailyMoodSummary.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_split_into_days():
+    entry = MoodDiaryEntryFactory.build(
+        date=date(2023, 9, 30),
+        start_time=time(12, 0),
+        end_time=time(13, 0),
+        details="blorg",
+    )
+    entries = entry.split_into_days(date(2023, 10, 2))
+    assert [(day.date, day.start_time, day.end_time) for day in entries] == [
+        (date(2023, 9, 30), time(12, 0), time(23, 59, 59)),
+        (date(2023, 10, 1), time(0, 0), time(23, 59, 59)),
+        (date(2023, 10, 2), time(0, 0), time(13, 0)),
+    ]
+    assert all(day.pk is None and day.details == "blorg" for day in entries)
+    assert all(day.mood_id == entry.mood_id for day in entries)
+
+    # A single day is kept as it is
+    (day,) = entry.split_into_days(date(2023, 9, 30))
+    assert (day.date, day.start_time, day.end_time) == (
+        date(2023, 9, 30),
+        time(12, 0),
+        time(13, 0),
+    )
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_bulk_create_days(django_assert_max_num_queries):
+    mood_diary = MoodDiaryFactory.create()
+    mood = MoodFactory.create(value=2)
+    activity = ActivityFactory.create()
+    entry = MoodDiaryEntry(
+        mood_diary=mood_diary,
+        date=date(2023, 9, 1),
+        start_time=time(12, 0),
+        end_time=time(13, 0),
+        mood=mood,
+        activity=activity,
+    )
+    # The number of queries does not depend on the number of days
+    with django_assert_max_num_queries(6):
+        entries = MoodDiaryEntry.bulk_create_days(entry, date(2023, 9, 30))
+    assert len(entries) == 30
+    assert all(day.pk is not None and day.updated_at is not None for day in entries)
+    assert MoodDiaryEntry.objects.filter(mood_diary=mood_diary).count() == 30
+
+    # Summaries are maintained although no signals are sent
+    summaries = DailyMoodSummary.objects.filter(mood_diary=mood_diary)
+    assert summaries.count() == 30
+    assert {summary.entry_count for summary in summaries} == {1}
+    assert {summary.average_mood for summary in summaries} == {2}
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_bulk_create_entries(django_assert_max_num_queries, mocker):
+    handler = mocker.Mock()
+    mood_diary_entries_bulk_created.connect(handler)
+    mood_diary = MoodDiaryFactory.create()
+    moods = [MoodFactory.create(value=value) for value in (-1, 1)]
+    activity = ActivityFactory.create()
+    entries = [
+        (
+            MoodDiaryEntry(
+                date=date(2023, 9, day),
+                start_time=time(12, 0),
+                end_time=time(13, 0),
+                mood=moods[day % 2],
+                activity=activity,
+            ),
+            date(2023, 9, day + 1 if day == 7 else day),
+        )
+        for day in range(1, 8)
+    ]
+
+    # The number of queries does not depend on the number of entries
+    with django_assert_max_num_queries(6):
+        created = MoodDiaryEntry.bulk_create_entries(mood_diary.id, entries)
+    assert len(created) == 8
+    assert [entry.date.day for entry in created] == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert all(entry.pk is not None and entry.mood_diary_id == mood_diary.id for entry in created)
+    assert DailyMoodSummary.objects.filter(mood_diary=mood_diary).count() == 8
+    handler.assert_called_once_with(
+        signal=mood_diary_entries_bulk_created,
+        sender=MoodDiaryEntry,
+        mood_diary_id=mood_diary.id,
+        entries=created,
+    )
+    mood_diary_entries_bulk_created.disconnect(handler)
+
+
+@pytest.mark.django_db
+def test_daily_mood_summary_refresh_days():
+    mood_diary = MoodDiaryFactory.create()
+    for day, mood_value in [
+        (date(2023, 10, 1), 1),
+        (date(2023, 10, 1), 3),
+        (date(2023, 10, 2), -1),
+    ]:
+        MoodDiaryEntryFactory.create(mood_diary=mood_diary, date=day, mood__value=mood_value)
+    # Queryset updates do not send signals, so the summaries are outdated
+    entries = MoodDiaryEntry.objects.filter(mood_diary=mood_diary)
+    entries.filter(date=date(2023, 10, 1)).update(date=date(2023, 10, 3))
+    entries.filter(date=date(2023, 10, 2)).update(mood=MoodFactory.create(value=2))
+
+    summaries = DailyMoodSummary.refresh_days(
+        mood_diary.id, [date(2023, 10, 1), date(2023, 10, 2), date(2023, 10, 3)]
+    )
+    assert [summary.date for summary in summaries] == [date(2023, 10, 2), date(2023, 10, 3)]
+    summaries = {summary.date: summary for summary in mood_diary.daily_summaries.all()}
+    # Days without entries lose their summary
+    assert set(summaries) == {date(2023, 10, 2), date(2023, 10, 3)}
+    assert summaries[date(2023, 10, 2)].average_mood == 2
+    assert summaries[date(2023, 10, 3)].entry_count == 2
+    assert summaries[date(2023, 10, 3)].average_mood == 2
@@ -0,0 +1,97 @@
+"""
+Regression tests for the query plans of the hot mood diary entry access paths.
+Sequential scans are disabled for the planner, so that a query only falls back to one
+if there is no index matching its access path, and the indexes designed for each access
+path are expected in its plan.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from diaries.models import MoodDiaryEntry
+from diaries.tests.factories import MoodDiaryEntryFactory, MoodDiaryFactory
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+from rules.models import RuleTriggeredLog
+from rules.rules import get_daily_summaries
+from rules.snapshots import ClientFeatureSnapshot
+from rules.tests.factories import RuleFactory
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != "postgresql", reason="Query plans are specific to PostgreSQL"
+    ),
+]
+
+
+@pytest.fixture
+def mood_diaries():
+    mood_diaries = MoodDiaryFactory.create_batch(size=5)
+    for mood_diary in mood_diaries:
+        for days in range(20):
+            MoodDiaryEntryFactory.create(
+                mood_diary=mood_diary, date=date(2023, 10, 1) - timedelta(days=days)
+            )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+        # Only valid within the transaction of the test
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    return mood_diaries
+
+
+def assert_no_sequential_scan(queryset: QuerySet) -> str:
+    query_plan = queryset.explain()
+    assert "Seq Scan" not in query_plan, query_plan
+    return query_plan
+
+
+def assert_uses_index(queryset: QuerySet, index_name: str):
+    query_plan = assert_no_sequential_scan(queryset)
+    assert index_name in query_plan, query_plan
+
+
+def test_mood_diary_entries_list_query_plan(mood_diaries):
+    mood_diary = mood_diaries[0]
+    assert_uses_index(mood_diary.entries.all(), "diaries_entry_diary_date_idx")
+    assert_uses_index(mood_diary.entries.filter(released=True), "diaries_entry_released_idx")
+    assert_uses_index(
+        MoodDiaryEntry.objects.filter(
+            released=True, mood_diary__client_id=mood_diary.client_id
+        ).order_by("-date", "-start_time"),
+        "diaries_entry_released_idx",
+    )
+    # Ordered by the value of the mood, which no index of the entries can provide
+    assert_no_sequential_scan(mood_diary.most_recent_mood_highlights(3))
+
+
+def test_rules_query_plan(mood_diaries):
+    mood_diary = mood_diaries[0]
+    requested_at = timezone.datetime(2023, 10, 1, 23, 59, 59)
+    assert_uses_index(
+        mood_diary.entries.filter(updated_at__lte=requested_at).order_by("-updated_at")[:1],
+        "diaries_entry_diary_upd_idx",
+    )
+    assert_uses_index(
+        mood_diary.entries.filter(date__gte=date(2023, 9, 25)), "diaries_entry_diary_date_idx"
+    )
+    # The entry edited last is looked up in the subqueries of the snapshot
+    assert_uses_index(
+        ClientFeatureSnapshot.get_queryset(mood_diary.client_id, requested_at),
+        "diaries_entry_diary_upd_idx",
+    )
+    assert_uses_index(
+        get_daily_summaries(
+            {mood_diary.client_id for mood_diary in mood_diaries}, date__gte=date(2023, 9, 18)
+        ),
+        "unique_daily_mood_summary_per_day",
+    )
+    assert_uses_index(
+        RuleTriggeredLog.objects.filter(
+            rule=RuleFactory.create(),
+            client_id=mood_diary.client_id,
+            requested_at__gte=date(2023, 9, 18),
+        ),
+        "rules_trig_rule_client_req_idx",
+    )
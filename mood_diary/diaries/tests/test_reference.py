@@ -0,0 +1,104 @@
+import pytest
+from diaries.models import Activity, Mood
+from diaries.reference import ReferenceData, reference_data
+from diaries.tests.factories import ActivityFactory, MoodFactory
+from django.core.cache import cache
+
+
+@pytest.mark.django_db
+def test_reference_data(django_assert_num_queries):
+    moods = [MoodFactory.create(value=value) for value in [1, -1, 0]]
+    activity = ActivityFactory.create(value="Sports", category__value="Physical Activity")
+    data = ReferenceData()
+
+    with django_assert_num_queries(3):
+        assert [mood.value for mood in data.moods()] == [-1, 0, 1]
+        assert data.get_mood(moods[0].id) == moods[0]
+        assert data.get_mood_by_value(0) == moods[2]
+        assert data.mood_max_value() == 1
+        assert data.get_activity(activity.id) == activity
+        assert data.get_activity(activity.id).category == activity.category
+        assert data.get_category(activity.category_id) == activity.category
+        assert data.activities() == [activity]
+
+    # Unknown items do not reload the reference data right after it has been loaded
+    with django_assert_num_queries(0):
+        with pytest.raises(Mood.DoesNotExist):
+            data.get_mood_by_value(3)
+        with pytest.raises(Activity.DoesNotExist):
+            data.get_activity(activity.id + 1)
+
+
+@pytest.mark.django_db
+def test_reference_data_empty_mood_scale():
+    with pytest.raises(Mood.DoesNotExist):
+        reference_data.mood_max_value()
+
+
+@pytest.mark.django_db
+def test_reference_data_invalidation_on_edit(django_capture_on_commit_callbacks):
+    mood = MoodFactory.create(value=0, label="old")
+    assert reference_data.get_mood_by_value(0).label == "old"
+
+    # The reference data is reloaded once the edit has been committed
+    with django_capture_on_commit_callbacks(execute=True):
+        mood.label = "new"
+        mood.save()
+        assert reference_data.get_mood_by_value(0).label == "old"
+    assert reference_data.get_mood_by_value(0).label == "new"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        activity = ActivityFactory.create()
+        activity.category.value = "renamed"
+        activity.category.save()
+    assert reference_data.get_activity(activity.id).category.value == "renamed"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        mood.delete()
+    with pytest.raises(Mood.DoesNotExist):
+        reference_data.get_mood_by_value(0)
+
+
+@pytest.mark.django_db
+def test_reference_data_version_check(mocker, django_assert_num_queries):
+    MoodFactory.create(value=0)
+    mocked_monotonic = mocker.patch("core.caches.time.monotonic", return_value=100)
+    data = ReferenceData()
+    data.moods()
+
+    # Another process edited the reference data, but the version is not checked yet
+    cache.set(ReferenceData.version_cache_key, "other", timeout=None)
+    with django_assert_num_queries(0):
+        data.moods()
+
+    # Version is checked after the check interval has passed
+    mocked_monotonic.return_value = 100 + ReferenceData.check_interval
+    with django_assert_num_queries(3):
+        data.moods()
+    mocked_monotonic.return_value = 100 + 2 * ReferenceData.check_interval
+    with django_assert_num_queries(0):
+        data.moods()
+
+
+@pytest.mark.django_db
+def test_reference_data_unknown_items(mocker, django_assert_num_queries):
+    mocked_monotonic = mocker.patch("core.caches.time.monotonic", return_value=100)
+    data = ReferenceData()
+    data.moods()
+    # Created without renewing the version, like by another process in the meantime
+    [mood] = Mood.objects.bulk_create([MoodFactory.build(value=0)])
+    mocked_load = mocker.spy(data, "load")
+    mocked_monotonic.return_value = 101
+
+    # Unknown items are looked up once per check interval at most
+    with django_assert_num_queries(0):
+        for _ in range(10):
+            with pytest.raises(Mood.DoesNotExist):
+                data.get_mood(mood.id)
+    assert mocked_load.call_count == 0
+
+    mocked_monotonic.return_value = 100 + ReferenceData.check_interval
+    with django_assert_num_queries(3):
+        assert data.get_mood(mood.id) == mood
+        with pytest.raises(Mood.DoesNotExist):
+            data.get_mood(mood.id + 1)
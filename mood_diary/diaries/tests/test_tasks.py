@@ -1,36 +1,248 @@
+import uuid
+from datetime import timedelta
+
 import pytest
 from clients.tests.factories import ClientFactory
-from diaries.tasks import task_event_based_rules_evaluation, task_time_based_rules_init
+from diaries.models import MoodDiarySyncKey
+from diaries.tasks import (
+    get_chunk_bounds_cache_key,
+    get_chunk_done_cache_key,
+    get_latest_timestamp_cache_key,
+    get_pending_evaluation_cache_key,
+    schedule_event_based_rules_evaluation,
+    task_event_based_rules_evaluation,
+    task_prune_sync_keys,
+    task_time_based_rules_batch_evaluation,
+    task_time_based_rules_init,
+)
+from diaries.tests.factories import MoodDiaryFactory
+from django.core.cache import cache
 from django.utils import timezone
+from kombu.utils.json import dumps, loads
 from pytest_mock import MockerFixture
 from rules.rules import EVENT_BASED_RULES, TIME_BASED_RULES
-from rules.utils import RuleMessage
+from rules.subscriptions import RuleSubscriptions
+from rules.utils import RuleBatchMessage, RuleMessage
 
 
 def test_task_event_based_rules_evaluation(mocker: MockerFixture):
+    mocker.patch(
+        "diaries.tasks.RuleSubscriptions.load", return_value=RuleSubscriptions([1], {1: {1}})
+    )
+    mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_load = mocker.patch("diaries.tasks.ClientFeatureSnapshot.load")
     mocked_method = mocker.patch("rules.rules.BaseRule.evaluate")
     rule_message = RuleMessage(client_id=1, timestamp=timezone.now())
     task_event_based_rules_evaluation(rule_message)
     assert mocked_method.call_count == len(EVENT_BASED_RULES)
+    # One snapshot is shared by all rules
+    assert mocked_load.call_count == 1
+
+
+def test_task_event_based_rules_evaluation_without_subscriptions(mocker: MockerFixture):
+    mocker.patch("diaries.tasks.RuleSubscriptions.load", return_value=RuleSubscriptions([1], {}))
+    mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_load = mocker.patch("diaries.tasks.ClientFeatureSnapshot.load")
+    mocked_method = mocker.patch("rules.rules.BaseRule.evaluate")
+    rule_message = RuleMessage(client_id=1, timestamp=timezone.now())
+    task_event_based_rules_evaluation(rule_message)
+    assert mocked_method.call_count == 0
+    assert mocked_load.call_count == 0
+
+
+@pytest.fixture
+def clear_evaluation_cache():
+    def _clear_evaluation_cache(client_id):
+        cache.delete(get_pending_evaluation_cache_key(client_id))
+        cache.delete(get_latest_timestamp_cache_key(client_id))
+
+    return _clear_evaluation_cache
+
+
+def test_schedule_event_based_rules_evaluation(mocker: MockerFixture, clear_evaluation_cache):
+    client_id = 1001
+    clear_evaluation_cache(client_id)
+    mocked_method = mocker.patch("diaries.tasks.task_event_based_rules_evaluation.apply_async")
+    timestamp = timezone.now()
+    # A burst of requests only schedules a single evaluation
+    for delta in [timedelta(seconds=0), timedelta(seconds=2), timedelta(seconds=1)]:
+        schedule_event_based_rules_evaluation(RuleMessage(client_id, timestamp + delta))
+    assert mocked_method.call_count == 1
+    assert mocked_method.call_args.args[0] == (RuleMessage(client_id, timestamp),)
+    assert mocked_method.call_args.kwargs["countdown"] > 0
+    assert cache.get(get_latest_timestamp_cache_key(client_id)) == timestamp + timedelta(seconds=2)
+    # Other clients are scheduled independently
+    clear_evaluation_cache(client_id + 1)
+    schedule_event_based_rules_evaluation(RuleMessage(client_id + 1, timestamp))
+    assert mocked_method.call_count == 2
+    clear_evaluation_cache(client_id)
+    clear_evaluation_cache(client_id + 1)
+
+
+def test_task_event_based_rules_evaluation_coalesced(mocker: MockerFixture, clear_evaluation_cache):
+    client_id = 1003
+    clear_evaluation_cache(client_id)
+    mocker.patch("diaries.tasks.task_event_based_rules_evaluation.apply_async")
+    mocker.patch(
+        "diaries.tasks.RuleSubscriptions.load",
+        return_value=RuleSubscriptions([client_id], {1: {client_id}}),
+    )
+    mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_load = mocker.patch("diaries.tasks.ClientFeatureSnapshot.load")
+    mocker.patch("rules.rules.BaseRule.evaluate")
+    timestamp = timezone.now()
+    msg = RuleMessage(client_id, timestamp)
+    schedule_event_based_rules_evaluation(msg)
+    schedule_event_based_rules_evaluation(RuleMessage(client_id, timestamp + timedelta(seconds=5)))
+    task_event_based_rules_evaluation(msg)
+    # The latest timestamp of the burst is evaluated
+    mocked_load.assert_called_once_with(client_id, timestamp + timedelta(seconds=5))
+    # and requests arriving afterwards schedule a new evaluation
+    assert cache.get(get_pending_evaluation_cache_key(client_id)) is None
+    clear_evaluation_cache(client_id)
+
+
+def test_task_event_based_rules_evaluation_serialized(
+    mocker: MockerFixture, clear_evaluation_cache
+):
+    client_id = 1004
+    clear_evaluation_cache(client_id)
+    mocked_apply_async = mocker.patch("diaries.tasks.task_event_based_rules_evaluation.apply_async")
+    mocker.patch(
+        "diaries.tasks.RuleSubscriptions.load",
+        return_value=RuleSubscriptions([client_id], {1: {client_id}}),
+    )
+    mocked_history = mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_load = mocker.patch("diaries.tasks.ClientFeatureSnapshot.load")
+    mocker.patch("rules.rules.BaseRule.evaluate")
+    timestamp = timezone.now()
+    schedule_event_based_rules_evaluation(RuleMessage(client_id, timestamp))
+    schedule_event_based_rules_evaluation(RuleMessage(client_id, timestamp + timedelta(seconds=5)))
+    # The message arrives as a plain list, like from the JSON serializer of Celery
+    args = loads(dumps(mocked_apply_async.call_args.args[0]))
+
+    task_event_based_rules_evaluation.apply(args=args).get()
+
+    mocked_load.assert_called_once_with(client_id, timestamp + timedelta(seconds=5))
+    mocked_history.assert_called_once_with([client_id])
+    assert cache.get(get_pending_evaluation_cache_key(client_id)) is None
+    clear_evaluation_cache(client_id)
 
 
 @pytest.mark.django_db
 def test_task_time_based_rules_init(mocker: MockerFixture, freezer):
     freezer.move_to("2023-10-01 06:00:00")
-    mocked_method = mocker.patch("diaries.tasks.task_time_based_rules_evaluation.delay")
-    ClientFactory.create_batch(size=2, active=True)
+    mocker.patch("diaries.tasks.TIME_BASED_RULES_CHUNK_SIZE", 2)
+    mocked_group = mocker.patch("diaries.tasks.group")
+    mocked_signature = mocker.patch("diaries.tasks.task_time_based_rules_batch_evaluation.s")
+    clients = ClientFactory.create_batch(size=3, active=True)
+    ClientFactory(active=False)
     task_time_based_rules_init()
-    assert mocked_method.call_count == 2
-    assert mocked_method.call_args_list[0][0][0].timestamp == timezone.datetime(
-        2023, 9, 30, 23, 59, 59, 999999
-    )
-    assert mocked_method.call_args_list[1][0][0].timestamp == timezone.datetime(
-        2023, 9, 30, 23, 59, 59, 999999
+    assert mocked_group.call_count == 1
+    assert mocked_signature.call_count == 2
+    msgs = [call.args[0] for call in mocked_signature.call_args_list]
+    assert [call.kwargs["chunk"] for call in mocked_signature.call_args_list] == [
+        (0, clients[1].id),
+        (clients[1].id, clients[2].id),
+    ]
+    assert [client_id for msg in msgs for client_id in msg.client_ids] == sorted(
+        client.id for client in clients
     )
+    assert [len(msg.client_ids) for msg in msgs] == [2, 1]
+    assert all(msg.timestamp == timezone.datetime(2023, 9, 30, 23, 59, 59, 999999) for msg in msgs)
+    cache.delete(get_chunk_bounds_cache_key(msgs[0].timestamp))
 
 
-def test_task_time_based_rules_evaluation(mocker: MockerFixture):
-    mocked_method = mocker.patch("rules.rules.BaseRule.evaluate")
-    rule_message = RuleMessage(client_id=1, timestamp=timezone.now())
-    task_event_based_rules_evaluation(rule_message)
+@pytest.mark.django_db
+def test_task_time_based_rules_init_resume(mocker: MockerFixture):
+    timestamp = timezone.datetime(2023, 8, 31, 23, 59, 59, 999999)
+    mocker.patch("diaries.tasks.TIME_BASED_RULES_CHUNK_SIZE", 2)
+    mocked_group = mocker.patch("diaries.tasks.group")
+    mocked_signature = mocker.patch("diaries.tasks.task_time_based_rules_batch_evaluation.s")
+    clients = ClientFactory.create_batch(size=5, active=True)
+    task_time_based_rules_init(timestamp)
+    chunks = [call.kwargs["chunk"] for call in mocked_signature.call_args_list]
+    assert chunks == [
+        (0, clients[1].id),
+        (clients[1].id, clients[3].id),
+        (clients[3].id, clients[4].id),
+    ]
+    # The first chunk is evaluated before the run crashes
+    cache.set(get_chunk_done_cache_key(timestamp, *chunks[0]), True)
+    mocked_signature.reset_mock()
+
+    # Clients (de)activated in the meantime do not shift the chunks of the run
+    clients[0].active = False
+    clients[0].save()
+    new_client = ClientFactory.create(active=True)
+    task_time_based_rules_init(timestamp)
+    msgs = [call.args[0] for call in mocked_signature.call_args_list]
+    assert [msg.client_ids for msg in msgs] == [
+        [clients[2].id, clients[3].id],
+        [clients[4].id],
+        [new_client.id],
+    ]
+    assert [call.kwargs["chunk"] for call in mocked_signature.call_args_list] == [
+        *chunks[1:],
+        (clients[4].id, new_client.id),
+    ]
+
+    # Nothing is scheduled once all chunks are done
+    for call in mocked_signature.call_args_list:
+        cache.set(get_chunk_done_cache_key(timestamp, *call.kwargs["chunk"]), True)
+    task_time_based_rules_init(timestamp)
+    assert mocked_group.call_count == 2
+    done_keys = [
+        get_chunk_done_cache_key(timestamp, *chunk)
+        for chunk in [*chunks, (clients[4].id, new_client.id)]
+    ]
+    cache.delete_many([get_chunk_bounds_cache_key(timestamp), *done_keys])
+
+
+def test_task_time_based_rules_batch_evaluation(mocker: MockerFixture):
+    mocked_load = mocker.patch("diaries.tasks.RuleSubscriptions.load")
+    mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_method = mocker.patch("rules.rules.BaseRule.evaluate_batch", return_value=set())
+    mocked_cache = mocker.patch("diaries.tasks.cache.set")
+    rule_batch_message = RuleBatchMessage(client_ids=[1, 2], timestamp=timezone.now())
+    task_time_based_rules_batch_evaluation(rule_batch_message)
     assert mocked_method.call_count == len(TIME_BASED_RULES)
+    # Subscriptions of all clients are loaded once for all rules
+    assert mocked_load.call_count == 1
+    assert mocked_cache.call_count == 0
+
+    # Completion of a chunk is recorded
+    task_time_based_rules_batch_evaluation(rule_batch_message, chunk=(0, 2))
+    assert mocked_cache.call_count == 1
+    assert mocked_cache.call_args.args[0] == get_chunk_done_cache_key(
+        rule_batch_message.timestamp, 0, 2
+    )
+
+
+def test_task_time_based_rules_batch_evaluation_serialized(mocker: MockerFixture):
+    mocked_load = mocker.patch("diaries.tasks.RuleSubscriptions.load")
+    mocked_history = mocker.patch("diaries.tasks.RuleTriggerHistory.load")
+    mocked_method = mocker.patch("rules.rules.BaseRule.evaluate_batch", return_value=set())
+    rule_batch_message = RuleBatchMessage(client_ids=[1, 2], timestamp=timezone.now())
+    # The message arrives as a plain list, like from the JSON serializer of Celery
+    args = loads(dumps((rule_batch_message,)))
+
+    task_time_based_rules_batch_evaluation.apply(args=args).get()
+
+    mocked_load.assert_called_once_with([1, 2])
+    mocked_history.assert_called_once_with([1, 2])
+    assert mocked_method.call_args.args == tuple(rule_batch_message)
+
+
+@pytest.mark.django_db
+def test_task_prune_sync_keys(freezer):
+    mood_diary = MoodDiaryFactory.create()
+    freezer.move_to("2023-09-01 12:00:00")
+    MoodDiarySyncKey.objects.create(mood_diary=mood_diary, key=uuid.uuid4())
+    freezer.move_to("2023-09-20 12:00:00")
+    recent_key = MoodDiarySyncKey.objects.create(mood_diary=mood_diary, key=uuid.uuid4())
+    freezer.move_to("2023-10-05 12:00:00")
+
+    task_prune_sync_keys()
+
+    assert list(MoodDiarySyncKey.objects.all()) == [recent_key]
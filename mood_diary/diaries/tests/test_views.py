@@ -1,12 +1,13 @@
 import datetime
 import http
+import uuid
 from datetime import date
 from unittest.mock import patch
 
 import pytest
 from clients.tests.factories import ClientFactory
 from diaries.forms import ActivityWidget, MoodDiaryEntryForm
-from diaries.models import Activity, MoodDiaryEntry
+from diaries.models import Activity, MoodDiaryEntry, MoodDiarySyncKey
 from diaries.tests.factories import (
     ActivityCategoryFactory,
     ActivityFactory,
@@ -14,7 +15,14 @@ from diaries.tests.factories import (
     MoodDiaryFactory,
     MoodFactory,
 )
-from diaries.views import ActivitySelect2QuerySetView
+from diaries.views import (
+    ActivitySelect2QuerySetView,
+    MoodDiaryEntryImportView,
+    MoodDiaryEntryListView,
+    MoodDiaryEntrySyncView,
+)
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from pytest_mock import MockerFixture
@@ -50,10 +58,66 @@ def test_mood_diary_entry_list_view(user, entry, create_response):
 
     assert response.status_code == http.HTTPStatus.OK
     assert entry in (response_entries := response.context_data["entries"])
-    assert response_entries.count() == 1
+    assert len(response_entries) == 1
     assert "diaries/mood_diary_entries_list.html" in response.template_name
 
 
+@pytest.mark.django_db
+def test_mood_diary_entry_list_view_pagination(user, client):
+    mood_diary = MoodDiaryFactory.create(client=user.client)
+    for day in range(1, 13):
+        MoodDiaryEntryFactory.create_batch(2, mood_diary=mood_diary, date=date(2023, 10, day))
+    entries = list(MoodDiaryEntry.objects.order_by("-date", "-start_time", "-id"))
+    client.force_login(user)
+
+    response = client.get(reverse("diaries:list_mood_diary_entries"))
+    assert response.context_data["entries"] == entries[:10]
+    paged_entries = list(response.context_data["entries"])
+    query_counts = []
+    while next_page_url := response.context_data["next_page_url"]:
+        # Further pages are fetched by el_pagination's script
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(next_page_url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        assert response.template_name == ["diaries/mood_diary_entry_list_page.html"]
+        paged_entries += response.context_data["entries"]
+        query_counts.append(len(queries))
+    assert paged_entries == entries
+    # No page costs more than another, no matter how deep
+    assert len(set(query_counts)) == 1
+
+    response = client.get(reverse("diaries:list_mood_diary_entries"), {"cursor": "invalid"})
+    assert response.status_code == http.HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_list_view_conditional(user, entry, client):
+    url = reverse("diaries:list_mood_diary_entries")
+    client.force_login(user)
+    # The first response sets the CSRF cookie the pages depend on
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+    assert "private" in response["Cache-Control"]
+
+    # Releasing entries does not update them
+    client.post(reverse("diaries:release_mood_diary_entries"))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.context_data["entries"][0].released
+
+    etag = response["ETag"]
+
+    entry.delete()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert not response.context_data["entries"]
+
+
 @pytest.mark.django_db
 def test_mood_diary_entry_create_view_get(user, create_response):
     MoodFactory.create(value=0)
@@ -67,7 +131,7 @@ def test_mood_diary_entry_create_view_get(user, create_response):
 
 @pytest.mark.django_db
 def test_mood_diary_entry_create_view_post(user, create_response, mocker: MockerFixture):
-    mocked_task = mocker.patch("diaries.views.task_event_based_rules_evaluation.delay")
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
     MoodDiaryFactory.create(client=user.client)
     mood = MoodFactory.create(value=0)
     activity = ActivityFactory.create()
@@ -99,7 +163,7 @@ def test_mood_diary_entry_create_view_post(user, create_response, mocker: Mocker
 def test_mood_diary_entry_create_view_post_multiple_days(
     user, create_response, mocker: MockerFixture
 ):
-    mocked_task = mocker.patch("diaries.views.task_event_based_rules_evaluation.delay")
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
     MoodDiaryFactory.create(client=user.client)
     mood = MoodFactory.create(value=0)
     activity = ActivityFactory.create()
@@ -134,10 +198,10 @@ def test_mood_diary_entry_create_view_post_multiple_days(
     assert entries[2].date == date.today() + timezone.timedelta(days=2)
     assert entries[2].start_time == datetime.time(0, 0, 0)
     assert entries[2].end_time == datetime.time(13, 0, 0)
-    assert mocked_task.call_count == 3
+    # One evaluation for all days, at the time the last day was saved
+    assert mocked_task.call_count == 1
     assert mocked_task.call_args_list[0][0][0].client_id == user.client.id
-    assert mocked_task.call_args_list[1][0][0].client_id == user.client.id
-    assert mocked_task.call_args_list[2][0][0].client_id == user.client.id
+    assert mocked_task.call_args_list[0][0][0].timestamp == entries[2].updated_at
 
 
 @pytest.mark.django_db
@@ -154,7 +218,7 @@ def test_mood_diary_entry_update_view_get(user, entry, create_response):
 
 @pytest.mark.django_db
 def test_mood_diary_entry_update_view_post(user, entry, create_response, mocker: MockerFixture):
-    mocked_task = mocker.patch("diaries.views.task_event_based_rules_evaluation.delay")
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
     MoodFactory.create(value=0)
     url = reverse("diaries:update_mood_diary_entry", kwargs={"pk": entry.pk})
 
@@ -268,6 +332,30 @@ def test_activity_select2_queryset_view_grouped_response(client):
     assert children[0]["text"] == "Aktivität_1"
 
 
+@pytest.mark.django_db
+def test_activity_select2_queryset_view_pages(client):
+    category = ActivityCategoryFactory(value="Category", value_de="Kategorie", value_en="Category")
+    activities = [
+        ActivityFactory(category=category, value=value, value_de=value, value_en=value)
+        for value in ["A", "B", "C"]
+    ]
+    url = reverse("diaries:mood_diary_entries_create_auto_select")
+
+    with patch.object(
+        ActivitySelect2QuerySetView,
+        "get_widget_or_404",
+        return_value=ActivityWidget(queryset=Activity.objects.all(), max_results=2),
+    ):
+        pages = [client.get(url, {"page": page}).json() for page in [1, 2]]
+        invalid_responses = [client.get(url, {"page": page}) for page in ["0", "next"]]
+
+    assert [page["more"] for page in pages] == [True, False]
+    assert sorted(
+        child["id"] for page in pages for group in page["results"] for child in group["children"]
+    ) == sorted(activity.id for activity in activities)
+    assert all(response.status_code == http.HTTPStatus.NOT_FOUND for response in invalid_responses)
+
+
 @pytest.mark.django_db
 def test_activity_select2_queryset_view_ordering_by_language(client):
     category = ActivityCategoryFactory(value="Category", value_de="Kategorie", value_en="Category")
@@ -286,3 +374,306 @@ def test_activity_select2_queryset_view_ordering_by_language(client):
 
     assert data["results"][0]["text"] == "Category"
     assert data["results"][0]["children"][0]["text"] == "Activity"
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_list_view_queries(
+    user, create_response, monkeypatch, assert_constant_queries
+):
+    MoodDiaryEntryFactory.create_batch(5, mood_diary__client=user.client)
+    url = reverse("diaries:list_mood_diary_entries")
+
+    def list_entries(page_size):
+        monkeypatch.setattr(MoodDiaryEntryListView, "page_size", page_size)
+        assert len(create_response(user, url).context_data["entries"]) == page_size
+
+    assert_constant_queries(list_entries)
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_import_view(user, create_response, mocker: MockerFixture):
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    mood = MoodFactory.create(value=0)
+    activity = ActivityFactory.create()
+    url = reverse("diaries:import_mood_diary_entries")
+    entries = [
+        {
+            "date": f"2023-10-{day:02}",
+            "start_time": "12:00",
+            "end_time": "13:00",
+            "mood": mood.id,
+            "activity": activity.id,
+            "details": "encrypted details",
+        }
+        for day in range(1, 8)
+    ]
+    entries[-1]["end_date"] = "2023-10-08"
+
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data={"entries": entries},
+        content_type="application/json",
+    )
+
+    assert response.status_code == http.HTTPStatus.CREATED
+    assert response.json() == {"created": 8}
+    assert MoodDiaryEntry.objects.filter(mood_diary__client=user.client).count() == 8
+    # One evaluation for all entries, at the time the last one was saved
+    last_entry = MoodDiaryEntry.objects.order_by("-updated_at").first()
+    assert mocked_task.call_count == 1
+    assert mocked_task.call_args_list[0][0][0].client_id == user.client.id
+    assert mocked_task.call_args_list[0][0][0].timestamp == last_entry.updated_at
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_import_view_invalid(user, create_response, mocker: MockerFixture):
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    mood = MoodFactory.create(value=0)
+    activity = ActivityFactory.create()
+    url = reverse("diaries:import_mood_diary_entries")
+    valid_entry = {
+        "date": "2023-10-01",
+        "start_time": "12:00",
+        "end_time": "13:00",
+        "mood": mood.id,
+        "activity": activity.id,
+    }
+
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data={"entries": [valid_entry, {**valid_entry, "activity": None}]},
+        content_type="application/json",
+    )
+
+    # Nothing is created if any entry is invalid
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert list(response.json()["errors"]) == ["1"]
+    assert "activity" in response.json()["errors"]["1"]
+    assert not MoodDiaryEntry.objects.exists()
+    assert not mocked_task.called
+
+    for data in [{}, {"entries": []}, {"entries": [1]}, {"entries": [valid_entry] * 501}]:
+        response = create_response(
+            user, url, method="POST", data=data, content_type="application/json"
+        )
+        assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert not MoodDiaryEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_import_view_max_days(
+    user, create_response, monkeypatch, mocker: MockerFixture
+):
+    mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    url = reverse("diaries:import_mood_diary_entries")
+    entry = {
+        "date": "2023-10-01",
+        "start_time": "12:00",
+        "end_time": "13:00",
+        "mood": MoodFactory.create(value=0).id,
+        "activity": ActivityFactory.create().id,
+    }
+
+    # An entry must not span more than 31 days
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data={"entries": [{**entry, "end_date": "2023-11-01"}]},
+        content_type="application/json",
+    )
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert "end_date" in response.json()["errors"]["0"]
+
+    # The entries must not span more than max_days days in total
+    monkeypatch.setattr(MoodDiaryEntryImportView, "max_days", 10)
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data={
+            "entries": [{**entry, "end_date": "2023-10-07"}, {**entry, "end_date": "2023-10-05"}]
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert not MoodDiaryEntry.objects.exists()
+
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data={
+            "entries": [{**entry, "end_date": "2023-10-05"}, {**entry, "end_date": "2023-10-05"}]
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == http.HTTPStatus.CREATED
+    assert response.json() == {"created": 10}
+
+
+@pytest.fixture
+def sync_entry_data():
+    def _sync_entry_data(**kwargs):
+        return {
+            "date": "2023-10-01",
+            "start_time": "12:00",
+            "end_time": "13:00",
+            "mood": MoodFactory.create(value=0).id,
+            "activity": ActivityFactory.create().id,
+            "details": "encrypted details",
+            **kwargs,
+        }
+
+    return _sync_entry_data
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_sync_view(user, create_response, sync_entry_data, mocker: MockerFixture):
+    mocked_task = mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    entry = MoodDiaryEntryFactory.create(mood_diary__client=user.client)
+    other_entry = MoodDiaryEntryFactory.create()
+    url = reverse("diaries:sync_mood_diary_entries")
+    keys = [str(uuid.uuid4()) for _ in range(5)]
+    operations = [
+        {"key": keys[0], "id": None, "entry": sync_entry_data(end_date="2023-10-02")},
+        {"key": keys[1], "id": entry.id, "entry": sync_entry_data(details="updated")},
+        {"key": keys[2], "id": other_entry.id, "entry": sync_entry_data()},
+        {"key": keys[3], "id": None, "entry": sync_entry_data(end_time="")},
+        {"key": keys[0], "id": None, "entry": sync_entry_data()},
+    ]
+
+    response = create_response(
+        user, url, method="POST", data={"operations": operations}, content_type="application/json"
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    results = response.json()["results"]
+    assert [result["key"] for result in results] == [keys[0], keys[1], keys[2], keys[3], keys[0]]
+    assert [result["status"] for result in results] == [
+        "created",
+        "updated",
+        "not_found",
+        "invalid",
+        "duplicate",
+    ]
+    assert "end_time" in results[3]["errors"]
+    assert MoodDiaryEntry.objects.filter(mood_diary__client=user.client).count() == 3
+    entry.refresh_from_db()
+    assert entry.details == "updated"
+    other_entry.refresh_from_db()
+    assert other_entry.details != "updated"
+    assert MoodDiarySyncKey.objects.count() == 2
+    assert mocked_task.call_count == 1
+    assert mocked_task.call_args_list[0][0][0].client_id == user.client.id
+
+    # Replaying the operations does not apply them again
+    response = create_response(
+        user, url, method="POST", data={"operations": operations}, content_type="application/json"
+    )
+
+    assert [result["status"] for result in response.json()["results"]] == [
+        "duplicate",
+        "duplicate",
+        "not_found",
+        "invalid",
+        "duplicate",
+    ]
+    assert MoodDiaryEntry.objects.filter(mood_diary__client=user.client).count() == 3
+    assert mocked_task.call_count == 1
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_sync_view_queries(
+    user, create_response, sync_entry_data, mocker: MockerFixture, assert_constant_queries
+):
+    mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    entry_data = sync_entry_data()
+    url = reverse("diaries:sync_mood_diary_entries")
+
+    def sync_entries(count):
+        operations = [
+            {"key": str(uuid.uuid4()), "id": None, "entry": entry_data} for _ in range(count)
+        ]
+        response = create_response(
+            user,
+            url,
+            method="POST",
+            data={"operations": operations},
+            content_type="application/json",
+        )
+        assert [result["status"] for result in response.json()["results"]] == ["created"] * count
+
+    assert_constant_queries(sync_entries)
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_sync_view_bad_request(user, create_response, sync_entry_data):
+    MoodDiaryFactory.create(client=user.client)
+    url = reverse("diaries:sync_mood_diary_entries")
+    operation = {"key": str(uuid.uuid4()), "id": None, "entry": sync_entry_data()}
+
+    for data in [
+        {},
+        {"operations": []},
+        {"operations": [{**operation, "key": "no-uuid"}]},
+        {"operations": [{**operation, "id": "1"}]},
+        {"operations": [{**operation, "entry": None}]},
+        {"operations": [operation] * 101},
+    ]:
+        response = create_response(
+            user, url, method="POST", data=data, content_type="application/json"
+        )
+        assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert not MoodDiaryEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_mood_diary_entry_sync_view_max_days(
+    user, create_response, sync_entry_data, monkeypatch, mocker: MockerFixture
+):
+    mocker.patch("diaries.views.schedule_event_based_rules_evaluation")
+    MoodDiaryFactory.create(client=user.client)
+    entry_data = sync_entry_data()
+    url = reverse("diaries:sync_mood_diary_entries")
+
+    # An entry must not span more than 31 days
+    operation = {
+        "key": str(uuid.uuid4()),
+        "id": None,
+        "entry": {**entry_data, "end_date": "2023-11-01"},
+    }
+    response = create_response(
+        user, url, method="POST", data={"operations": [operation]}, content_type="application/json"
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    result = response.json()["results"][0]
+    assert result["status"] == "invalid"
+    assert "end_date" in result["errors"]
+
+    # The created entries must not span more than max_days days in total
+    monkeypatch.setattr(MoodDiaryEntrySyncView, "max_days", 10)
+    operations = [
+        {"key": str(uuid.uuid4()), "id": None, "entry": {**entry_data, "end_date": end_date}}
+        for end_date in ["2023-10-07", "2023-10-05"]
+    ]
+    response = create_response(
+        user, url, method="POST", data={"operations": operations}, content_type="application/json"
+    )
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert not MoodDiaryEntry.objects.exists()
+    assert not MoodDiarySyncKey.objects.exists()
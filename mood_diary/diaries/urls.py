@@ -23,6 +23,16 @@ urlpatterns = [
         views.MoodDiaryEntryCreateView.as_view(),
         name="create_mood_diary_entry",
     ),
+    path(
+        "mood_diary_entries/import/",
+        views.MoodDiaryEntryImportView.as_view(),
+        name="import_mood_diary_entries",
+    ),
+    path(
+        "mood_diary_entries/sync/",
+        views.MoodDiaryEntrySyncView.as_view(),
+        name="sync_mood_diary_entries",
+    ),
     path(
         "mood_diary_entries/<int:pk>/update/",
         views.MoodDiaryEntryUpdateView.as_view(),
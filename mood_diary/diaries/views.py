@@ -1,22 +1,30 @@
-from itertools import groupby
-
-from core.views import AuthenticatedClientRoleMixin
-from diaries.forms import MoodDiaryEntryCreateForm, MoodDiaryEntryForm
-from diaries.models import Mood, MoodDiary, MoodDiaryEntry
-from diaries.tasks import task_event_based_rules_evaluation
-from django.conf import settings
-from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse, JsonResponse
+import http
+import json
+import uuid
+
+from core.pagination import KeysetAjaxListView
+from core.views import AuthenticatedClientRoleMixin, ConditionalGetMixin
+from diaries.catalog import activity_search
+from diaries.forms import (
+    MoodDiaryEntryCreateForm,
+    MoodDiaryEntryForm,
+    MoodDiaryEntryImportForm,
+    MoodDiaryEntrySyncUpdateForm,
+)
+from diaries.models import MoodDiary, MoodDiaryEntry, MoodDiarySyncKey
+from diaries.reference import reference_data
+from diaries.tasks import schedule_event_based_rules_evaluation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, QuerySet
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
-from django.utils import timezone
-from django.utils.module_loading import import_string
 from django.utils.translation import get_language_from_request
 from django.views import View
 from django.views.generic import CreateView, DeleteView, UpdateView
 from django.views.generic.detail import DetailView
 from django_select2.views import AutoResponseView
-from el_pagination.views import AjaxListView
+from notifications.unread import unread_notifications_of_request
 from rules.utils import RuleMessage
 
 
@@ -29,8 +37,27 @@ class RestrictMoodDiaryEntryToOwnerMixin:
         return self.model.objects.filter(mood_diary__client_id=self.request.user.client.id)
 
 
+class MoodDiaryEntryConditionalGetMixin(ConditionalGetMixin):
+    """
+    Mixin to answer GET requests for pages showing mood diary entries of the requesting
+    client conditionally.
+    Releasing entries does not update them, so the number of released entries is taken
+    into account as well.
+    """
+
+    conditional_aggregates = {
+        "count": Count("pk"),
+        "released": Count("pk", filter=Q(released=True)),
+        "updated_at": Max("updated_at"),
+    }
+    conditional_dependencies = (unread_notifications_of_request, reference_data.get_version)
+
+
 class MoodDiaryEntryDetailView(
-    AuthenticatedClientRoleMixin, RestrictMoodDiaryEntryToOwnerMixin, DetailView
+    AuthenticatedClientRoleMixin,
+    MoodDiaryEntryConditionalGetMixin,
+    RestrictMoodDiaryEntryToOwnerMixin,
+    DetailView,
 ):
     """
     View for displaying a mood diary entry in detail.
@@ -40,6 +67,12 @@ class MoodDiaryEntryDetailView(
     template_name = "diaries/mood_diary_entry_get.html"
     context_object_name = "entry"
 
+    def get_conditional_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        return self.get_queryset().filter(pk=self.kwargs.get(self.pk_url_kwarg))
+
+    def get_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        return super().get_queryset().select_related("mood", "activity")
+
     def get_context_data(self, **kwargs) -> dict:
         """
         Adds the mood scale to the response context.
@@ -55,13 +88,15 @@ class MoodDiaryEntryDetailView(
             Response context
         """
         context = super().get_context_data(**kwargs)
-        context["moods"] = Mood.objects.all()
-        context["label_left"] = Mood.objects.first().label
-        context["label_right"] = Mood.objects.last().label
+        context["moods"] = moods = reference_data.moods()
+        context["label_left"] = moods[0].label
+        context["label_right"] = moods[-1].label
         return context
 
 
-class MoodDiaryEntryListView(AuthenticatedClientRoleMixin, AjaxListView):
+class MoodDiaryEntryListView(
+    AuthenticatedClientRoleMixin, MoodDiaryEntryConditionalGetMixin, KeysetAjaxListView
+):
     """
     View for displaying a list of mood diary entries.
     """
@@ -70,6 +105,7 @@ class MoodDiaryEntryListView(AuthenticatedClientRoleMixin, AjaxListView):
     template_name = "diaries/mood_diary_entries_list.html"
     page_template = "diaries/mood_diary_entry_list_page.html"
     context_object_name = "entries"
+    ordering = ("-date", "-start_time", "-id")
 
     def get_queryset(self) -> QuerySet[MoodDiaryEntry]:
         """
@@ -82,7 +118,10 @@ class MoodDiaryEntryListView(AuthenticatedClientRoleMixin, AjaxListView):
         """
         client_id = self.request.user.client.id
         mood_diary, _ = MoodDiary.objects.get_or_create(client_id=client_id)
-        return mood_diary.entries.all()
+        return mood_diary.entries.select_related("mood", "activity")
+
+    def get_conditional_queryset(self) -> QuerySet[MoodDiaryEntry]:
+        return MoodDiaryEntry.objects.filter(mood_diary__client_id=self.request.user.client.id)
 
 
 class MoodDiaryEntryCreateView(AuthenticatedClientRoleMixin, CreateView):
@@ -110,28 +149,250 @@ class MoodDiaryEntryCreateView(AuthenticatedClientRoleMixin, CreateView):
         HttpResponse
             Redirects to the list of mood diary entries.
         """
-        start_time = form.cleaned_data.get("start_time")
-        end_time = form.cleaned_data.get("end_time")
-        start_date = form.cleaned_data.get("date")
-        end_date = form.cleaned_data.get("end_date")
+        client = self.request.user.client
         entry = form.save(commit=False)
-        for index in range((days_between := (end_date - start_date).days) + 1):
-            entry.id = None
-            entry.date = start_date + timezone.timedelta(days=index)
-            entry.start_time = "00:00:00"
-            entry.end_time = "23:59:59"
-            if index == 0:
-                entry.start_time = start_time
-            if index == days_between:
-                entry.end_time = end_time
-            entry.mood_diary = (client := self.request.user.client).mood_diary
-            entry.save()
-            # Trigger evaluation of event-based rules
-            msg = RuleMessage(client_id=client.id, timestamp=entry.updated_at)
-            task_event_based_rules_evaluation.delay(msg)
+        entry.mood_diary = client.mood_diary
+        entries = MoodDiaryEntry.bulk_create_days(entry, form.cleaned_data.get("end_date"))
+        # Trigger evaluation of event-based rules once for all days
+        msg = RuleMessage(client_id=client.id, timestamp=entries[-1].updated_at)
+        schedule_event_based_rules_evaluation(msg)
         return redirect("diaries:list_mood_diary_entries")
 
 
+class MoodDiaryEntryImportView(AuthenticatedClientRoleMixin, View):
+    """
+    View for creating many mood diary entries at once, e.g. entries the client recorded
+    while offline, which are synced with a single request.
+    """
+
+    max_entries = 500
+    max_days = 1000  # Total number of days, as each day is stored as a separate entry
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        """
+        Upon receiving a POST request, validate the entries listed in the `entries` field of
+        the request body like MoodDiaryEntryCreateForm does (each holding a date, optional
+        end date, start time, end time, activity id, mood id and details) and create all of
+        them in bulk within one transaction, disassembled into separate entries per day.
+        If any of them is invalid or they span more than `max_days` days in total, none of
+        them is created.
+        Evaluation of event-based rules is triggered once for all entries.
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        HttpResponse
+            Holding the number of created entries, or the errors per invalid entry
+            (by index) if any entry is invalid.
+        """
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        entries = data.get("entries") if isinstance(data, dict) else None
+        if not (
+            isinstance(entries, list)
+            and 0 < len(entries) <= self.max_entries
+            and all(isinstance(entry, dict) for entry in entries)
+        ):
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+
+        forms = [MoodDiaryEntryImportForm(data=entry) for entry in entries]
+        if errors := {
+            index: form.errors.get_json_data()
+            for index, form in enumerate(forms)
+            if not form.is_valid()
+        }:
+            return JsonResponse({"errors": errors}, status=http.HTTPStatus.BAD_REQUEST)
+        if sum(form.get_days() for form in forms) > self.max_days:
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+
+        client = request.user.client
+        created_entries = MoodDiaryEntry.bulk_create_entries(
+            client.mood_diary.id,
+            [(form.save(commit=False), form.cleaned_data["end_date"]) for form in forms],
+        )
+        # Trigger evaluation of event-based rules once for all entries
+        msg = RuleMessage(
+            client_id=client.id,
+            timestamp=max(entry.updated_at for entry in created_entries),
+        )
+        schedule_event_based_rules_evaluation(msg)
+        return JsonResponse({"created": len(created_entries)}, status=http.HTTPStatus.CREATED)
+
+
+class MoodDiaryEntrySyncView(AuthenticatedClientRoleMixin, View):
+    """
+    View for replaying writes of mood diary entries that the PWA queued while offline
+    (see static/js/serviceworker.js), in batches.
+    Each write carries an idempotency key, so that writes replayed more than once are
+    applied only once.
+    """
+
+    max_operations = 100
+    max_days = 1000  # Total number of days of the entries to be created
+
+    @staticmethod
+    def parse_operations(data) -> list[tuple[uuid.UUID, int | None, dict]]:
+        """
+        Parse the `operations` field of the request body, each operation holding a `key`
+        (UUID), the `id` of the entry to update (or null to create an entry) and the
+        `entry` data as submitted with MoodDiaryEntryCreateForm or MoodDiaryEntryForm.
+
+        Parameters
+        ----------
+        data
+            Request body
+
+        Returns
+        -------
+        list[tuple[uuid.UUID, int | None, dict]]
+
+        Raises
+        ------
+        ValueError
+            If the operations are malformed.
+        """
+        operations = data.get("operations") if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("No operations given.")
+        parsed = []
+        for operation in operations:
+            if not (
+                isinstance(operation, dict)
+                and isinstance(operation.get("key"), str)
+                and isinstance(operation.get("entry"), dict)
+                and (operation.get("id") is None or isinstance(operation["id"], int))
+            ):
+                raise ValueError(f"Malformed operation: {operation}")
+            parsed.append((uuid.UUID(operation["key"]), operation.get("id"), operation["entry"]))
+        return parsed
+
+    @staticmethod
+    def validate_operations(
+        mood_diary: MoodDiary, operations: list[tuple[uuid.UUID, int | None, dict]]
+    ) -> tuple[list[dict], list[tuple], list[tuple]]:
+        """
+        Validate the operations on the mood diary, skipping those whose keys have been
+        applied already (including duplicates within the operations).
+
+        Parameters
+        ----------
+        mood_diary: MoodDiary
+        operations: list[tuple[uuid.UUID, int | None, dict]]
+
+        Returns
+        -------
+        tuple[list[dict], list[tuple], list[tuple]]
+            The outcome per operation as well as the keys and valid forms of the entries
+            to be created and of the entries to be updated.
+        """
+        applied_keys = set(
+            mood_diary.sync_keys.filter(key__in=[key for key, _, _ in operations]).values_list(
+                "key", flat=True
+            )
+        )
+        entries = mood_diary.entries.in_bulk(
+            [entry_id for _, entry_id, _ in operations if entry_id is not None]
+        )
+        results = []
+        created_forms = []
+        updated_forms = []
+        for key, entry_id, data in operations:
+            result = {"key": str(key)}
+            results.append(result)
+            if key in applied_keys:
+                result["status"] = "duplicate"
+                continue
+            if entry_id is None:
+                form = MoodDiaryEntryImportForm(data=data)
+            elif entry_id in entries:
+                form = MoodDiaryEntrySyncUpdateForm(data=data, instance=entries[entry_id])
+            else:
+                result["status"] = "not_found"
+                continue
+            if not form.is_valid():
+                result["status"] = "invalid"
+                result["errors"] = form.errors.get_json_data()
+                continue
+            applied_keys.add(key)
+            if entry_id is None:
+                result["status"] = "created"
+                created_forms.append((key, form))
+            else:
+                result["status"] = "updated"
+                updated_forms.append((key, form))
+        return results, created_forms, updated_forms
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        """
+        Upon receiving a POST request, apply all operations whose keys have not been applied
+        before. Entries to be created are validated like MoodDiaryEntryCreateForm does and
+        created in bulk, entries to be updated are validated like MoodDiaryEntryForm does.
+        All writes and their keys are stored within one transaction, and evaluation of
+        event-based rules is triggered once for all of them.
+        Unlike MoodDiaryEntryImportView, invalid operations do not prevent others from
+        being applied, as retrying them would not help and must not block the queue.
+        The request is rejected if the entries to be created span more than `max_days`
+        days in total.
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        HttpResponse
+            Holding the outcome per operation: "created", "updated", "duplicate" (applied
+            before), "not_found" (the entry to update does not exist) or "invalid" (along
+            with the errors).
+            Conflicts if the operations are applied by another request at the same time.
+        """
+        try:
+            operations = self.parse_operations(json.loads(request.body))
+        except ValueError:
+            # Includes json.JSONDecodeError
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        if len(operations) > self.max_operations:
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+
+        client = request.user.client
+        mood_diary = client.mood_diary
+        results, created_forms, updated_forms = self.validate_operations(mood_diary, operations)
+        if sum(form.get_days() for _, form in created_forms) > self.max_days:
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        if not created_forms and not updated_forms:
+            return JsonResponse({"results": results})
+        try:
+            with transaction.atomic():
+                MoodDiarySyncKey.objects.bulk_create(
+                    MoodDiarySyncKey(mood_diary=mood_diary, key=key)
+                    for key, _ in created_forms + updated_forms
+                )
+                written_entries = [form.save() for _, form in updated_forms]
+                if created_forms:
+                    written_entries += MoodDiaryEntry.bulk_create_entries(
+                        mood_diary.id,
+                        [
+                            (form.save(commit=False), form.cleaned_data["end_date"])
+                            for _, form in created_forms
+                        ],
+                    )
+        except IntegrityError:
+            return HttpResponse(status=http.HTTPStatus.CONFLICT)
+
+        # Trigger evaluation of event-based rules once for all entries
+        msg = RuleMessage(
+            client_id=client.id,
+            timestamp=max(entry.updated_at for entry in written_entries),
+        )
+        schedule_event_based_rules_evaluation(msg)
+        return JsonResponse({"results": results})
+
+
 class MoodDiaryEntryUpdateView(
     AuthenticatedClientRoleMixin, RestrictMoodDiaryEntryToOwnerMixin, UpdateView
 ):
@@ -171,7 +432,7 @@ class MoodDiaryEntryUpdateView(
 
         # Trigger evaluation of event-based rules
         msg = RuleMessage(client_id=self.request.user.client.id, timestamp=self.object.updated_at)
-        task_event_based_rules_evaluation.delay(msg)
+        schedule_event_based_rules_evaluation(msg)
 
         return response
 
@@ -219,14 +480,17 @@ class ActivitySelect2QuerySetView(AutoResponseView):
     to properly display activities grouped by their categories.
     """
 
-    def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         """
         Django-Select2 does not provide the possibility to combine a search field
         and results organized hierarchically (using <optgroup>) out of the box.
-        Therefore, this view processes results for a proper display.
-        Return a django.http.JsonResponse with results grouped in a way that
-        they can be displayed in <optgroup> options.
+        Therefore, this view returns results grouped in a way that they can be displayed
+        in <optgroup> options.
         For an example, see https://select2.org/data-sources/formats#grouped-data.
+        Further pages of results are requested by the widget when scrolling.
+        As this view is requested on every keystroke, the activities are searched in
+        an in-memory catalog and the prebuilt JSON is served without touching the database
+        (see diaries.catalog).
 
         Parameters
         ----------
@@ -236,49 +500,19 @@ class ActivitySelect2QuerySetView(AutoResponseView):
 
         Returns
         -------
-        JsonResponse
-            Activity and ActivityCategory entities grouped in a way that they
+        HttpResponse
+            JSON holding Activity and ActivityCategory entities grouped in a way that they
             can be displayed in <optgroup> options.
         """
         self.widget = self.get_widget_or_404()
-        self.term = kwargs.get("term", request.GET.get("term", ""))
-        self.object_list = self.get_queryset()
-        context = self.get_context_data()
-        result_dict = self.queryset_to_dict(self.object_list)
-        result_dict["more"] = context["page_obj"].has_next()
-        return JsonResponse(
-            result_dict,
-            encoder=import_string(settings.SELECT2_JSON_ENCODER),
+        term = kwargs.get("term", request.GET.get("term", ""))
+        try:
+            page = int(request.GET.get("page", 1))
+        except ValueError:
+            raise Http404("Invalid page.")
+        if page < 1:
+            raise Http404("Invalid page.")
+        catalog = activity_search.get_catalog(get_language_from_request(request))
+        return HttpResponse(
+            catalog.search(term, self.widget.max_results, page), content_type="application/json"
         )
-
-    def queryset_to_dict(self, queryset: QuerySet) -> dict:
-        """
-        Transform the queryset to a dict where activities are ordered within their
-        categories.
-        Activities are ordered by German categories by default (see the Activity model)
-        so that itertool's groupby can work correctly.
-
-        Parameters
-        ----------
-        queryset: QuerySet
-
-        Returns
-        -------
-        dict
-            Activities grouped by their categories as a dict.
-        """
-        lang = get_language_from_request(self.request)
-        if lang == "en":
-            queryset = queryset.order_by("category__value_en", "value_en")
-
-        results = []
-        for category, activities in groupby(queryset, key=lambda x: x.category):
-            category_dict = {
-                "text": str(category),
-                "children": [{"id": activity.id, "text": str(activity)} for activity in activities],
-            }
-            results.append(category_dict)
-
-        return {
-            "results": results,
-        }
@@ -0,0 +1,23 @@
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+from notifications.unread import get_unread_notifications
+
+
+def unread_notifications(request: HttpRequest) -> dict:
+    """
+    Add the unread notifications of client users to the template context.
+    They are only fetched (from the cache) if a template actually uses them.
+
+    Parameters
+    ----------
+    request: HttpRequest
+
+    Returns
+    -------
+    dict
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated or not user.is_client():
+        return {}
+    user_id = user.id
+    return {"unread_notifications": SimpleLazyObject(lambda: get_unread_notifications(user_id))}
@@ -1,11 +1,15 @@
 import http
 import json
-import logging
+from datetime import timedelta
+from urllib.parse import urlsplit
 
+import requests
 from core.models import TrackCreationAndUpdates
 from django.conf import settings
-from django.db import models
-from pywebpush import WebPushException, webpush
+from django.db import models, transaction
+from django.utils import timezone
+from notifications.vapid import vapid_signer
+from pywebpush import webpush
 
 
 class Notification(TrackCreationAndUpdates):
@@ -16,6 +20,12 @@ class Notification(TrackCreationAndUpdates):
     class Meta:
         db_table = "notifications_notifications"
         ordering = ["viewed", "-created_at"]
+        indexes = [
+            # Notifications of a client, in the ordering of the notification list
+            models.Index(
+                fields=["client", "viewed", "-created_at", "-id"], name="notif_client_list_idx"
+            ),
+        ]
 
     client = models.ForeignKey(
         "clients.Client",
@@ -46,19 +56,72 @@ class PushSubscription(TrackCreationAndUpdates):
         related_name="push_subscriptions",
     )
     subscription = models.JSONField()
+    # Consecutive failed deliveries, the subscription is suspended after too many of them
+    failure_count = models.PositiveIntegerField(default=0)
+    suspended_until = models.DateTimeField(null=True, blank=True, default=None)
 
-    logger = logging.getLogger("notifications.models.PushSubscription")
+    # Push services respond with one of these if a subscription expired or was revoked
+    expired_status_codes = {http.HTTPStatus.NOT_FOUND, http.HTTPStatus.GONE}
+    # Consecutive failures after which deliveries to a subscription are suspended
+    suspension_threshold = 3
+    suspension_duration = timedelta(hours=1)
+    # Consecutive failures after which a subscription is deleted
+    pruning_threshold = 10
 
-    def send_push_notification(self, message: dict):
+    @property
+    def suspended(self) -> bool:
         """
-        Send a push notification using the subscription the current model instance holds.
-        The message that is sent is encrypted via the VAPID protocol so that the push
-        service cannot access it.
+        Whether deliveries to the subscription are suspended as it failed too often.
+        """
+        return self.suspended_until is not None and self.suspended_until > timezone.now()
+
+    def record_success(self):
+        """
+        Reset the failures of the subscription after a successful delivery.
+        The instance is updated in memory only.
+
+        Returns
+        -------
+        None
+        """
+        self.failure_count = 0
+        self.suspended_until = None
+
+    def record_failure(self):
+        """
+        Count a failed delivery and suspend the subscription if it failed too often
+        in a row. The instance is updated in memory only.
+
+        Returns
+        -------
+        None
+        """
+        self.failure_count += 1
+        if self.failure_count >= self.suspension_threshold:
+            self.suspended_until = timezone.now() + self.suspension_duration * 2 ** (
+                self.failure_count - self.suspension_threshold
+            )
+
+    @property
+    def origin(self) -> str:
+        """
+        Origin (scheme and host) of the push service the subscription belongs to.
+        """
+        endpoint = urlsplit(self.subscription["endpoint"])
+        return f"{endpoint.scheme}://{endpoint.netloc}"
+
+    def push(self, message: dict, requests_session: requests.Session = None):
+        """
+        Send an encrypted push notification to the push service of the subscription
+        without any error handling or database access, so that it can be used from
+        several threads at once.
 
         Parameters
         ----------
         message: dict
             The push notification content.
+        requests_session: requests.Session
+            Session to reuse connections to the push service with.
 
         Returns
         -------
@@ -67,24 +130,114 @@ class PushSubscription(TrackCreationAndUpdates):
         Raises
         ------
         WebPushException
+        requests.RequestException
+            E.g. requests.Timeout if the push service does not respond within
+            `WEB_PUSH_TIMEOUT` seconds.
         """
-        self.logger.info(f"Trying to send push notification to {self.client.identifier}")
-        try:
-            webpush(
-                subscription_info=self.subscription,
-                data=json.dumps(message),
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={
-                    "sub": "mailto:info@mood-diary.de",
-                },
-                ttl=settings.WEB_PUSH_TTL,
+        webpush(
+            subscription_info=self.subscription,
+            data=json.dumps(message),
+            # Signed by the shared signer instead of on every call
+            headers=vapid_signer.get_headers(self.origin),
+            ttl=settings.WEB_PUSH_TTL,
+            timeout=settings.WEB_PUSH_TIMEOUT,
+            requests_session=requests_session,
+        )
+
+
+class PushDelivery(TrackCreationAndUpdates):
+    """
+    This is the PushDelivery model representing a push notification to be delivered to
+    a push subscription. Deliveries are kept as an outbox, so that failed ones can be
+    retried with an exponential backoff.
+    """
+
+    class Meta:
+        db_table = "notifications_push_deliveries"
+        indexes = [
+            # Pending deliveries that are due (retries)
+            models.Index(fields=["status", "next_attempt_at"], name="notif_delivery_due_idx"),
+        ]
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        SENDING = "sending"
+        SENT = "sent"
+        FAILED = "failed"
+
+    subscription = models.ForeignKey(
+        PushSubscription, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    message = models.JSONField()
+    status = models.CharField(choices=Status.choices, max_length=255, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True, default=None)
+
+    max_attempts = 5
+    backoff = timedelta(minutes=1)
+    # Deliveries still being sent after this long are retried, e.g. if the worker died
+    claim_timeout = timedelta(minutes=15)
+
+    @classmethod
+    def claim(cls, deliveries: models.QuerySet["PushDelivery"]) -> list["PushDelivery"]:
+        """
+        Claim the given deliveries for sending, so that concurrent tasks do not send them
+        again. Deliveries locked by another task are skipped. The claimed ones are marked
+        as being sent until `claim_timeout` has passed, within a transaction of their own.
+
+        Parameters
+        ----------
+        deliveries: QuerySet[PushDelivery]
+
+        Returns
+        -------
+        list[PushDelivery]
+            The claimed deliveries, with their subscriptions selected.
+        """
+        with transaction.atomic():
+            claimed = list(
+                deliveries.select_for_update(skip_locked=True, of=("self",)).select_related(
+                    "subscription"
+                )
             )
-            self.logger.info(f"Successfully sent push notification to {self.client.identifier}")
-        except WebPushException as e:
-            self.logger.error(f"Error sending push notification to {self.client.identifier}")
-            self.logger.error(e)
-            # If the subscription is expired or no longer valid, delete it
-            if e.response.status_code == http.HTTPStatus.GONE:
-                self.delete()
-            else:
-                raise e
+            now = timezone.now()
+            for delivery in claimed:
+                delivery.status = cls.Status.SENDING
+                delivery.next_attempt_at = now + cls.claim_timeout
+                delivery.updated_at = now
+            cls.objects.bulk_update(claimed, fields=["status", "next_attempt_at", "updated_at"])
+        return claimed
+
+    def record_success(self):
+        """
+        Mark the delivery as sent. The instance is updated in memory only.
+
+        Returns
+        -------
+        None
+        """
+        self.attempts += 1
+        self.status = self.Status.SENT
+        self.last_error = None
+
+    def record_failure(self, error: Exception):
+        """
+        Count a failed attempt and schedule the next one with an exponential backoff,
+        or give up after too many attempts. The instance is updated in memory only.
+
+        Parameters
+        ----------
+        error: Exception
+
+        Returns
+        -------
+        None
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= self.max_attempts:
+            self.status = self.Status.FAILED
+        else:
+            self.status = self.Status.PENDING
+            self.next_attempt_at = timezone.now() + self.backoff * 2 ** (self.attempts - 1)
@@ -0,0 +1,17 @@
+from clients.models import Client
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from notifications.models import Notification
+from notifications.unread import invalidate_unread_notifications
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_notifications_on_change(sender, instance: Notification, **kwargs):
+    """
+    Make the navigation bar of the client reload their unread notifications
+    when a notification is created, viewed or deleted.
+    """
+    invalidate_unread_notifications(
+        Client.objects.filter(id=instance.client_id).values_list("user_id", flat=True)
+    )
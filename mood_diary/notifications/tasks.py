@@ -0,0 +1,270 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from celery import shared_task
+from django.utils import timezone
+from notifications.models import PushDelivery, PushSubscription
+from pywebpush import WebPushException
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("mood_diary.notifications.tasks")
+
+# Number of push notifications sent concurrently by a single task
+PUSH_DELIVERY_MAX_WORKERS = 10
+# Number of due deliveries retried by a single task
+PUSH_DELIVERY_RETRY_BATCH_SIZE = 500
+# Deliveries that are no longer pending are kept for this long
+PUSH_DELIVERY_RETENTION = timedelta(days=7)
+
+
+def create_requests_session() -> requests.Session:
+    """
+    Create a session whose connection pool can serve all threads of a delivery at once,
+    so that connections to a push service are kept alive and reused.
+
+    Returns
+    -------
+    requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=PUSH_DELIVERY_MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def push(
+    subscription: PushSubscription, message: dict, requests_session: requests.Session
+) -> Exception | None:
+    """
+    Send a push notification to a single subscription, returning instead of raising
+    errors, so that a failing subscription does not prevent the delivery to the others.
+    Timeouts (requests.Timeout) are returned like any other error of the push service,
+    so that the delivery is retried.
+
+    Parameters
+    ----------
+    subscription: PushSubscription
+    message: dict
+    requests_session: requests.Session
+
+    Returns
+    -------
+    Exception | None
+        The error that occurred, if any.
+    """
+    try:
+        subscription.push(message, requests_session=requests_session)
+    except (WebPushException, requests.RequestException) as e:
+        return e
+    return None
+
+
+def is_expired(error: Exception) -> bool:
+    """
+    Check if a push notification failed because the subscription expired or was revoked.
+
+    Parameters
+    ----------
+    error: Exception
+
+    Returns
+    -------
+    bool
+    """
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in PushSubscription.expired_status_codes
+
+
+def deliver(deliveries: list[PushDelivery]):
+    """
+    Send the push notifications of the given deliveries and record the outcome.
+    The deliveries are grouped by the origin of their push service and one session is
+    used per origin, so that connections are reused for all subscriptions of a push
+    service. The push notifications are sent concurrently by a pool of threads, which
+    do not access the database.
+    Afterwards, failed deliveries are scheduled for a retry with an exponential backoff
+    and subscriptions failing repeatedly are suspended, while subscriptions that are
+    no longer valid are deleted.
+
+    Parameters
+    ----------
+    deliveries: list[PushDelivery]
+        Deliveries claimed for sending (see PushDelivery.claim).
+
+    Returns
+    -------
+    None
+    """
+    # Share one instance per subscription between all of its deliveries
+    subscriptions = {delivery.subscription_id: delivery.subscription for delivery in deliveries}
+    deliveries_per_origin = defaultdict(list)
+    for delivery in deliveries:
+        delivery.subscription = subscriptions[delivery.subscription_id]
+        deliveries_per_origin[delivery.subscription.origin].append(delivery)
+    sessions = {origin: create_requests_session() for origin in deliveries_per_origin}
+    deliveries = [
+        (delivery, sessions[origin])
+        for origin, origin_deliveries in deliveries_per_origin.items()
+        for delivery in origin_deliveries
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=PUSH_DELIVERY_MAX_WORKERS) as executor:
+            errors = list(
+                executor.map(
+                    lambda args: push(args[0].subscription, args[0].message, args[1]), deliveries
+                )
+            )
+    finally:
+        for session in sessions.values():
+            session.close()
+
+    now = timezone.now()
+    expired_subscription_ids = set()
+    for (delivery, _), error in zip(deliveries, errors):
+        subscription = delivery.subscription
+        delivery.updated_at = now
+        if error is None:
+            delivery.record_success()
+            subscription.record_success()
+            continue
+        logger.error(f"Error sending push notification to subscription {subscription.id}")
+        logger.error(error)
+        # If the subscription is expired or no longer valid, delete it
+        if is_expired(error):
+            expired_subscription_ids.add(subscription.id)
+            continue
+        delivery.record_failure(error)
+        subscription.record_failure()
+        if subscription.suspended:
+            delivery.next_attempt_at = max(delivery.next_attempt_at, subscription.suspended_until)
+
+    PushDelivery.objects.bulk_update(
+        [delivery for delivery, _ in deliveries],
+        fields=["status", "attempts", "next_attempt_at", "last_error", "updated_at"],
+    )
+    PushSubscription.objects.bulk_update(
+        [
+            subscription
+            for subscription in subscriptions.values()
+            if subscription.id not in expired_subscription_ids
+        ],
+        fields=["failure_count", "suspended_until"],
+    )
+    if expired_subscription_ids:
+        PushSubscription.objects.filter(id__in=expired_subscription_ids).delete()
+    logger.info(
+        f"Sent {errors.count(None)} of {len(deliveries)} push notifications, "
+        f"deleted {len(expired_subscription_ids)} expired subscriptions"
+    )
+
+
+def schedule_push_notifications(subscription_ids: list[int], message: dict):
+    """
+    Store a delivery of the push notification for each of the given subscriptions in
+    the outbox and send them asynchronously.
+    Deliveries to suspended subscriptions are not attempted before the suspension ends.
+
+    Parameters
+    ----------
+    subscription_ids: list[int]
+    message: dict
+        The push notification content.
+
+    Returns
+    -------
+    None
+    """
+    now = timezone.now()
+    deliveries, suspended_deliveries = [], []
+    for subscription_id, suspended_until in PushSubscription.objects.filter(
+        id__in=subscription_ids
+    ).values_list("id", "suspended_until"):
+        # Picked up by the retry task in case the delivery task gets lost
+        delivery = PushDelivery(
+            subscription_id=subscription_id,
+            message=message,
+            next_attempt_at=now + PushDelivery.backoff,
+        )
+        if suspended_until is not None and suspended_until > now:
+            delivery.next_attempt_at = max(delivery.next_attempt_at, suspended_until)
+            suspended_deliveries.append(delivery)
+        else:
+            deliveries.append(delivery)
+    PushDelivery.objects.bulk_create(deliveries + suspended_deliveries)
+    if deliveries:
+        task_send_push_notifications.delay([delivery.id for delivery in deliveries])
+
+
+@shared_task
+def task_send_push_notifications(delivery_ids: list[int]):
+    """
+    Task to send the push notifications of many deliveries at once, decoupled from
+    rule evaluation so that slow push services do not hold it up.
+
+    Parameters
+    ----------
+    delivery_ids: list[int]
+
+    Returns
+    -------
+    None
+    """
+    deliveries = PushDelivery.claim(
+        PushDelivery.objects.filter(id__in=delivery_ids, status=PushDelivery.Status.PENDING)
+    )
+    deliver(deliveries)
+
+
+@shared_task
+def task_retry_push_deliveries():
+    """
+    Task to retry pending deliveries that are due, skipping suspended subscriptions.
+    Deliveries whose sending has not been completed within the claim timeout of
+    PushDelivery are retried as well.
+    This task will run every minute.
+
+    Returns
+    -------
+    None
+    """
+    now = timezone.now()
+    deliveries = PushDelivery.claim(
+        PushDelivery.objects.filter(
+            status__in=[PushDelivery.Status.PENDING, PushDelivery.Status.SENDING],
+            next_attempt_at__lte=now,
+        )
+        .exclude(subscription__suspended_until__gt=now)
+        .order_by("next_attempt_at")[:PUSH_DELIVERY_RETRY_BATCH_SIZE]
+    )
+    deliver(deliveries)
+
+
+@shared_task
+def task_prune_push_subscriptions():
+    """
+    Task to delete subscriptions that keep failing, along with their deliveries,
+    as well as deliveries that have been completed a while ago.
+    This task will run daily.
+
+    Returns
+    -------
+    None
+    """
+    _, deleted_subscriptions = PushSubscription.objects.filter(
+        failure_count__gte=PushSubscription.pruning_threshold
+    ).delete()
+    _, deleted_deliveries = (
+        PushDelivery.objects.exclude(
+            status__in=[PushDelivery.Status.PENDING, PushDelivery.Status.SENDING]
+        )
+        .filter(updated_at__lt=timezone.now() - PUSH_DELIVERY_RETENTION)
+        .delete()
+    )
+    logger.info(
+        f"Pruned {deleted_subscriptions.get('notifications.PushSubscription', 0)} push "
+        f"subscriptions and {deleted_deliveries.get('notifications.PushDelivery', 0)} deliveries"
+    )
@@ -25,3 +25,11 @@ class PushSubscriptionFactory(factory.django.DjangoModelFactory):
             "auth": "Stn8bCwWxn7CLiR_2hLeDA",
         },
     }
+
+
+class PushDeliveryFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = "notifications.PushDelivery"
+
+    subscription = factory.SubFactory(PushSubscriptionFactory)
+    message = {"title": "title", "text": "text", "url": "/"}
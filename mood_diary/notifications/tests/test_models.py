@@ -1,53 +1,22 @@
-import http
-import json
-
 import pytest
-from clients.tests.factories import ClientFactory
-from notifications.models import PushSubscription
+from django.conf import settings
 from notifications.tests.factories import PushSubscriptionFactory
 from pytest_mock import MockerFixture
-from pywebpush import WebPushException
 
 
 @pytest.mark.django_db
-def test_push_subscription_send_push_notification(mocker: MockerFixture):
+def test_push_subscription_push(mocker: MockerFixture):
     mocked_function = mocker.patch("notifications.models.webpush")
-
-    client = ClientFactory.create()
-    subscription = PushSubscriptionFactory.create(client=client)
-    subscription.send_push_notification({"test": "test"})
-    assert mocked_function.call_count == 1
-    assert mocked_function.call_args[1]["subscription_info"] == subscription.subscription
-    assert mocked_function.call_args[1]["data"] == json.dumps({"test": "test"})
-
-
-@pytest.mark.django_db
-def test_push_subscription_send_push_notification_fails_invalid_subscription(mocker: MockerFixture):
-    class WebPushResponse:
-        status_code = http.HTTPStatus.GONE
-
-    web_push_exception = WebPushException("error", response=WebPushResponse())
-    mocked_function = mocker.patch("notifications.models.webpush", side_effect=web_push_exception)
-
-    client = ClientFactory.create()
-    subscription = PushSubscriptionFactory.create(client=client)
-    subscription.send_push_notification({"test": "test"})
-    assert mocked_function.call_count == 1
-    # Invalid subscription, so it should be deleted
-    assert PushSubscription.objects.exists() is False
-
-
-@pytest.mark.django_db
-def test_push_subscription_send_push_notification_fails_other(mocker: MockerFixture):
-    class WebPushResponse:
-        status_code = http.HTTPStatus.IM_A_TEAPOT
-
-    web_push_exception = WebPushException("error", response=WebPushResponse())
-    mocked_function = mocker.patch("notifications.models.webpush", side_effect=web_push_exception)
-
-    client = ClientFactory.create()
-    subscription = PushSubscriptionFactory.create(client=client)
-    with pytest.raises(WebPushException):
-        subscription.send_push_notification({"test": "test"})
-
-    assert mocked_function.call_count == 1
+    mocked_signer = mocker.patch(
+        "notifications.models.vapid_signer.get_headers", return_value={"Authorization": "vapid"}
+    )
+    subscription = PushSubscriptionFactory.create()
+    subscription.push({"test": "test"})
+    subscription.push({"test": "test"})
+    assert mocked_function.call_count == 2
+    # VAPID headers are provided by the signer for the push service's origin
+    mocked_signer.assert_called_with("https://fcm.googleapis.com")
+    assert mocked_function.call_args[1]["headers"] == {"Authorization": "vapid"}
+    assert "vapid_private_key" not in mocked_function.call_args[1]
+    # Hung push services do not block the delivery
+    assert mocked_function.call_args[1]["timeout"] == settings.WEB_PUSH_TIMEOUT
@@ -0,0 +1,208 @@
+import http
+from datetime import timedelta
+
+import pytest
+import requests
+from django.utils import timezone
+from notifications.models import PushDelivery, PushSubscription
+from notifications.tasks import (
+    schedule_push_notifications,
+    task_prune_push_subscriptions,
+    task_retry_push_deliveries,
+    task_send_push_notifications,
+)
+from notifications.tests.factories import PushDeliveryFactory, PushSubscriptionFactory
+from pytest_mock import MockerFixture
+from pywebpush import WebPushException
+
+
+def create_subscription(endpoint: str, **kwargs) -> PushSubscription:
+    subscription = dict(PushSubscriptionFactory.subscription, endpoint=endpoint)
+    return PushSubscriptionFactory.create(subscription=subscription, **kwargs)
+
+
+def webpush(subscription_info, **kwargs):
+    """Respond with the status code the endpoint of the subscription ends with."""
+
+    class WebPushResponse:
+        status_code = int(subscription_info["endpoint"].rsplit("/", 1)[-1])
+
+    if WebPushResponse.status_code == http.HTTPStatus.GATEWAY_TIMEOUT:
+        raise requests.Timeout("timeout")
+    if WebPushResponse.status_code != http.HTTPStatus.CREATED:
+        raise WebPushException("error", response=WebPushResponse())
+
+
+@pytest.mark.django_db
+def test_schedule_push_notifications(mocker: MockerFixture, freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    mocked_task = mocker.patch("notifications.tasks.task_send_push_notifications.delay")
+    subscription = PushSubscriptionFactory.create()
+    suspended_subscription = PushSubscriptionFactory.create(
+        suspended_until=timezone.now() + timedelta(hours=2)
+    )
+    schedule_push_notifications([subscription.id, suspended_subscription.id], {"test": "test"})
+    assert PushDelivery.objects.count() == 2
+    delivery = PushDelivery.objects.get(subscription=subscription)
+    assert delivery.status == PushDelivery.Status.PENDING
+    assert delivery.message == {"test": "test"}
+    # Only deliveries to subscriptions that are not suspended are sent right away
+    mocked_task.assert_called_once_with([delivery.id])
+    suspended_delivery = PushDelivery.objects.get(subscription=suspended_subscription)
+    assert suspended_delivery.next_attempt_at == suspended_subscription.suspended_until
+
+
+@pytest.mark.django_db
+def test_task_send_push_notifications(mocker: MockerFixture):
+    mocked_function = mocker.patch("notifications.models.webpush")
+    deliveries = [
+        PushDeliveryFactory.create(subscription=create_subscription(endpoint))
+        for endpoint in [
+            "https://fcm.googleapis.com/fcm/send/1",
+            "https://fcm.googleapis.com/fcm/send/2",
+            "https://updates.push.services.mozilla.com/wpush/v2/3",
+        ]
+    ]
+    task_send_push_notifications([delivery.id for delivery in deliveries])
+    assert mocked_function.call_count == 3
+    assert set(PushDelivery.objects.values_list("status", flat=True)) == {PushDelivery.Status.SENT}
+    # One session per push service, shared by all of its subscriptions
+    sessions = {
+        call.kwargs["subscription_info"]["endpoint"]: call.kwargs["requests_session"]
+        for call in mocked_function.call_args_list
+    }
+    assert (
+        sessions["https://fcm.googleapis.com/fcm/send/1"]
+        is sessions["https://fcm.googleapis.com/fcm/send/2"]
+    )
+    assert (
+        sessions["https://fcm.googleapis.com/fcm/send/1"]
+        is not sessions["https://updates.push.services.mozilla.com/wpush/v2/3"]
+    )
+
+    # Deliveries are only sent once
+    task_send_push_notifications([delivery.id for delivery in deliveries])
+    assert mocked_function.call_count == 3
+
+
+@pytest.mark.django_db
+def test_task_send_push_notifications_fails(mocker: MockerFixture, freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    mocked_function = mocker.patch("notifications.models.webpush", side_effect=webpush)
+    deliveries = {
+        status_code: PushDeliveryFactory.create(
+            subscription=create_subscription(f"https://fcm.googleapis.com/fcm/send/{status_code}")
+        )
+        for status_code in [201, 404, 410, 500, 504]
+    }
+    task_send_push_notifications([delivery.id for delivery in deliveries.values()])
+    # Errors do not abort the delivery to the remaining subscriptions
+    assert mocked_function.call_count == 5
+    # Invalid subscriptions are deleted along with their deliveries
+    assert not PushSubscription.objects.filter(
+        id__in=[deliveries[404].subscription_id, deliveries[410].subscription_id]
+    ).exists()
+    assert PushDelivery.objects.count() == 3
+    # Other errors, including timeouts of the push service (504), are retried with a backoff
+    for status_code in [500, 504]:
+        delivery = PushDelivery.objects.get(id=deliveries[status_code].id)
+        assert delivery.status == PushDelivery.Status.PENDING
+        assert delivery.attempts == 1
+        assert delivery.next_attempt_at == timezone.now() + PushDelivery.backoff
+        assert delivery.last_error
+        assert delivery.subscription.failure_count == 1
+    assert PushDelivery.objects.get(id=deliveries[201].id).status == PushDelivery.Status.SENT
+
+
+@pytest.mark.django_db
+def test_task_retry_push_deliveries(mocker: MockerFixture, freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    mocked_function = mocker.patch("notifications.models.webpush", side_effect=webpush)
+    failing_delivery = PushDeliveryFactory.create(
+        subscription=create_subscription("https://fcm.googleapis.com/fcm/send/500")
+    )
+    subscription = failing_delivery.subscription
+    task_send_push_notifications([failing_delivery.id])
+    failing_delivery.refresh_from_db()
+
+    # Not due yet
+    task_retry_push_deliveries()
+    assert mocked_function.call_count == 1
+
+    # Backoff doubles with each attempt, until the subscription gets suspended
+    for attempt, backoff in [(2, timedelta(minutes=2)), (3, subscription.suspension_duration)]:
+        freezer.move_to(failing_delivery.next_attempt_at)
+        task_retry_push_deliveries()
+        assert mocked_function.call_count == attempt
+        failing_delivery.refresh_from_db()
+        assert failing_delivery.attempts == attempt
+        assert failing_delivery.next_attempt_at == timezone.now() + backoff
+    subscription.refresh_from_db()
+    assert subscription.failure_count == PushSubscription.suspension_threshold
+    assert subscription.suspended is True
+
+    # Deliveries of suspended subscriptions do not cost a request
+    other_delivery = PushDeliveryFactory.create(
+        subscription=subscription, next_attempt_at=timezone.now()
+    )
+    task_retry_push_deliveries()
+    assert mocked_function.call_count == 3
+
+    # Deliveries give up after too many attempts
+    for _ in range(PushDelivery.max_attempts - 3):
+        subscription.refresh_from_db()
+        freezer.move_to(subscription.suspended_until)
+        task_retry_push_deliveries()
+    failing_delivery.refresh_from_db()
+    other_delivery.refresh_from_db()
+    assert failing_delivery.status == PushDelivery.Status.FAILED
+    assert failing_delivery.attempts == PushDelivery.max_attempts
+    assert other_delivery.status == PushDelivery.Status.PENDING
+
+
+@pytest.mark.django_db
+def test_task_push_deliveries_claimed(mocker: MockerFixture, freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    mocked_deliver = mocker.patch("notifications.tasks.deliver")
+    delivery = PushDeliveryFactory.create()
+
+    # Deliveries are claimed before they are sent
+    task_send_push_notifications([delivery.id])
+    assert mocked_deliver.call_args.args[0] == [delivery]
+    delivery.refresh_from_db()
+    assert delivery.status == PushDelivery.Status.SENDING
+    assert delivery.next_attempt_at == timezone.now() + PushDelivery.claim_timeout
+
+    # so that neither a delayed send task nor the retry task sends them again meanwhile
+    freezer.move_to(timezone.now() + PushDelivery.backoff)
+    task_send_push_notifications([delivery.id])
+    assert mocked_deliver.call_args.args[0] == []
+    task_retry_push_deliveries()
+    assert mocked_deliver.call_args.args[0] == []
+
+    # Deliveries whose sending is not completed, e.g. as the worker died, are retried
+    freezer.move_to(delivery.next_attempt_at)
+    task_retry_push_deliveries()
+    assert mocked_deliver.call_args.args[0] == [delivery]
+
+
+@pytest.mark.django_db
+def test_task_prune_push_subscriptions(freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    failing_subscription = PushSubscriptionFactory.create(
+        failure_count=PushSubscription.pruning_threshold
+    )
+    PushDeliveryFactory.create(subscription=failing_subscription)
+    subscription = PushSubscriptionFactory.create(failure_count=1)
+    old_delivery = PushDeliveryFactory.create(
+        subscription=subscription, status=PushDelivery.Status.SENT
+    )
+    pending_delivery = PushDeliveryFactory.create(subscription=subscription)
+    freezer.move_to("2023-10-09 12:00:00")
+    recent_delivery = PushDeliveryFactory.create(
+        subscription=subscription, status=PushDelivery.Status.FAILED
+    )
+    task_prune_push_subscriptions()
+    assert list(PushSubscription.objects.all()) == [subscription]
+    assert set(PushDelivery.objects.all()) == {pending_delivery, recent_delivery}
+    assert not PushDelivery.objects.filter(id=old_delivery.id).exists()
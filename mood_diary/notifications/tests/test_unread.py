@@ -0,0 +1,89 @@
+import pytest
+from clients.tests.factories import ClientFactory
+from django.test import RequestFactory
+from notifications.context_processors import unread_notifications
+from notifications.tests.factories import NotificationFactory
+from notifications.unread import (
+    get_unread_notifications,
+    invalidate_unread_notifications,
+    load_unread_notifications,
+    mark_notifications_viewed,
+)
+from users.models import User
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+def test_load_unread_notifications():
+    client = ClientFactory.create()
+    unread_notifications = load_unread_notifications(client.user_id)
+    assert unread_notifications.count == 0
+    assert unread_notifications.newest == []
+
+    notifications = NotificationFactory.create_batch(size=4, client=client, viewed=False)
+    NotificationFactory.create(client=client, viewed=True)
+    NotificationFactory.create(viewed=False)  # other client
+    unread_notifications = load_unread_notifications(client.user_id)
+    assert unread_notifications.count == 4
+    assert [notification.id for notification in unread_notifications.newest] == [
+        notification.id for notification in reversed(notifications[1:])
+    ]
+    assert unread_notifications.newest[0].rule == notifications[-1].rule
+
+
+@pytest.mark.django_db
+def test_get_unread_notifications(django_assert_num_queries):
+    client = ClientFactory.create()
+    invalidate_unread_notifications([client.user_id])
+    notification = NotificationFactory.create(client=client, viewed=False)
+    assert get_unread_notifications(client.user_id).count == 1
+    # Served from the cache
+    with django_assert_num_queries(0):
+        assert get_unread_notifications(client.user_id).count == 1
+
+    # Creating, viewing and deleting notifications invalidates the cache
+    other_notification = NotificationFactory.create(client=client, viewed=False)
+    assert get_unread_notifications(client.user_id).count == 2
+    notification.viewed = True
+    notification.save()
+    assert get_unread_notifications(client.user_id).count == 1
+    other_notification.delete()
+    assert get_unread_notifications(client.user_id).count == 0
+    invalidate_unread_notifications([client.user_id])
+
+
+@pytest.mark.django_db
+def test_unread_notifications_context_processor(django_assert_num_queries):
+    client = ClientFactory.create()
+    invalidate_unread_notifications([client.user_id])
+    NotificationFactory.create(client=client, viewed=False)
+    request = RequestFactory().get("/")
+    request.user = client.user
+    context = unread_notifications(request)
+    assert context["unread_notifications"].count == 1
+    # Cached, so no queries are needed when rendering further pages
+    with django_assert_num_queries(0):
+        assert unread_notifications(request)["unread_notifications"].count == 1
+
+    request.user = UserFactory.create(role=User.Role.COUNSELOR)
+    assert unread_notifications(request) == {}
+    invalidate_unread_notifications([client.user_id])
+
+
+@pytest.mark.django_db
+def test_mark_notifications_viewed(django_assert_num_queries):
+    client = ClientFactory.create()
+    notifications = NotificationFactory.create_batch(size=3, client=client, viewed=False)
+    other_notification = NotificationFactory.create(viewed=False)
+    assert get_unread_notifications(client.user_id).count == 3
+
+    assert mark_notifications_viewed(client.user_id, [notifications[0].id]) == 1
+    assert get_unread_notifications(client.user_id).count == 2
+    # A single update query for any number of notifications
+    with django_assert_num_queries(1):
+        assert mark_notifications_viewed(client.user_id) == 2
+    assert get_unread_notifications(client.user_id).count == 0
+    assert mark_notifications_viewed(client.user_id) == 0
+    other_notification.refresh_from_db()
+    assert other_notification.viewed is False
+    invalidate_unread_notifications([client.user_id])
@@ -0,0 +1,25 @@
+from notifications.vapid import VapidSigner
+from py_vapid import Vapid
+from pytest_mock import MockerFixture
+
+
+def test_vapid_signer(mocker: MockerFixture, freezer):
+    freezer.move_to("2023-10-01 12:00:00")
+    spied_parse = mocker.spy(Vapid, "from_string")
+    spied_sign = mocker.spy(Vapid, "sign")
+    signer = VapidSigner()
+    headers = signer.get_headers("https://fcm.googleapis.com")
+    assert headers["Authorization"].startswith("vapid t=")
+    # Headers are cached per audience and the key is parsed once
+    assert signer.get_headers("https://fcm.googleapis.com") == headers
+    assert signer.get_headers("https://updates.push.services.mozilla.com") != headers
+    assert spied_parse.call_count == 1
+    assert spied_sign.call_count == 2
+
+    # Headers are renewed shortly before they expire
+    freezer.move_to("2023-10-01 12:50:00")
+    assert signer.get_headers("https://fcm.googleapis.com") == headers
+    freezer.move_to("2023-10-01 12:56:00")
+    assert signer.get_headers("https://fcm.googleapis.com") != headers
+    assert spied_parse.call_count == 1
+    assert spied_sign.call_count == 3
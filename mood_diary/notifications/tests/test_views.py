@@ -6,6 +6,8 @@ from clients.tests.factories import ClientFactory
 from django.urls import reverse
 from notifications.models import Notification
 from notifications.tests.factories import NotificationFactory
+from notifications.unread import get_unread_notifications
+from notifications.views import NotificationListView
 
 
 @pytest.mark.django_db
@@ -41,10 +43,27 @@ def test_notification_list_view(user, create_response):
 
     assert response.status_code == http.HTTPStatus.OK
     assert notification in (response_entries := response.context_data["notifications"])
-    assert response_entries.count() == 1
+    assert len(response_entries) == 1
     assert "notifications/notification_list.html" in response.template_name
 
 
+@pytest.mark.django_db
+def test_notification_list_view_conditional(user, client):
+    NotificationFactory.create(client=user.client, viewed=False)
+    url = reverse("notifications:get_all_notifications")
+    client.force_login(user)
+    # The first response sets the CSRF cookie the pages depend on
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == http.HTTPStatus.NOT_MODIFIED
+
+    # The unread notifications are shown in the navigation bar
+    client.post(reverse("notifications:mark_notifications_viewed"), content_type="application/json")
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == http.HTTPStatus.OK
+
+
 @pytest.mark.django_db
 def test_update_notifications_permission_view(user, create_response):
     assert user.client.push_notifications_granted is None
@@ -99,3 +118,72 @@ def test_push_subscription_create_view(user, create_response):
 
     assert response.status_code == http.HTTPStatus.OK
     assert user.client.push_subscriptions.count() == 1
+
+
+@pytest.mark.django_db
+def test_notifications_mark_viewed_view(user, create_response, django_assert_max_num_queries):
+    notifications = NotificationFactory.create_batch(size=3, client=user.client, viewed=False)
+    other_notification = NotificationFactory.create(viewed=False)
+    url = reverse("notifications:mark_notifications_viewed")
+
+    # A chosen set of notifications
+    response = create_response(
+        user,
+        url,
+        method="POST",
+        data=json.dumps({"ids": [notifications[0].id, other_notification.id]}),
+        content_type="application/json",
+    )
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == {"updated": 1}
+    assert get_unread_notifications(user.id).count == 2
+
+    # All notifications
+    response = create_response(user, url, method="POST", content_type="application/json")
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == {"updated": 2}
+    assert not Notification.objects.filter(client=user.client, viewed=False).exists()
+    assert get_unread_notifications(user.id).count == 0
+    other_notification.refresh_from_db()
+    assert other_notification.viewed is False
+
+    response = create_response(
+        user, url, method="POST", data=json.dumps({"ids": "all"}), content_type="application/json"
+    )
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "data",
+    [
+        "{not json",
+        json.dumps([1, 2]),
+        json.dumps("ids"),
+        json.dumps({"ids": ["1", 2]}),
+        json.dumps({"ids": [True]}),
+    ],
+)
+def test_notifications_mark_viewed_view_bad_request(user, create_response, data):
+    notification = NotificationFactory.create(client=user.client, viewed=False)
+    url = reverse("notifications:mark_notifications_viewed")
+
+    response = create_response(user, url, method="POST", data=data, content_type="application/json")
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    notification.refresh_from_db()
+    assert notification.viewed is False
+
+
+@pytest.mark.django_db
+def test_notification_list_view_queries(
+    user, create_response, monkeypatch, assert_constant_queries
+):
+    NotificationFactory.create_batch(5, client=user.client)
+    url = reverse("notifications:get_all_notifications")
+
+    def list_notifications(page_size):
+        monkeypatch.setattr(NotificationListView, "page_size", page_size)
+        assert len(create_response(user, url).context_data["notifications"]) == page_size
+
+    assert_constant_queries(list_notifications)
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.utils import timezone
+from notifications.models import Notification
+from rules.models import Rule
+from rules.registry import rule_registry
+
+# Summaries are invalidated whenever notifications change, the timeout only bounds memory usage
+UNREAD_NOTIFICATIONS_TIMEOUT = 60 * 60 * 24
+NEWEST_NOTIFICATIONS_COUNT = 3
+
+
+class NotificationPreview(NamedTuple):
+    """
+    Compact representation of an unread notification as shown in the navigation bar."""
+
+    id: int
+    created_at: datetime
+    rule_id: int
+
+    @property
+    def rule(self) -> Rule:
+        # Served from memory, titles are translated to the active language
+        return rule_registry.get_by_id(self.rule_id)
+
+
+class UnreadNotifications(NamedTuple):
+    """
+    Number of unread notifications of a client and the newest ones among them."""
+
+    count: int
+    newest: list[NotificationPreview]
+
+
+def get_unread_notifications_cache_key(user_id: int) -> str:
+    return f"notifications:unread:{user_id}"
+
+
+def load_unread_notifications(user_id: int) -> UnreadNotifications:
+    """
+    Load the unread notifications of the client with the given user id from the database.
+
+    Parameters
+    ----------
+    user_id: int
+
+    Returns
+    -------
+    UnreadNotifications
+    """
+    notifications = Notification.objects.filter(client__user_id=user_id, viewed=False)
+    newest = [
+        NotificationPreview(*values)
+        for values in notifications.order_by("-created_at").values_list(
+            "id", "created_at", "rule_id"
+        )[:NEWEST_NOTIFICATIONS_COUNT]
+    ]
+    count = len(newest) if len(newest) < NEWEST_NOTIFICATIONS_COUNT else notifications.count()
+    return UnreadNotifications(count, newest)
+
+
+def get_unread_notifications(user_id: int) -> UnreadNotifications:
+    """
+    Get the unread notifications of the client with the given user id from the cache,
+    loading them from the database if they are not cached (anymore).
+
+    Parameters
+    ----------
+    user_id: int
+
+    Returns
+    -------
+    UnreadNotifications
+    """
+    cache_key = get_unread_notifications_cache_key(user_id)
+    unread_notifications = cache.get(cache_key)
+    if unread_notifications is None:
+        unread_notifications = load_unread_notifications(user_id)
+        cache.set(cache_key, unread_notifications, timeout=UNREAD_NOTIFICATIONS_TIMEOUT)
+    return unread_notifications
+
+
+def unread_notifications_of_request(request: HttpRequest) -> UnreadNotifications:
+    """
+    Get the unread notifications of the client requesting a page, as a dependency of pages
+    showing them in the navigation bar (see core.views.ConditionalGetMixin).
+
+    Parameters
+    ----------
+    request: HttpRequest
+
+    Returns
+    -------
+    UnreadNotifications
+    """
+    return get_unread_notifications(request.user.id)
+
+
+def invalidate_unread_notifications(user_ids: Iterable[int]):
+    """
+    Drop the cached unread notifications of the clients with the given user ids.
+
+    Parameters
+    ----------
+    user_ids: Iterable[int]
+
+    Returns
+    -------
+    None
+    """
+    cache.delete_many([get_unread_notifications_cache_key(user_id) for user_id in user_ids])
+
+
+def mark_notifications_viewed(user_id: int, notification_ids: Iterable[int] = None) -> int:
+    """
+    Mark all unread notifications of the client with the given user id as viewed,
+    or only those with the given ids, using a single update query.
+
+    Parameters
+    ----------
+    user_id: int
+    notification_ids: Iterable[int]
+
+    Returns
+    -------
+    int
+        Number of notifications marked as viewed.
+    """
+    notifications = Notification.objects.filter(client__user_id=user_id, viewed=False)
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+    updated = notifications.update(viewed=True, updated_at=timezone.now())
+    # Queryset updates do not send signals
+    if updated:
+        invalidate_unread_notifications([user_id])
+    return updated
@@ -18,6 +18,11 @@ urlpatterns = [
         views.NotificationListView.as_view(),
         name="get_all_notifications",
     ),
+    path(
+        "notifications/mark_viewed/",
+        views.NotificationsMarkViewedView.as_view(),
+        name="mark_notifications_viewed",
+    ),
     path(
         "update_notifications_permission/",
         views.UpdateNotificationsPermissionView.as_view(),
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from django.conf import settings
+from py_vapid import Vapid
+
+
+class VapidSigner:
+    """
+    Signer of the VAPID headers authenticating push notifications at push services.
+    The private key is parsed only once and the signed headers are cached per audience
+    (the origin of a push service) until shortly before they expire, as signing is
+    expensive and the claims only differ per push service.
+    """
+
+    subject = "mailto:info@mood-diary.de"
+    # Lifetime of signed headers and how long before their expiry they are renewed (seconds)
+    lifetime = 60 * 60
+    renewal_margin = 5 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vapid = None
+        self._headers = {}
+
+    def clear(self):
+        """
+        Drop the parsed private key and all cached headers.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._vapid = None
+            self._headers = {}
+
+    def get_headers(self, audience: str) -> dict:
+        """
+        Get the signed VAPID headers for the given audience, signing them if there are
+        no cached ones that are valid long enough.
+
+        Parameters
+        ----------
+        audience: str
+            Origin (scheme and host) of the push service.
+
+        Returns
+        -------
+        dict
+        """
+        now = int(time.time())
+        with self._lock:
+            expires_at, headers = self._headers.get(audience, (0, None))
+            if expires_at - self.renewal_margin <= now:
+                if self._vapid is None:
+                    self._vapid = Vapid.from_string(private_key=settings.VAPID_PRIVATE_KEY)
+                expires_at = now + self.lifetime
+                headers = self._vapid.sign(
+                    {"sub": self.subject, "aud": audience, "exp": expires_at}
+                )
+                self._headers[audience] = (expires_at, headers)
+            return dict(headers)
+
+
+vapid_signer = VapidSigner()
@@ -1,13 +1,15 @@
 import http
 import json
 
-from core.views import AuthenticatedClientRoleMixin
+from core.pagination import KeysetAjaxListView
+from core.views import AuthenticatedClientRoleMixin, ConditionalGetMixin
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views import View
 from django.views.generic import DetailView
-from el_pagination.views import AjaxListView
 from notifications.models import Notification
+from notifications.unread import mark_notifications_viewed, unread_notifications_of_request
+from rules.registry import rule_registry
 
 
 class RestrictNotificationToOwnerMixin:
@@ -16,11 +18,16 @@ class RestrictNotificationToOwnerMixin:
     """
 
     def get_queryset(self) -> QuerySet[Notification]:
-        return self.model.objects.filter(client_id=self.request.user.client.id).all()
+        return self.model.objects.filter(client_id=self.request.user.client.id).select_related(
+            "rule"
+        )
 
 
 class NotificationListView(
-    AuthenticatedClientRoleMixin, RestrictNotificationToOwnerMixin, AjaxListView
+    AuthenticatedClientRoleMixin,
+    ConditionalGetMixin,
+    RestrictNotificationToOwnerMixin,
+    KeysetAjaxListView,
 ):
     """
     View for displaying a list of notifications.
@@ -30,6 +37,11 @@ class NotificationListView(
     template_name = "notifications/notifications_list.html"
     page_template = "notifications/notification_list_page.html"
     context_object_name = "notifications"
+    ordering = ("viewed", "-created_at", "-id")
+    conditional_dependencies = (unread_notifications_of_request, rule_registry.get_version)
+
+    def get_conditional_queryset(self) -> QuerySet[Notification]:
+        return self.model.objects.filter(client_id=self.request.user.client.id)
 
 
 class NotificationDetailView(
@@ -59,11 +71,51 @@ class NotificationDetailView(
         HttpResponse
         """
         notification = self.get_object()
-        notification.viewed = True
-        notification.save()
+        if not notification.viewed:
+            mark_notifications_viewed(request.user.id, [notification.id])
         return super().get(request, *args, **kwargs)
 
 
+class NotificationsMarkViewedView(AuthenticatedClientRoleMixin, View):
+    """
+    View for marking all unread notifications of a client as viewed at once,
+    or a chosen set of them.
+    """
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        """
+        Upon receiving a POST request, mark the notifications with the ids listed in the
+        optional `ids` field of the request body as viewed, or all of them if no ids are
+        provided.
+
+        Parameters
+        ----------
+        request: HttpRequest
+
+        Returns
+        -------
+        HttpResponse
+            Holding the number of notifications marked as viewed.
+        """
+        try:
+            data = json.loads(request.body or "{}")
+        except json.JSONDecodeError:
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        if not isinstance(data, dict):
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        notification_ids = data.get("ids")
+        if notification_ids is not None and not (
+            isinstance(notification_ids, list)
+            and all(
+                isinstance(notification_id, int) and not isinstance(notification_id, bool)
+                for notification_id in notification_ids
+            )
+        ):
+            return HttpResponse(status=http.HTTPStatus.BAD_REQUEST)
+        updated = mark_notifications_viewed(request.user.id, notification_ids)
+        return JsonResponse({"updated": updated})
+
+
 class UpdateNotificationsPermissionView(AuthenticatedClientRoleMixin, View):
     """
     View for updating the notifications permission of a client.
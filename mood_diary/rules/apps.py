@@ -8,3 +8,6 @@ class RulesConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "rules"
+
+    def ready(self):
+        import rules.signals  # noqa: F401
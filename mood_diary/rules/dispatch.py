@@ -0,0 +1,10 @@
+"""
+Custom signals of the rules app.
+"""
+
+from django.dispatch import Signal
+
+# Sent once per evaluation after a rule was triggered for one client or a batch of clients,
+# so that receivers handle all of them at once instead of each RuleTriggeredLog.
+# Arguments: `rule` and `client_ids`.
+rules_triggered = Signal()
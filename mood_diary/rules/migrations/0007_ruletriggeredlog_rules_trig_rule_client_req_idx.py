@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rules', '0006_english_translation_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ruletriggeredlog',
+            index=models.Index(fields=['rule', 'client', '-requested_at'], name='rules_trig_rule_client_req_idx'),
+        ),
+    ]
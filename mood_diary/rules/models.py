@@ -52,6 +52,12 @@ class RuleTriggeredLog(TrackCreation):
 
     class Meta:
         db_table = "rules_triggered_logs"
+        indexes = [
+            # Cooldown lookups: has the rule been triggered for the client since ...?
+            models.Index(
+                fields=["rule", "client", "-requested_at"], name="rules_trig_rule_client_req_idx"
+            ),
+        ]
 
     rule = models.ForeignKey(Rule, on_delete=models.CASCADE, related_name="triggered_logs")
     client = models.ForeignKey(
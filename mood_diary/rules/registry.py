@@ -0,0 +1,57 @@
+from core.caches import VersionedProcessCache
+from rules.models import Rule
+
+
+class RuleRegistry(VersionedProcessCache):
+    """
+    Process-local registry of all rules, keyed by title and id, e.g. for celery workers.
+    The version is renewed whenever a rule is edited (see rules.signals).
+    """
+
+    version_cache_key = "rules:registry:version"
+
+    def fetch(self) -> dict:
+        rules = list(Rule.objects.all())
+        return {
+            "rules_by_title": {rule.title: rule for rule in rules},
+            "rules_by_id": {rule.id: rule for rule in rules},
+        }
+
+    def get_by_title(self, title: str) -> Rule:
+        """
+        Get the rule with the given title.
+
+        Parameters
+        ----------
+        title: str
+
+        Returns
+        -------
+        Rule
+
+        Raises
+        ------
+        Rule.DoesNotExist
+        """
+        return self._get("rules_by_title", title, Rule)
+
+    def get_by_id(self, rule_id: int) -> Rule:
+        """
+        Get the rule with the given id.
+
+        Parameters
+        ----------
+        rule_id: int
+
+        Returns
+        -------
+        Rule
+
+        Raises
+        ------
+        Rule.DoesNotExist
+        """
+        return self._get("rules_by_id", rule_id, Rule)
+
+
+rule_registry = RuleRegistry()
@@ -1,15 +1,19 @@
 import logging
-from datetime import timedelta
+from collections import defaultdict
+from datetime import date, timedelta
 from functools import cached_property
+from typing import Iterable
 
 from clients.models import Client
-from diaries.models import Activity, ActivityCategory, Mood, MoodDiary, MoodDiaryEntry
+from diaries.models import Activity, ActivityCategory, DailyMoodSummary, MoodDiary, MoodDiaryEntry
+from diaries.reference import reference_data
 from django.db import models
-from django.db.models import Count, QuerySet
+from django.db.models import Exists, OuterRef, QuerySet
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from notifications.models import Notification
+from notifications.tasks import schedule_push_notifications
 from rules.content.rules import (
     ACTIVITY_WITH_PEAK_MOOD,
     DAILY_AVERAGE_MOOD_IMPROVING,
@@ -24,8 +28,34 @@ from rules.content.rules import (
     RELAXING_ACTIVITY,
     UNSTEADY_FOOD_INTAKE,
 )
+from rules.dispatch import rules_triggered
 from rules.models import Rule, RuleTriggeredLog
-from rules.utils import get_beginning_of_week, get_end_of_week
+from rules.registry import rule_registry
+from rules.snapshots import ClientFeatureSnapshot, EntryFeatures
+from rules.subscriptions import RuleSubscriptions
+from rules.triggers import RuleTriggerHistory, to_datetime
+from rules.utils import get_beginning_of_week
+
+
+def get_daily_summaries(client_ids: set[int], **filters) -> QuerySet[DailyMoodSummary]:
+    """
+    Return the daily mood summaries of the given clients that match the given filters,
+    annotated with the respective client id, so that the per-day values of all clients
+    can be read with a single query.
+
+    Parameters
+    ----------
+    client_ids: set[int]
+    filters: dict
+        Lookups to filter the daily mood summaries by.
+
+    Returns
+    -------
+    QuerySet[DailyMoodSummary]
+    """
+    return DailyMoodSummary.objects.filter(
+        mood_diary__client_id__in=client_ids, **filters
+    ).annotate(client_id=models.F("mood_diary__client_id"))
 
 
 class BaseRule:
@@ -35,18 +65,42 @@ class BaseRule:
     and evaluate_preconditions methods.
     When creating a rule instance, the client_id and a timestamp pertaining to the exact time
     the evaluation of the rule was requested at must be provided.
+    Rules read the mood diary entries from a ClientFeatureSnapshot. To share one snapshot
+    between all rules of an evaluation pass, it can be passed on instance creation,
+    otherwise a fresh snapshot is loaded whenever it is accessed.
+    Likewise, preloaded RuleSubscriptions and a RuleTriggerHistory can be passed to check
+    the subscription of the client and the cooldown of the rule without querying the database.
     To evaluate a rule, call the evaluate method. This method checks if the client is
     subscribed to the rule, if the rule is allowed to trigger right now and if the
     preconditions for the rule are met.
     If all of these conditions are met, the rule triggering is logged in the database and
     a notification for the respective client is created.
+    Time-based rules can additionally be evaluated for a whole cohort of clients at once
+    by calling the evaluate_batch class method. To support this, they must implement the
+    batch_triggering_allowed and batch_evaluate_preconditions class methods.
     """
 
-    def __init__(self, client_id: int, requested_at: timezone.datetime):
+    def __init__(
+        self,
+        client_id: int,
+        requested_at: timezone.datetime,
+        snapshot: ClientFeatureSnapshot = None,
+        subscriptions: RuleSubscriptions = None,
+        trigger_history: RuleTriggerHistory = None,
+    ):
         self.client_id = client_id
         self.requested_at = requested_at
         self.logger = logging.getLogger("mood_diary.rules")
         self.notification_id = None
+        self._snapshot = snapshot
+        self.subscriptions = subscriptions
+        self.trigger_history = trigger_history
+
+    @property
+    def snapshot(self) -> ClientFeatureSnapshot:
+        if self._snapshot is not None:
+            return self._snapshot
+        return ClientFeatureSnapshot.load(self.client_id, self.requested_at)
 
     @property
     def rule_title(self) -> str:
@@ -54,7 +108,7 @@ class BaseRule:
 
     @cached_property
     def rule(self) -> Rule:
-        return Rule.objects.get(title=self.rule_title)
+        return rule_registry.get_by_title(self.rule_title)
 
     def triggering_allowed(self) -> bool:
         """
@@ -68,13 +122,13 @@ class BaseRule:
         """
         raise NotImplementedError
 
-    def get_mood_diary_entries(self) -> QuerySet[MoodDiaryEntry]:
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
         """
-        Returns the MoodDiaryEntry entities relevant for the rule evaluation.
+        Returns the mood diary entries relevant for the rule evaluation.
 
         Returns
         -------
-        QuerySet[MoodDiaryEntry]
+        list[EntryFeatures]
         """
         raise NotImplementedError
 
@@ -98,8 +152,34 @@ class BaseRule:
         -------
         bool
         """
+        if self.subscriptions is not None:
+            return self.subscriptions.is_subscribed(self.rule.id, self.client_id)
         return self.rule.rule_users.filter(client_id=self.client_id, active=True).exists()
 
+    def triggered_since(self, since: date, inclusive: bool = True) -> bool:
+        """
+        Checks if the rule has been triggered for the client since the given point in time.
+
+        Parameters
+        ----------
+        since: date
+            Date or timestamp, dates are interpreted as the beginning of the day.
+        inclusive: bool
+            Whether a triggering exactly at `since` counts.
+
+        Returns
+        -------
+        bool
+        """
+        if self.trigger_history is not None:
+            return self.trigger_history.triggered_since(
+                self.rule.id, self.client_id, since, inclusive
+            )
+        requested_at_lookup = "requested_at__gte" if inclusive else "requested_at__gt"
+        return RuleTriggeredLog.objects.filter(
+            rule=self.rule, client_id=self.client_id, **{requested_at_lookup: to_datetime(since)}
+        ).exists()
+
     def mood_diary_exists(self) -> bool:
         """
         Checks if the client has a mood diary and logged any entries.
@@ -108,10 +188,7 @@ class BaseRule:
         -------
         bool
         """
-        return (
-            MoodDiary.objects.filter(client_id=self.client_id).exists()
-            and MoodDiary.objects.get(client_id=self.client_id).entries.exists()
-        )
+        return self.snapshot.mood_diary_exists
 
     def persist_rule_triggering(self):
         """
@@ -124,6 +201,8 @@ class BaseRule:
         RuleTriggeredLog.objects.create(
             rule=self.rule, client_id=self.client_id, requested_at=self.requested_at
         )
+        if self.trigger_history is not None:
+            self.trigger_history.record(self.rule.id, self.client_id, self.requested_at)
 
     def create_notification(self):
         """
@@ -143,8 +222,8 @@ class BaseRule:
 
     def create_push_notifications(self):
         """
-        If the client has granted push notifications, send a push notification
-        per active subscription.
+        If the client has granted push notifications, schedule the delivery of a push
+        notification to all active subscriptions of the client.
 
         Returns
         -------
@@ -163,8 +242,9 @@ class BaseRule:
             "text": self.rule.title,
             "url": reverse("notifications:get_notification", kwargs={"pk": self.notification_id}),
         }
-        for subscription in client.push_subscriptions.all():
-            subscription.send_push_notification(message)
+        subscription_ids = list(client.push_subscriptions.values_list("id", flat=True))
+        if subscription_ids:
+            schedule_push_notifications(subscription_ids, message)
 
     def evaluate(self):
         """
@@ -173,7 +253,7 @@ class BaseRule:
         if the rule is allowed to trigger and if the preconditions are met.
         If all of these conditions are met, the rule triggering is logged in the database and
         a notification for the respective client is created as well as push notifications,
-        if applicable.
+        if applicable. Finally, `rules_triggered` is sent (see rules.dispatch).
 
         Returns
         -------
@@ -187,11 +267,209 @@ class BaseRule:
             return
         if not self.evaluate_preconditions():
             return
+        self.trigger()
+        rules_triggered.send(sender=type(self), rule=self.rule, client_ids={self.client_id})
+
+    def trigger(self):
+        """
+        Log the triggering of the rule in the database and create a notification for
+        the client as well as push notifications, if applicable.
+
+        Returns
+        -------
+        None
+        """
         self.logger.info(f"Rule triggered for client {self.client_id}: {self.rule_title}")
         self.persist_rule_triggering()
         self.create_notification()
         self.create_push_notifications()
 
+    @classmethod
+    def batch_subscribed(
+        cls, rule: Rule, client_ids: set[int], subscriptions: RuleSubscriptions = None
+    ) -> set[int]:
+        """
+        Batch counterpart of the client_subscribed method.
+
+        Parameters
+        ----------
+        rule: Rule
+        client_ids: set[int]
+        subscriptions: RuleSubscriptions
+            Preloaded subscriptions covering the given clients, if available.
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients that are subscribed to the rule at the moment.
+        """
+        if subscriptions is not None:
+            return client_ids & subscriptions.subscribed_client_ids(rule.id)
+        return set(
+            rule.rule_users.filter(client_id__in=client_ids, active=True).values_list(
+                "client_id", flat=True
+            )
+        )
+
+    @classmethod
+    def batch_mood_diary_exists(cls, client_ids: set[int]) -> set[int]:
+        """
+        Batch counterpart of the mood_diary_exists method.
+
+        Parameters
+        ----------
+        client_ids: set[int]
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients that have got a mood diary and logged any entries.
+        """
+        return set(
+            MoodDiary.objects.filter(client_id__in=client_ids)
+            .filter(Exists(MoodDiaryEntry.objects.filter(mood_diary_id=OuterRef("pk"))))
+            .values_list("client_id", flat=True)
+        )
+
+    @classmethod
+    def batch_triggered_since(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        since: date,
+        inclusive: bool = True,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        """
+        Batch counterpart of the triggered_since method.
+
+        Parameters
+        ----------
+        rule: Rule
+        client_ids: set[int]
+        since: date
+            Date or timestamp, dates are interpreted as the beginning of the day.
+        inclusive: bool
+            Whether a triggering exactly at `since` counts.
+        trigger_history: RuleTriggerHistory
+            Preloaded trigger history covering the given clients, if available.
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients for which the rule has been triggered since then.
+        """
+        if trigger_history is not None:
+            return {
+                client_id
+                for client_id in client_ids
+                if trigger_history.triggered_since(rule.id, client_id, since, inclusive)
+            }
+        requested_at_lookup = "requested_at__gte" if inclusive else "requested_at__gt"
+        return set(
+            RuleTriggeredLog.objects.filter(
+                rule=rule, client_id__in=client_ids, **{requested_at_lookup: to_datetime(since)}
+            ).values_list("client_id", flat=True)
+        )
+
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        """
+        Batch counterpart of the triggering_allowed method.
+
+        Parameters
+        ----------
+        rule: Rule
+        client_ids: set[int]
+        requested_at: timezone.datetime
+        trigger_history: RuleTriggerHistory
+            Preloaded trigger history covering the given clients, if available.
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients for which the rule is allowed to trigger.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        """
+        Batch counterpart of the evaluate_preconditions method.
+        Implementations should read the per-day values of all clients at once, e.g. from
+        the daily mood summaries, instead of querying per client.
+
+        Parameters
+        ----------
+        client_ids: set[int]
+        requested_at: timezone.datetime
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients for which the preconditions of the rule are met.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def evaluate_batch(
+        cls,
+        client_ids: Iterable[int],
+        requested_at: timezone.datetime,
+        subscriptions: RuleSubscriptions = None,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        """
+        Batch counterpart of the evaluate method, evaluating the rule for a whole cohort
+        of clients. Each check narrows down the set of client ids with a single query
+        for all clients, so that the number of queries does not depend on the number
+        of clients. The rule is then triggered for all remaining clients, and
+        `rules_triggered` is sent once for all of them.
+
+        Parameters
+        ----------
+        client_ids: Iterable[int]
+        requested_at: timezone.datetime
+        subscriptions: RuleSubscriptions
+            Preloaded subscriptions covering the given clients, if available.
+        trigger_history: RuleTriggerHistory
+            Preloaded trigger history covering the given clients, if available.
+
+        Returns
+        -------
+        set[int]
+            Ids of the clients for which the rule was triggered.
+        """
+        rule = rule_registry.get_by_title(cls.rule_title)
+        checks = [
+            lambda ids: cls.batch_subscribed(rule, ids, subscriptions),
+            cls.batch_mood_diary_exists,
+            lambda ids: cls.batch_triggering_allowed(rule, ids, requested_at, trigger_history),
+            lambda ids: cls.batch_evaluate_preconditions(ids, requested_at),
+        ]
+        client_ids = set(client_ids)
+        for check in checks:
+            if not client_ids:
+                break
+            client_ids = check(client_ids)
+        for client_id in sorted(client_ids):
+            rule_instance = cls(
+                client_id=client_id, requested_at=requested_at, trigger_history=trigger_history
+            )
+            rule_instance.rule = rule
+            rule_instance.trigger()
+        if client_ids:
+            rules_triggered.send(sender=cls, rule=rule, client_ids=client_ids)
+        return client_ids
+
 
 class ActivityWithPeakMoodRule(BaseRule):
     """
@@ -204,19 +482,19 @@ class ActivityWithPeakMoodRule(BaseRule):
     def triggering_allowed(self) -> bool:
         return True
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
         """
         Get the mood diary entry that was last edited before rule evaluation was requested.
         """
-        return (
-            MoodDiary.objects.get(client_id=self.client_id)
-            .entries.filter(updated_at__lte=self.requested_at)
-            .order_by("-updated_at")
-        )
+        last_edited_entry = self.snapshot.last_edited_entry
+        return [last_edited_entry] if last_edited_entry else []
 
     def evaluate_preconditions(self) -> bool:
         mood_diary_entries = self.get_mood_diary_entries()
-        return mood_diary_entries and mood_diary_entries.first().mood.value == Mood.max_value()
+        return (
+            bool(mood_diary_entries)
+            and mood_diary_entries[0].mood_value == reference_data.mood_max_value()
+        )
 
 
 class RelaxingActivityRule(ActivityWithPeakMoodRule):
@@ -229,18 +507,13 @@ class RelaxingActivityRule(ActivityWithPeakMoodRule):
     rule_title = RELAXING_ACTIVITY
 
     def triggering_allowed(self) -> bool:
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=self.requested_at.date(),
-        ).exists()
+        return not self.triggered_since(self.requested_at.date())
 
     def evaluate_preconditions(self) -> bool:
         mood_diary_entries = self.get_mood_diary_entries()
         return (
-            mood_diary_entries.exists()
-            and mood_diary_entries.first().activity.category.value
-            == ActivityCategory.relaxing_value
+            bool(mood_diary_entries)
+            and mood_diary_entries[0].category_value == ActivityCategory.relaxing_value
         )
 
 
@@ -254,26 +527,20 @@ class PhysicalActivityPerWeekRule(BaseRule):
     rule_title = PHYSICAL_ACTIVITY_PER_WEEK
 
     def triggering_allowed(self) -> bool:
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=get_beginning_of_week(self.requested_at),
-        ).exists()
+        return not self.triggered_since(get_beginning_of_week(self.requested_at))
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date__gte=get_beginning_of_week(self.requested_at),
-        )
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(date_from=get_beginning_of_week(self.requested_at).date())
 
     def evaluate_preconditions(self) -> bool:
-        relevant_entries = self.get_mood_diary_entries().filter(
-            activity__value=Activity.sports_value
-        )
-        if not relevant_entries.exists():
+        relevant_entries = [
+            entry
+            for entry in self.get_mood_diary_entries()
+            if entry.activity_value == Activity.sports_value
+        ]
+        if not relevant_entries:
             return False
-        duration_sum = relevant_entries.annotate(
-            duration=models.F("end_time") - models.F("start_time")
-        ).aggregate(models.Sum("duration"))["duration__sum"]
+        duration_sum = ClientFeatureSnapshot.duration_sum(relevant_entries)
         return duration_sum >= timedelta(minutes=150)
 
 
@@ -285,28 +552,39 @@ class HighMediaUsagePerDayRule(BaseRule):
     rule_title = HIGH_MEDIA_USAGE_PER_DAY
 
     def triggering_allowed(self) -> bool:
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=self.requested_at.date(),
-        ).exists()
+        return not self.triggered_since(self.requested_at.date())
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date=self.requested_at.date(),
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(
+            date_from=self.requested_at.date(), date_to=self.requested_at.date()
         )
 
+    def get_media_usage_entries(self) -> list[EntryFeatures]:
+        return [
+            entry
+            for entry in self.get_mood_diary_entries()
+            if entry.category_value == ActivityCategory.media_usage_value
+        ]
+
     def evaluate_preconditions(self) -> bool:
-        relevant_entries = self.get_mood_diary_entries().filter(
-            activity__category__value=ActivityCategory.media_usage_value
-        )
-        if not relevant_entries.exists():
+        relevant_entries = self.get_media_usage_entries()
+        if not relevant_entries:
             return False
-        duration_sum = relevant_entries.annotate(
-            duration=models.F("end_time") - models.F("start_time")
-        ).aggregate(models.Sum("duration"))["duration__sum"]
+        duration_sum = ClientFeatureSnapshot.duration_sum(relevant_entries)
         return duration_sum >= timedelta(hours=6)
 
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        return client_ids - cls.batch_triggered_since(
+            rule, client_ids, requested_at.date(), trigger_history=trigger_history
+        )
+
 
 class LowMediaUsagePerDayRule(HighMediaUsagePerDayRule):
     """
@@ -316,16 +594,23 @@ class LowMediaUsagePerDayRule(HighMediaUsagePerDayRule):
     rule_title = LOW_MEDIA_USAGE_PER_DAY
 
     def evaluate_preconditions(self) -> bool:
-        relevant_entries = self.get_mood_diary_entries().filter(
-            activity__category__value=ActivityCategory.media_usage_value
-        )
-        if not relevant_entries.exists():
+        relevant_entries = self.get_media_usage_entries()
+        if not relevant_entries:
             return True
-        duration_sum = relevant_entries.annotate(
-            duration=models.F("end_time") - models.F("start_time")
-        ).aggregate(models.Sum("duration"))["duration__sum"]
+        duration_sum = ClientFeatureSnapshot.duration_sum(relevant_entries)
         return duration_sum <= timedelta(minutes=30)
 
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        high_media_usage_days = get_daily_summaries(
+            client_ids,
+            date=requested_at.date(),
+            media_duration__gt=timedelta(minutes=30),
+        )
+        return client_ids - {summary.client_id for summary in high_media_usage_days}
+
 
 class FourteenDaysMoodAverageRule(BaseRule):
     """
@@ -338,40 +623,83 @@ class FourteenDaysMoodAverageRule(BaseRule):
     def triggering_allowed(self) -> bool:
         # There are entries for the last 14 days
         entries_for_last_fourteen_days = (
-            MoodDiary.objects.get(client_id=self.client_id)
-            .entries.filter(
-                date__gt=self.requested_at.date() - timedelta(days=14),
-            )
-            .values_list("date", flat=True)
-            .distinct()
-            .count()
-            == 14
+            len({entry.date for entry in self.get_mood_diary_entries()}) == 14
         )
         # Rule was not triggered in the last 14 days
-        rule_not_triggered_in_previous_fourteen_days = not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gt=self.requested_at.date() - timedelta(days=14),
-        ).exists()
+        rule_not_triggered_in_previous_fourteen_days = not self.triggered_since(
+            self.requested_at.date() - timedelta(days=14), inclusive=False
+        )
         return entries_for_last_fourteen_days and rule_not_triggered_in_previous_fourteen_days
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date__gt=self.requested_at.date() - timedelta(days=14),
-        )
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(date_from=self.requested_at.date() - timedelta(days=13))
 
     def evaluate_preconditions(self) -> bool:
         relevant_entries = self.get_mood_diary_entries()
-        if not relevant_entries.exists():
+        if not relevant_entries:
             return False
-        days_with_mood_avg_below_zero = (
-            relevant_entries.values("date")
-            .annotate(mood_avg=models.Avg("mood__value"))
-            .filter(mood_avg__lt=0)
-            .count()
+        days_with_mood_avg_below_zero = sum(
+            mood_avg < 0
+            for mood_avg in ClientFeatureSnapshot.mood_avg_per_day(relevant_entries).values()
         )
         return days_with_mood_avg_below_zero >= 9
 
+    @classmethod
+    def batch_summaries_per_client(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> dict[int, list[DailyMoodSummary]]:
+        """
+        Get the daily mood summaries of the last 14 days for each of the given clients
+        in a single query.
+
+        Parameters
+        ----------
+        client_ids: set[int]
+        requested_at: timezone.datetime
+
+        Returns
+        -------
+        dict[int, list[DailyMoodSummary]]
+            Per client id, the summaries of the days with entries.
+        """
+        summaries_per_client = defaultdict(list)
+        for summary in get_daily_summaries(
+            client_ids, date__gt=requested_at.date() - timedelta(days=14)
+        ):
+            summaries_per_client[summary.client_id].append(summary)
+        return summaries_per_client
+
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        entries_for_last_fourteen_days = {
+            client_id
+            for client_id, days in cls.batch_summaries_per_client(client_ids, requested_at).items()
+            if len(days) == 14
+        }
+        return entries_for_last_fourteen_days - cls.batch_triggered_since(
+            rule,
+            client_ids,
+            requested_at.date() - timedelta(days=14),
+            inclusive=False,
+            trigger_history=trigger_history,
+        )
+
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        return {
+            client_id
+            for client_id, days in cls.batch_summaries_per_client(client_ids, requested_at).items()
+            if sum(day.average_mood < 0 for day in days) >= 9
+        }
+
 
 class FourteenDaysMoodMaximumRule(FourteenDaysMoodAverageRule):
     """
@@ -382,11 +710,21 @@ class FourteenDaysMoodMaximumRule(FourteenDaysMoodAverageRule):
 
     def evaluate_preconditions(self) -> bool:
         relevant_entries = self.get_mood_diary_entries()
-        if not relevant_entries.exists():
+        if not relevant_entries:
             return False
-        max_mood_value = relevant_entries.aggregate(models.Max("mood__value"))["mood__value__max"]
+        max_mood_value = max(entry.mood_value for entry in relevant_entries)
         return max_mood_value < 1
 
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        return {
+            client_id
+            for client_id, days in cls.batch_summaries_per_client(client_ids, requested_at).items()
+            if max(day.max_mood for day in days) < 1
+        }
+
 
 class UnsteadyFoodIntakeRule(BaseRule):
     """
@@ -396,25 +734,44 @@ class UnsteadyFoodIntakeRule(BaseRule):
     rule_title = UNSTEADY_FOOD_INTAKE
 
     def triggering_allowed(self) -> bool:
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=self.requested_at.date() - timedelta(days=2),
-        ).exists()
+        return not self.triggered_since(self.requested_at.date() - timedelta(days=2))
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date__gte=self.requested_at.date() - timedelta(days=2),
-        )
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(date_from=self.requested_at.date() - timedelta(days=2))
 
     def evaluate_preconditions(self) -> bool:
-        relevant_entries_per_day = (
-            self.get_mood_diary_entries()
-            .filter(activity__category__value=ActivityCategory.food_intake_value)
-            .values("date")
-            .annotate(count_meals=Count("id"))
+        relevant_entries_per_day = ClientFeatureSnapshot.group_by_date(
+            entry
+            for entry in self.get_mood_diary_entries()
+            if entry.category_value == ActivityCategory.food_intake_value
+        )
+        return all(len(meals) < 3 for meals in relevant_entries_per_day.values())
+
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        return client_ids - cls.batch_triggered_since(
+            rule,
+            client_ids,
+            requested_at.date() - timedelta(days=2),
+            trigger_history=trigger_history,
+        )
+
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        days_with_three_or_more_meals = get_daily_summaries(
+            client_ids,
+            date__gte=requested_at.date() - timedelta(days=2),
+            meal_count__gte=3,
         )
-        return all(entry["count_meals"] < 3 for entry in relevant_entries_per_day)
+        return client_ids - {summary.client_id for summary in days_with_three_or_more_meals}
 
 
 class PositiveMoodChangeBetweenActivitiesRule(BaseRule):
@@ -427,38 +784,27 @@ class PositiveMoodChangeBetweenActivitiesRule(BaseRule):
     def triggering_allowed(self) -> bool:
         return True
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        entry_last_edit = (
-            MoodDiary.objects.get(client_id=self.client_id)
-            .entries.filter(updated_at__lte=self.requested_at)
-            .order_by("-updated_at")
-            .first()
-        )
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        """
+        Get the mood diary entry that was last edited before rule evaluation was requested
+        and the entry preceding it, ordered by end time (latest first).
+        """
+        snapshot = self.snapshot
+        entry_last_edit = snapshot.last_edited_entry
         if entry_last_edit is None:
-            return MoodDiary.objects.none()
-        entry_before_last_edited_one = (
-            MoodDiary.objects.get(client_id=self.client_id)
-            .entries.filter(date__lte=entry_last_edit.date, end_time__lte=entry_last_edit.end_time)
-            .exclude(id=entry_last_edit.id)
-            .order_by("-end_time")
-            .first()
-        )
+            return []
+        entry_before_last_edited_one = snapshot.entry_preceding_last_edited_one
         if entry_before_last_edited_one is None:
-            return MoodDiary.objects.none()
-        if entry_last_edit.activity == entry_before_last_edited_one.activity:
-            return MoodDiary.objects.none()
-        return (
-            MoodDiary.objects.get(client_id=self.client_id)
-            .entries.filter(id__in=[entry_last_edit.id, entry_before_last_edited_one.id])
-            .order_by("-end_time")
-        )
+            return []
+        if entry_last_edit.activity_id == entry_before_last_edited_one.activity_id:
+            return []
+        return [entry_last_edit, entry_before_last_edited_one]
 
     def evaluate_preconditions(self) -> bool:
         relevant_entries = self.get_mood_diary_entries()
-        if not relevant_entries.exists():
+        if not relevant_entries:
             return False
-        mood_values = relevant_entries.values_list("mood__value", flat=True)
-        return mood_values[0] - mood_values[1] >= 3
+        return relevant_entries[0].mood_value - relevant_entries[1].mood_value >= 3
 
 
 class NegativeMoodChangeBetweenActivitiesRule(PositiveMoodChangeBetweenActivitiesRule):
@@ -470,10 +816,9 @@ class NegativeMoodChangeBetweenActivitiesRule(PositiveMoodChangeBetweenActivitie
 
     def evaluate_preconditions(self) -> bool:
         relevant_entries = self.get_mood_diary_entries()
-        if not relevant_entries.exists():
+        if not relevant_entries:
             return False
-        mood_values = relevant_entries.values_list("mood__value", flat=True)
-        return mood_values[0] - mood_values[1] <= -3
+        return relevant_entries[0].mood_value - relevant_entries[1].mood_value <= -3
 
 
 class DailyAverageMoodImprovingRule(BaseRule):
@@ -484,30 +829,50 @@ class DailyAverageMoodImprovingRule(BaseRule):
     rule_title = DAILY_AVERAGE_MOOD_IMPROVING
 
     def triggering_allowed(self) -> bool:
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=self.requested_at.date(),
-        ).exists()
+        return not self.triggered_since(self.requested_at.date())
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date__gte=self.requested_at.date() - timedelta(days=1),
-            date__lte=self.requested_at.date(),
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(
+            date_from=self.requested_at.date() - timedelta(days=1),
+            date_to=self.requested_at.date(),
         )
 
     def evaluate_preconditions(self) -> bool:
         relevant_entries = self.get_mood_diary_entries()
-        if not relevant_entries.exists():
+        if not relevant_entries:
             return False
-        if relevant_entries.values_list("date", flat=True).distinct().count() != 2:
+        mood_avg_per_day = ClientFeatureSnapshot.mood_avg_per_day(relevant_entries)
+        if len(mood_avg_per_day) != 2:
             return False
-        mood_values_per_day = (
-            relevant_entries.values("date")
-            .annotate(avg_mood=models.Avg("mood__value"))
-            .order_by("-date")
+        today = self.requested_at.date()
+        return mood_avg_per_day[today] > mood_avg_per_day[today - timedelta(days=1)]
+
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        return client_ids - cls.batch_triggered_since(
+            rule, client_ids, requested_at.date(), trigger_history=trigger_history
         )
-        return mood_values_per_day[0]["avg_mood"] > mood_values_per_day[1]["avg_mood"]
+
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        today = requested_at.date()
+        yesterday = today - timedelta(days=1)
+        mood_avg_per_day = defaultdict(dict)
+        for summary in get_daily_summaries(client_ids, date__gte=yesterday, date__lte=today):
+            mood_avg_per_day[summary.client_id][summary.date] = summary.average_mood
+        return {
+            client_id
+            for client_id, mood_avg in mood_avg_per_day.items()
+            if len(mood_avg) == 2 and mood_avg[today] > mood_avg[yesterday]
+        }
 
 
 class PhysicalActivityPerWeekIncreasingRule(BaseRule):
@@ -525,44 +890,72 @@ class PhysicalActivityPerWeekIncreasingRule(BaseRule):
         # Only to be triggered on Sundays
         if self.requested_at.weekday() != 6:
             return False
-        return not RuleTriggeredLog.objects.filter(
-            rule=self.rule,
-            client_id=self.client_id,
-            requested_at__gte=get_beginning_of_week(self.requested_at),
-        ).exists()
+        return not self.triggered_since(get_beginning_of_week(self.requested_at))
 
-    def get_mood_diary_entries(self) -> models.QuerySet[MoodDiaryEntry]:
-        return MoodDiary.objects.get(client_id=self.client_id).entries.filter(
-            date__gte=get_beginning_of_week(self.requested_at - timedelta(days=7)),
-            date__lte=self.requested_at.date(),
+    def get_mood_diary_entries(self) -> list[EntryFeatures]:
+        return self.snapshot.filter(
+            date_from=get_beginning_of_week(self.requested_at - timedelta(days=7)).date(),
+            date_to=self.requested_at.date(),
         )
 
     def evaluate_preconditions(self) -> bool:
-        relevant_entries = self.get_mood_diary_entries().filter(
-            activity__value=Activity.sports_value
-        )
-        if not relevant_entries.exists():
+        relevant_entries = [
+            entry
+            for entry in self.get_mood_diary_entries()
+            if entry.activity_value == Activity.sports_value
+        ]
+        if not relevant_entries:
             return False
-        duration_sum_last_week = (
-            relevant_entries.filter(
-                date__gte=get_beginning_of_week(self.requested_at) - timedelta(days=7),
-                date__lte=get_end_of_week(self.requested_at) - timedelta(days=7),
-            )
-            .annotate(duration=models.F("end_time") - models.F("start_time"))
-            .aggregate(models.Sum("duration"))["duration__sum"]
-        )
-        duration_sum_current_week = (
-            relevant_entries.filter(
-                date__gte=get_beginning_of_week(self.requested_at),
-                date__lte=self.requested_at.date(),
-            )
-            .annotate(duration=models.F("end_time") - models.F("start_time"))
-            .aggregate(models.Sum("duration"))["duration__sum"]
-        )
-        if duration_sum_last_week is None or duration_sum_current_week is None:
+        beginning_of_week = get_beginning_of_week(self.requested_at).date()
+        entries_last_week = [entry for entry in relevant_entries if entry.date < beginning_of_week]
+        entries_current_week = [
+            entry for entry in relevant_entries if entry.date >= beginning_of_week
+        ]
+        if not entries_last_week or not entries_current_week:
             return False
+        duration_sum_last_week = ClientFeatureSnapshot.duration_sum(entries_last_week)
+        duration_sum_current_week = ClientFeatureSnapshot.duration_sum(entries_current_week)
         return duration_sum_last_week.seconds < duration_sum_current_week.seconds <= 300 * 60
 
+    @classmethod
+    def batch_triggering_allowed(
+        cls,
+        rule: Rule,
+        client_ids: set[int],
+        requested_at: timezone.datetime,
+        trigger_history: RuleTriggerHistory = None,
+    ) -> set[int]:
+        # Only to be triggered on Sundays
+        if requested_at.weekday() != 6:
+            return set()
+        return client_ids - cls.batch_triggered_since(
+            rule, client_ids, get_beginning_of_week(requested_at), trigger_history=trigger_history
+        )
+
+    @classmethod
+    def batch_evaluate_preconditions(
+        cls, client_ids: set[int], requested_at: timezone.datetime
+    ) -> set[int]:
+        beginning_of_week = get_beginning_of_week(requested_at).date()
+        durations_per_week = defaultdict(lambda: {"last": [], "current": []})
+        for summary in get_daily_summaries(
+            client_ids,
+            date__gte=beginning_of_week - timedelta(days=7),
+            date__lte=requested_at.date(),
+            sports_duration__isnull=False,
+        ):
+            week = "current" if summary.date >= beginning_of_week else "last"
+            durations_per_week[summary.client_id][week].append(summary.sports_duration)
+        triggering_client_ids = set()
+        for client_id, durations in durations_per_week.items():
+            if not durations["last"] or not durations["current"]:
+                continue
+            duration_sum_last_week = sum(durations["last"], timedelta())
+            duration_sum_current_week = sum(durations["current"], timedelta())
+            if duration_sum_last_week.seconds < duration_sum_current_week.seconds <= 300 * 60:
+                triggering_client_ids.add(client_id)
+        return triggering_client_ids
+
 
 TIME_BASED_RULES = [
     LowMediaUsagePerDayRule,
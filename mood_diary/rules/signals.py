@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rules.models import Rule
+from rules.registry import rule_registry
+
+
+@receiver(post_save, sender=Rule)
+@receiver(post_delete, sender=Rule)
+def invalidate_rule_registry(sender, instance: Rule, **kwargs):
+    """
+    Make all processes reload their rules when a rule is edited, once the transaction
+    has been committed, as processes reloading before then would keep the old rules
+    under the new version.
+    """
+    transaction.on_commit(rule_registry.invalidate)
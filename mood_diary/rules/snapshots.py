@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from functools import cached_property
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from diaries.models import MoodDiaryEntry
+from django.db.models import Q, QuerySet, Subquery
+from django.utils import timezone
+
+
+class EntryFeatures(NamedTuple):
+    """
+    Compact, read-only representation of a mood diary entry holding only
+    the features needed for rule evaluation."""
+
+    id: int
+    date: date
+    start_time: time
+    end_time: time
+    updated_at: datetime
+    mood_value: int
+    activity_id: int
+    activity_value: str
+    category_value: str
+
+    @property
+    def duration(self) -> timedelta:
+        return datetime.combine(self.date, self.end_time) - datetime.combine(
+            self.date, self.start_time
+        )
+
+    @classmethod
+    def from_entry(cls, entry: MoodDiaryEntry) -> "EntryFeatures":
+        return cls(
+            id=entry.id,
+            date=entry.date,
+            start_time=entry.start_time,
+            end_time=entry.end_time,
+            updated_at=entry.updated_at,
+            mood_value=entry.mood.value,
+            activity_id=entry.activity_id,
+            activity_value=entry.activity.value,
+            category_value=entry.activity.category.value,
+        )
+
+
+class ClientFeatureSnapshot:
+    """
+    In-memory snapshot of the mood diary entries of a client that are relevant for
+    rule evaluation at a given point in time.
+    The snapshot holds all entries of the last 14 days (the largest window any rule
+    looks at) as well as the entry that was edited last before the evaluation was
+    requested and the entry preceding it, which may both be older.
+    It is loaded with a single query, so that all rules of one evaluation pass can share
+    it instead of querying the database on their own.
+    """
+
+    window = timedelta(days=14)
+
+    def __init__(
+        self, client_id: int, requested_at: timezone.datetime, entries: Iterable[EntryFeatures]
+    ):
+        self.client_id = client_id
+        self.requested_at = requested_at
+        self.entries = sorted(entries, key=lambda entry: (entry.date, entry.start_time))
+
+    @classmethod
+    def get_queryset(
+        cls, client_id: int, requested_at: timezone.datetime
+    ) -> QuerySet[MoodDiaryEntry]:
+        """
+        Return the query selecting all entries of a client the snapshot consists of.
+
+        Parameters
+        ----------
+        client_id: int
+        requested_at: timezone.datetime
+
+        Returns
+        -------
+        QuerySet[MoodDiaryEntry]
+        """
+        client_entries = MoodDiaryEntry.objects.filter(mood_diary__client_id=client_id)
+        last_edited_entry = client_entries.filter(updated_at__lte=requested_at).order_by(
+            "-updated_at"
+        )[:1]
+        entry_preceding_last_edited_one = (
+            client_entries.filter(
+                date__lte=Subquery(last_edited_entry.values("date")),
+                end_time__lte=Subquery(last_edited_entry.values("end_time")),
+            )
+            .exclude(pk=Subquery(last_edited_entry.values("pk")))
+            .order_by("-end_time")[:1]
+        )
+        return client_entries.filter(
+            Q(date__gt=requested_at.date() - cls.window)
+            | Q(pk=Subquery(last_edited_entry.values("pk")))
+            | Q(pk=Subquery(entry_preceding_last_edited_one.values("pk")))
+        ).select_related("mood", "activity__category")
+
+    @classmethod
+    def load(cls, client_id: int, requested_at: timezone.datetime) -> "ClientFeatureSnapshot":
+        """
+        Load the snapshot for a client from the database.
+
+        Parameters
+        ----------
+        client_id: int
+        requested_at: timezone.datetime
+
+        Returns
+        -------
+        ClientFeatureSnapshot
+        """
+        entries = cls.get_queryset(client_id, requested_at)
+        return cls(client_id, requested_at, [EntryFeatures.from_entry(entry) for entry in entries])
+
+    @cached_property
+    def mood_diary_exists(self) -> bool:
+        """
+        Whether the client has got a mood diary and logged any entries.
+        """
+        if self.entries:
+            return True
+        return MoodDiaryEntry.objects.filter(mood_diary__client_id=self.client_id).exists()
+
+    @cached_property
+    def last_edited_entry(self) -> Optional[EntryFeatures]:
+        """
+        The entry that was edited last before the evaluation was requested.
+        """
+        edited_entries = [entry for entry in self.entries if entry.updated_at <= self.requested_at]
+        return max(edited_entries, key=lambda entry: entry.updated_at, default=None)
+
+    @cached_property
+    def entry_preceding_last_edited_one(self) -> Optional[EntryFeatures]:
+        """
+        The entry with the latest end time preceding the entry that was edited last
+        before the evaluation was requested.
+        """
+        entry_last_edit = self.last_edited_entry
+        if entry_last_edit is None:
+            return None
+        preceding_entries = [
+            entry
+            for entry in self.entries
+            if entry.date <= entry_last_edit.date
+            and entry.end_time <= entry_last_edit.end_time
+            and entry.id != entry_last_edit.id
+        ]
+        return max(preceding_entries, key=lambda entry: entry.end_time, default=None)
+
+    def filter(
+        self,
+        date_from: date = None,
+        date_to: date = None,
+        condition: Callable[[EntryFeatures], bool] = None,
+    ) -> list[EntryFeatures]:
+        """
+        Return the entries within the given date range (both inclusive) that meet
+        the given condition.
+        Only dates within the last 14 days can be covered reliably.
+
+        Parameters
+        ----------
+        date_from: date
+        date_to: date
+        condition: Callable[[EntryFeatures], bool]
+
+        Returns
+        -------
+        list[EntryFeatures]
+        """
+        earliest_date = self.requested_at.date() - self.window + timedelta(days=1)
+        date_from = max(date_from or earliest_date, earliest_date)
+        return [
+            entry
+            for entry in self.entries
+            if date_from <= entry.date
+            and (date_to is None or entry.date <= date_to)
+            and (condition is None or condition(entry))
+        ]
+
+    @staticmethod
+    def duration_sum(entries: Iterable[EntryFeatures]) -> timedelta:
+        """
+        Sum up the durations of the given entries.
+
+        Parameters
+        ----------
+        entries: Iterable[EntryFeatures]
+
+        Returns
+        -------
+        timedelta
+        """
+        return sum((entry.duration for entry in entries), timedelta())
+
+    @staticmethod
+    def group_by_date(entries: Iterable[EntryFeatures]) -> dict[date, list[EntryFeatures]]:
+        """
+        Group the given entries by their date.
+
+        Parameters
+        ----------
+        entries: Iterable[EntryFeatures]
+
+        Returns
+        -------
+        dict[date, list[EntryFeatures]]
+        """
+        entries_per_day = defaultdict(list)
+        for entry in entries:
+            entries_per_day[entry.date].append(entry)
+        return entries_per_day
+
+    @classmethod
+    def mood_avg_per_day(cls, entries: Iterable[EntryFeatures]) -> dict[date, float]:
+        """
+        Calculate the average mood value per day of the given entries.
+
+        Parameters
+        ----------
+        entries: Iterable[EntryFeatures]
+
+        Returns
+        -------
+        dict[date, float]
+        """
+        return {
+            day: sum(entry.mood_value for entry in day_entries) / len(day_entries)
+            for day, day_entries in cls.group_by_date(entries).items()
+        }
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from typing import Iterable
+
+from rules.models import RuleClient
+
+
+class RuleSubscriptions:
+    """
+    Active rule subscriptions of a batch of clients, held as a set of client ids per rule.
+    The subscriptions are loaded with a single query, so that rule evaluation can skip
+    unsubscribed clients without touching the database.
+    """
+
+    def __init__(self, client_ids: Iterable[int], client_ids_per_rule: dict[int, set[int]]):
+        self.client_ids = set(client_ids)
+        self.client_ids_per_rule = client_ids_per_rule
+
+    @classmethod
+    def load(cls, client_ids: Iterable[int]) -> "RuleSubscriptions":
+        """
+        Load the active subscriptions of the given clients from the database.
+
+        Parameters
+        ----------
+        client_ids: Iterable[int]
+
+        Returns
+        -------
+        RuleSubscriptions
+        """
+        client_ids = set(client_ids)
+        client_ids_per_rule = defaultdict(set)
+        for rule_id, client_id in (
+            RuleClient.objects.filter(client_id__in=client_ids, active=True)
+            .order_by()
+            .values_list("rule_id", "client_id")
+        ):
+            client_ids_per_rule[rule_id].add(client_id)
+        return cls(client_ids, client_ids_per_rule)
+
+    def subscribed_client_ids(self, rule_id: int) -> set[int]:
+        """
+        Return the ids of the clients subscribed to the rule with the given id.
+
+        Parameters
+        ----------
+        rule_id: int
+
+        Returns
+        -------
+        set[int]
+        """
+        return self.client_ids_per_rule.get(rule_id, set())
+
+    def is_subscribed(self, rule_id: int, client_id: int) -> bool:
+        """
+        Check if the client is subscribed to the rule with the given id.
+
+        Parameters
+        ----------
+        rule_id: int
+        client_id: int
+
+        Returns
+        -------
+        bool
+
+        Raises
+        ------
+        ValueError
+            If the subscriptions of the client have not been loaded.
+        """
+        if client_id not in self.client_ids:
+            raise ValueError(f"Subscriptions of client {client_id} have not been loaded.")
+        return client_id in self.subscribed_client_ids(rule_id)
+
+    def has_subscriptions(self, client_id: int) -> bool:
+        """
+        Check if the client is subscribed to any rule at all.
+
+        Parameters
+        ----------
+        client_id: int
+
+        Returns
+        -------
+        bool
+        """
+        return any(client_id in client_ids for client_ids in self.client_ids_per_rule.values())
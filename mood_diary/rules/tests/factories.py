@@ -34,4 +34,4 @@ class RuleTriggeredLogFactory(factory.django.DjangoModelFactory):
 
     rule = factory.SubFactory(RuleFactory)
     client = factory.SubFactory("clients.tests.factories.ClientFactory")
-    requested_at = timezone.now
+    requested_at = factory.LazyFunction(timezone.now)
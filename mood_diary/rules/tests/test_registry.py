@@ -0,0 +1,83 @@
+import pytest
+from django.core.cache import cache
+from rules.models import Rule
+from rules.registry import RuleRegistry, rule_registry
+from rules.tests.factories import RuleFactory
+
+
+@pytest.mark.django_db
+def test_rule_registry(django_assert_num_queries):
+    rule_a = RuleFactory.create(title="A")
+    rule_b = RuleFactory.create(title="B")
+    registry = RuleRegistry()
+
+    with django_assert_num_queries(1):
+        assert registry.get_by_title("A") == rule_a
+        assert registry.get_by_title("B") == rule_b
+        assert registry.get_by_id(rule_a.id) == rule_a
+        assert registry.get_by_title("A") is registry.get_by_id(rule_a.id)
+
+    # Unknown rules do not reload the registry right after it has been loaded
+    with django_assert_num_queries(0):
+        with pytest.raises(Rule.DoesNotExist):
+            registry.get_by_title("C")
+
+
+@pytest.mark.django_db
+def test_rule_registry_invalidation_on_edit(django_capture_on_commit_callbacks):
+    rule = RuleFactory.create(title="A", conclusion_message="old")
+    assert rule_registry.get_by_title("A").conclusion_message == "old"
+
+    # The rules are reloaded once the edit has been committed
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.conclusion_message = "new"
+        rule.save()
+        assert rule_registry.get_by_title("A").conclusion_message == "old"
+    assert rule_registry.get_by_title("A").conclusion_message == "new"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.delete()
+    with pytest.raises(Rule.DoesNotExist):
+        rule_registry.get_by_title("A")
+
+
+@pytest.mark.django_db
+def test_rule_registry_version_check(mocker, django_assert_num_queries):
+    RuleFactory.create(title="A")
+    mocked_monotonic = mocker.patch("core.caches.time.monotonic", return_value=100)
+    registry = RuleRegistry()
+    registry.get_by_title("A")
+
+    # Another process edited a rule, but the version is not checked yet
+    cache.set(RuleRegistry.version_cache_key, "other", timeout=None)
+    with django_assert_num_queries(0):
+        registry.get_by_title("A")
+
+    # Version is checked after the check interval has passed
+    mocked_monotonic.return_value = 100 + RuleRegistry.check_interval
+    with django_assert_num_queries(1):
+        registry.get_by_title("A")
+    mocked_monotonic.return_value = 100 + 2 * RuleRegistry.check_interval
+    with django_assert_num_queries(0):
+        registry.get_by_title("A")
+
+
+@pytest.mark.django_db
+def test_rule_registry_unknown_rules(mocker, django_assert_num_queries):
+    mocked_monotonic = mocker.patch("core.caches.time.monotonic", return_value=100)
+    registry = RuleRegistry()
+    with pytest.raises(Rule.DoesNotExist):
+        registry.get_by_title("A")
+    # Created without renewing the version, like by another process in the meantime
+    [rule] = Rule.objects.bulk_create([RuleFactory.build(title="A")])
+
+    with django_assert_num_queries(0):
+        with pytest.raises(Rule.DoesNotExist):
+            registry.get_by_title("A")
+
+    # Unknown rules are looked up once per check interval at most
+    mocked_monotonic.return_value = 100 + RuleRegistry.check_interval
+    with django_assert_num_queries(1):
+        assert registry.get_by_title("A") == rule
+        with pytest.raises(Rule.DoesNotExist):
+            registry.get_by_title("B")
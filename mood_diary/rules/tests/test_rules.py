@@ -1,10 +1,16 @@
+import random
 import time
 from datetime import date, datetime, timedelta
 
 import pytest
 from clients.tests.factories import ClientFactory
 from diaries.models import Activity, ActivityCategory, MoodDiaryEntry
-from diaries.tests.factories import MoodDiaryEntryFactory, MoodDiaryFactory, MoodFactory
+from diaries.tests.factories import (
+    ActivityFactory,
+    MoodDiaryEntryFactory,
+    MoodDiaryFactory,
+    MoodFactory,
+)
 from django.utils import timezone
 from notifications.models import Notification
 from notifications.tests.factories import PushSubscriptionFactory
@@ -25,6 +31,7 @@ from rules.content.rules import (
 )
 from rules.models import RuleClient, RuleTriggeredLog
 from rules.rules import (
+    TIME_BASED_RULES,
     ActivityWithPeakMoodRule,
     BaseRule,
     DailyAverageMoodImprovingRule,
@@ -39,7 +46,7 @@ from rules.rules import (
     RelaxingActivityRule,
     UnsteadyFoodIntakeRule,
 )
-from rules.tests.factories import RuleFactory
+from rules.tests.factories import RuleFactory, RuleTriggeredLogFactory
 
 
 @pytest.mark.django_db
@@ -61,7 +68,7 @@ def test_base_rule():
 
 @pytest.mark.django_db
 def test_concrete_rule(mocker: MockerFixture):
-    mocked_method = mocker.patch("notifications.models.PushSubscription.send_push_notification")
+    mocked_method = mocker.patch("rules.rules.schedule_push_notifications")
 
     class MyRule(BaseRule):
         rule_title = "My Rule"
@@ -131,7 +138,7 @@ def test_concrete_rule(mocker: MockerFixture):
 
 
 @pytest.mark.django_db
-def test_activity_with_peak_mood_rule():
+def test_activity_with_peak_mood_rule(django_capture_on_commit_callbacks):
     client = ClientFactory.create()
     rule_db = RuleFactory.create(title=ACTIVITY_WITH_PEAK_MOOD)
     rule_db.subscribed_clients.add(client)
@@ -144,14 +151,16 @@ def test_activity_with_peak_mood_rule():
     rule = ActivityWithPeakMoodRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
     entries = rule.get_mood_diary_entries()
-    assert entries.first().id == target_entry.id
+    assert entries[0].id == target_entry.id
     assert rule.evaluate_preconditions() is False
 
     time.sleep(0.1)
-    new_target_entry = MoodDiaryEntryFactory.create(mood_diary__client=client, mood__value=3)
+    # Creating a mood with a higher value extends the mood scale once committed
+    with django_capture_on_commit_callbacks(execute=True):
+        new_target_entry = MoodDiaryEntryFactory.create(mood_diary__client=client, mood__value=3)
     new_timestamp = timezone.now()
     rule = ActivityWithPeakMoodRule(client_id=client.id, requested_at=new_timestamp)
-    assert rule.get_mood_diary_entries().first() == new_target_entry
+    assert rule.get_mood_diary_entries()[0].id == new_target_entry.id
     assert not Notification.objects.exists()
     assert not RuleTriggeredLog.objects.exists()
     rule.evaluate()
@@ -181,7 +190,7 @@ def test_relaxing_activity_mood_rule():
     rule = RelaxingActivityRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
     entries = rule.get_mood_diary_entries()
-    assert entries.first().id == target_entry.id
+    assert entries[0].id == target_entry.id
     assert rule.evaluate_preconditions() is False
 
     time.sleep(0.1)
@@ -190,7 +199,7 @@ def test_relaxing_activity_mood_rule():
     )
     new_timestamp = timezone.now()
     rule = RelaxingActivityRule(client_id=client.id, requested_at=new_timestamp)
-    assert rule.get_mood_diary_entries().first() == new_target_entry
+    assert rule.get_mood_diary_entries()[0].id == new_target_entry.id
     assert not Notification.objects.exists()
     assert not RuleTriggeredLog.objects.exists()
     rule.evaluate()
@@ -606,7 +615,7 @@ def test_positive_mood_change_between_activities_rule():
     timestamp = timezone.now()
     rule = PositiveMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # second activity
@@ -621,7 +630,7 @@ def test_positive_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = PositiveMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is False
 
     # third activity (same one as before)
@@ -636,7 +645,7 @@ def test_positive_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = PositiveMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # fourth activity
@@ -651,7 +660,7 @@ def test_positive_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = PositiveMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is True
 
     # Update second activity
@@ -660,7 +669,7 @@ def test_positive_mood_change_between_activities_rule():
     second_activity.save()
     timestamp = timezone.now()
     rule = PositiveMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is True
     assert not Notification.objects.exists()
     assert not RuleTriggeredLog.objects.exists()
@@ -688,7 +697,7 @@ def test_negative_mood_change_between_activities_rule():
     timestamp = timezone.now()
     rule = NegativeMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # second activity
@@ -703,7 +712,7 @@ def test_negative_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = NegativeMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is False
 
     # third activity (same one as before)
@@ -718,7 +727,7 @@ def test_negative_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = NegativeMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # fourth activity
@@ -732,7 +741,7 @@ def test_negative_mood_change_between_activities_rule():
     )
     timestamp = timezone.now()
     rule = NegativeMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is True
 
     # Update second activity
@@ -741,7 +750,7 @@ def test_negative_mood_change_between_activities_rule():
     second_activity.save()
     timestamp = timezone.now()
     rule = NegativeMoodChangeBetweenActivitiesRule(client_id=client.id, requested_at=timestamp)
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is True
     assert not Notification.objects.exists()
     assert not RuleTriggeredLog.objects.exists()
@@ -761,7 +770,7 @@ def test_daily_average_mood_improving_rule(freezer):
     timestamp = timezone.now()
     rule = DailyAverageMoodImprovingRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # Only entries for today, not for yesterday
@@ -775,7 +784,7 @@ def test_daily_average_mood_improving_rule(freezer):
         date="2023-09-30",
         mood__value=1,
     )
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is False
 
     # Entries for today and yesterday, but no improvement
@@ -840,7 +849,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
     timestamp = timezone.now()
     rule = PhysicalActivityPerWeekIncreasingRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 0
+    assert len(rule.get_mood_diary_entries()) == 0
     assert rule.evaluate_preconditions() is False
 
     # Some entries for the current week
@@ -860,7 +869,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
         start_time=datetime(2023, 9, 30, 15, 0),
         end_time=datetime(2023, 9, 30, 16, 0),
     )
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is False
 
     # Next week's sunday
@@ -868,7 +877,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
     timestamp = timezone.now()
     rule = PhysicalActivityPerWeekIncreasingRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 2
+    assert len(rule.get_mood_diary_entries()) == 2
     assert rule.evaluate_preconditions() is False
 
     # Some entries for the next week (same amount as this week)
@@ -888,7 +897,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
         start_time=datetime(2023, 9, 30, 15, 0),
         end_time=datetime(2023, 9, 30, 16, 0),
     )
-    assert rule.get_mood_diary_entries().count() == 4
+    assert len(rule.get_mood_diary_entries()) == 4
     assert rule.evaluate_preconditions() is False
 
     # Increase next week's amount
@@ -900,7 +909,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
         start_time=datetime(2023, 9, 30, 17, 0),
         end_time=datetime(2023, 9, 30, 18, 0),
     )
-    assert rule.get_mood_diary_entries().count() == 5
+    assert len(rule.get_mood_diary_entries()) == 5
     assert rule.evaluate_preconditions() is True
     assert not Notification.objects.exists()
     assert not RuleTriggeredLog.objects.exists()
@@ -914,7 +923,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
     timestamp = timezone.now()
     rule = PhysicalActivityPerWeekIncreasingRule(client_id=client.id, requested_at=timestamp)
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 3
+    assert len(rule.get_mood_diary_entries()) == 3
     assert rule.evaluate_preconditions() is False
 
     # Increase next week's amount again (more than 300 minutes)
@@ -929,7 +938,7 @@ def test_physical_activity_per_week_increasing_rule(freezer):
 
     # Evaluation is False as the maximum amount of minutes is 300
     assert rule.triggering_allowed() is True
-    assert rule.get_mood_diary_entries().count() == 4
+    assert len(rule.get_mood_diary_entries()) == 4
     assert rule.evaluate_preconditions() is False
 
 
@@ -970,3 +979,121 @@ def test_rule_evaluation_two_consecutive_days(freezer):
     rule.evaluate()
     assert Notification.objects.count() == 2
     assert RuleTriggeredLog.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_base_rule_batch():
+    timestamp = timezone.now()
+    RuleFactory.create(title="My Rule")
+
+    class MyRule(BaseRule):
+        rule_title = "My Rule"
+
+    with pytest.raises(NotImplementedError):
+        MyRule.batch_triggering_allowed(None, {1}, timestamp)
+    with pytest.raises(NotImplementedError):
+        MyRule.batch_evaluate_preconditions({1}, timestamp)
+    # No clients left after the subscription check, so nothing else is evaluated
+    assert MyRule.evaluate_batch([1, 2], timestamp) == set()
+
+
+@pytest.mark.django_db
+def test_evaluate_batch(mocker: MockerFixture, django_assert_max_num_queries):
+    mocked_method = mocker.patch("rules.rules.schedule_push_notifications")
+    timestamp = timezone.now()
+    rule_db = RuleFactory.create(title="My Rule")
+
+    class MyRule(BaseRule):
+        rule_title = "My Rule"
+
+        @classmethod
+        def batch_triggering_allowed(cls, rule, client_ids, requested_at, trigger_history=None):
+            return client_ids - cls.batch_triggered_since(
+                rule, client_ids, timestamp, trigger_history=trigger_history
+            )
+
+        @classmethod
+        def batch_evaluate_preconditions(cls, client_ids, requested_at):
+            return client_ids
+
+    subscribed_clients = ClientFactory.create_batch(size=3)
+    for client in subscribed_clients:
+        rule_db.subscribed_clients.add(client)
+        MoodDiaryEntryFactory.create(mood_diary__client=client)
+    client_without_entries = ClientFactory.create()
+    rule_db.subscribed_clients.add(client_without_entries)
+    MoodDiaryFactory.create(client=client_without_entries)
+    unsubscribed_client = ClientFactory.create()
+    MoodDiaryEntryFactory.create(mood_diary__client=unsubscribed_client)
+    all_client_ids = [client.id for client in ClientFactory._meta.model.objects.all()]
+    mocked_signal = mocker.patch("rules.rules.rules_triggered.send")
+
+    triggered = MyRule.evaluate_batch(all_client_ids, timestamp)
+    assert triggered == {client.id for client in subscribed_clients}
+    assert Notification.objects.count() == 3
+    assert RuleTriggeredLog.objects.count() == 3
+    assert mocked_method.call_count == 0
+    # Receivers are notified once for all clients
+    mocked_signal.assert_called_once_with(sender=MyRule, rule=rule_db, client_ids=triggered)
+
+    # Already triggered: the checks need the same number of queries regardless of client count
+    with django_assert_max_num_queries(4):
+        assert MyRule.evaluate_batch(all_client_ids, timestamp) == set()
+    assert RuleTriggeredLog.objects.count() == 3
+
+
+def create_random_entries(clients: list, end: date, seed: int = 42):
+    """Create pseudo-random diary entries covering the 15 days up to the given date."""
+    rng = random.Random(seed)
+    activities = [
+        ActivityFactory.create(category__value="Media", value="PC Gaming"),
+        ActivityFactory.create(category__value="Food", value="Meal"),
+        ActivityFactory.create(category__value="Physical Activity", value=Activity.sports_value),
+        ActivityFactory.create(category__value="Social", value="Meeting friends"),
+    ]
+    moods = {value: MoodFactory.create(value=value) for value in range(-3, 4)}
+    for client in clients:
+        MoodDiaryFactory.create(client=client)
+        mood_bias = rng.choice([-3, -1, 0, 2])
+        days_with_entries = rng.choice([3, 14, 15])
+        for offset in range(days_with_entries):
+            day = end - timedelta(days=offset)
+            for _ in range(rng.randint(1, 4)):
+                start = datetime(day.year, day.month, day.day, rng.randint(0, 20))
+                mood_value = max(-3, min(3, mood_bias + rng.randint(-1, 1)))
+                MoodDiaryEntryFactory.create(
+                    mood_diary__client=client,
+                    date=day,
+                    start_time=start,
+                    end_time=start + timedelta(minutes=rng.choice([5, 20, 45, 90, 200])),
+                    activity=rng.choice(activities),
+                    mood=moods[mood_value],
+                )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("rule_class", TIME_BASED_RULES)
+def test_evaluate_batch_matches_single_evaluation(rule_class, freezer):
+    # Sunday, so that rules restricted to Sundays are evaluated as well
+    freezer.move_to("2023-10-02 06:00:00")
+    timestamp = datetime(2023, 10, 1, 23, 59, 59, 999999)
+    rule_db = RuleFactory.create(title=rule_class.rule_title)
+    clients = ClientFactory.create_batch(size=12)
+    for client in clients:
+        rule_db.subscribed_clients.add(client)
+    create_random_entries(clients, end=timestamp.date())
+    # The rule has recently been triggered for some of the clients
+    for client in clients[:3]:
+        RuleTriggeredLogFactory.create(
+            rule=rule_db, client=client, requested_at=timestamp - timedelta(days=1)
+        )
+
+    expected = set()
+    for client in clients:
+        rule = rule_class(client_id=client.id, requested_at=timestamp)
+        if rule.triggering_allowed() and rule.evaluate_preconditions():
+            expected.add(client.id)
+
+    triggered = rule_class.evaluate_batch([client.id for client in clients], timestamp)
+    assert triggered == expected
+    assert RuleTriggeredLog.objects.filter(requested_at=timestamp).count() == len(expected)
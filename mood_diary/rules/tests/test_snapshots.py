@@ -0,0 +1,123 @@
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from clients.tests.factories import ClientFactory
+from diaries.models import ActivityCategory
+from diaries.tests.factories import MoodDiaryEntryFactory, MoodDiaryFactory
+from django.utils import timezone
+from rules.snapshots import ClientFeatureSnapshot
+
+
+@pytest.mark.django_db
+def test_client_feature_snapshot_load(freezer, django_assert_num_queries):
+    freezer.move_to("2023-10-01 11:00:00")
+    client = ClientFactory.create()
+    # Entries older than 14 days, neither edited last nor preceding the last edited one
+    old_entry, _ = [
+        MoodDiaryEntryFactory.create(
+            mood_diary__client=client,
+            date=day,
+            mood__value=-2,
+            start_time=datetime(2023, 9, 1, 22, 0),
+            end_time=datetime(2023, 9, 1, 23, 0),
+        )
+        for day in [date(2023, 9, 1), date(2023, 9, 17)]
+    ]
+    freezer.move_to("2023-10-01 12:00:00")
+    recent_entries = [
+        MoodDiaryEntryFactory.create(mood_diary__client=client, date=date(2023, 10, 1) - delta)
+        for delta in [timedelta(days=0), timedelta(days=5), timedelta(days=13)]
+    ]
+    MoodDiaryEntryFactory.create(date=date(2023, 10, 1))  # other client
+
+    with django_assert_num_queries(1):
+        snapshot = ClientFeatureSnapshot.load(client.id, timezone.now())
+    assert {entry.id for entry in snapshot.entries} == {entry.id for entry in recent_entries}
+    assert [entry.date for entry in snapshot.entries] == sorted(
+        entry.date for entry in recent_entries
+    )
+    assert snapshot.mood_diary_exists is True
+
+    # The last edited entry is part of the snapshot, even if it is older than 14 days
+    freezer.move_to("2023-10-01 13:00:00")
+    old_entry.details = "edited"
+    old_entry.save()
+    snapshot = ClientFeatureSnapshot.load(client.id, timezone.now())
+    assert len(snapshot.entries) == 4
+    assert snapshot.last_edited_entry.id == old_entry.id
+    assert snapshot.last_edited_entry.mood_value == -2
+    # but it is not covered by date-based filtering
+    assert old_entry.id not in {entry.id for entry in snapshot.filter()}
+
+
+@pytest.mark.django_db
+def test_client_feature_snapshot_last_edited_entry():
+    client = ClientFactory.create()
+    MoodDiaryEntryFactory.create(mood_diary__client=client)
+    time.sleep(0.1)
+    target_entry = MoodDiaryEntryFactory.create(mood_diary__client=client)
+    timestamp = timezone.now()
+    time.sleep(0.1)
+    MoodDiaryEntryFactory.create(mood_diary__client=client)
+    snapshot = ClientFeatureSnapshot.load(client.id, timestamp)
+    assert snapshot.last_edited_entry.id == target_entry.id
+
+
+@pytest.mark.django_db
+def test_client_feature_snapshot_mood_diary_exists():
+    client = ClientFactory.create()
+    snapshot = ClientFeatureSnapshot.load(client.id, timezone.now())
+    assert snapshot.entries == []
+    assert snapshot.last_edited_entry is None
+    assert snapshot.mood_diary_exists is False
+
+    MoodDiaryFactory.create(client=client)
+    snapshot = ClientFeatureSnapshot.load(client.id, timezone.now())
+    assert snapshot.mood_diary_exists is False
+
+
+@pytest.mark.django_db
+def test_client_feature_snapshot_aggregations(freezer):
+    freezer.move_to("2023-10-01")
+    client = ClientFactory.create()
+    MoodDiaryEntryFactory.create(
+        mood_diary__client=client,
+        date=date(2023, 9, 30),
+        mood__value=1,
+        activity__category__value=ActivityCategory.media_usage_value,
+        start_time=datetime(2023, 9, 30, 10, 0),
+        end_time=datetime(2023, 9, 30, 10, 20),
+    )
+    MoodDiaryEntryFactory.create(
+        mood_diary__client=client,
+        date=date(2023, 9, 30),
+        mood__value=2,
+        activity__category__value=ActivityCategory.food_intake_value,
+        start_time=datetime(2023, 9, 30, 12, 0),
+        end_time=datetime(2023, 9, 30, 13, 30),
+    )
+    MoodDiaryEntryFactory.create(
+        mood_diary__client=client,
+        date=date(2023, 10, 1),
+        mood__value=-3,
+        activity__category__value=ActivityCategory.media_usage_value,
+        start_time=datetime(2023, 10, 1, 8, 0),
+        end_time=datetime(2023, 10, 1, 8, 5),
+    )
+    snapshot = ClientFeatureSnapshot.load(client.id, timezone.now())
+    entries_yesterday = snapshot.filter(date_from=date(2023, 9, 30), date_to=date(2023, 9, 30))
+    assert len(entries_yesterday) == 2
+    assert ClientFeatureSnapshot.duration_sum(entries_yesterday) == timedelta(minutes=110)
+    media_entries = snapshot.filter(
+        condition=lambda entry: entry.category_value == ActivityCategory.media_usage_value
+    )
+    assert ClientFeatureSnapshot.duration_sum(media_entries) == timedelta(minutes=25)
+    assert ClientFeatureSnapshot.mood_avg_per_day(snapshot.entries) == {
+        date(2023, 9, 30): 1.5,
+        date(2023, 10, 1): -3,
+    }
+    assert set(ClientFeatureSnapshot.group_by_date(snapshot.entries)) == {
+        date(2023, 9, 30),
+        date(2023, 10, 1),
+    }
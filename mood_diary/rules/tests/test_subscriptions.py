@@ -0,0 +1,51 @@
+import pytest
+from clients.tests.factories import ClientFactory
+from django.utils import timezone
+from rules.content.rules import LOW_MEDIA_USAGE_PER_DAY
+from rules.rules import LowMediaUsagePerDayRule
+from rules.subscriptions import RuleSubscriptions
+from rules.tests.factories import RuleClientFactory, RuleFactory
+
+
+@pytest.mark.django_db
+def test_rule_subscriptions(django_assert_num_queries):
+    rule_a = RuleFactory.create(title="A")
+    rule_b = RuleFactory.create(title="B")
+    client_1, client_2, client_3 = ClientFactory.create_batch(size=3)
+    RuleClientFactory.create(rule=rule_a, client=client_1)
+    RuleClientFactory.create(rule=rule_b, client=client_1)
+    RuleClientFactory.create(rule=rule_a, client=client_2, active=False)
+    RuleClientFactory.create(rule=rule_b, client=client_3)
+
+    with django_assert_num_queries(1):
+        subscriptions = RuleSubscriptions.load([client_1.id, client_2.id])
+
+    assert subscriptions.subscribed_client_ids(rule_a.id) == {client_1.id}
+    assert subscriptions.subscribed_client_ids(rule_b.id) == {client_1.id}
+    assert subscriptions.is_subscribed(rule_a.id, client_1.id) is True
+    assert subscriptions.is_subscribed(rule_a.id, client_2.id) is False
+    assert subscriptions.has_subscriptions(client_1.id) is True
+    assert subscriptions.has_subscriptions(client_2.id) is False
+    with pytest.raises(ValueError):
+        subscriptions.is_subscribed(rule_b.id, client_3.id)
+
+
+@pytest.mark.django_db
+def test_rule_client_subscribed_with_subscriptions(django_assert_num_queries):
+    rule_db = RuleFactory.create(title=LOW_MEDIA_USAGE_PER_DAY)
+    client = ClientFactory.create()
+    other_client = ClientFactory.create()
+    RuleClientFactory.create(rule=rule_db, client=client)
+    subscriptions = RuleSubscriptions.load([client.id, other_client.id])
+    timestamp = timezone.now()
+
+    rule = LowMediaUsagePerDayRule(client.id, timestamp, subscriptions=subscriptions)
+    rule.rule  # load the rule registry
+    with django_assert_num_queries(0):
+        assert rule.client_subscribed() is True
+        assert LowMediaUsagePerDayRule.batch_subscribed(
+            rule_db, {client.id, other_client.id}, subscriptions
+        ) == {client.id}
+    rule = LowMediaUsagePerDayRule(other_client.id, timestamp, subscriptions=subscriptions)
+    with django_assert_num_queries(0):
+        assert rule.client_subscribed() is False
@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from clients.tests.factories import ClientFactory
+from rules.content.rules import UNSTEADY_FOOD_INTAKE
+from rules.rules import UnsteadyFoodIntakeRule
+from rules.tests.factories import RuleFactory, RuleTriggeredLogFactory
+from rules.triggers import RuleTriggerHistory, to_datetime
+
+
+def test_to_datetime():
+    assert to_datetime(date(2023, 10, 1)) == datetime(2023, 10, 1, 0, 0)
+    assert to_datetime(datetime(2023, 10, 1, 12, 0)) == datetime(2023, 10, 1, 12, 0)
+
+
+@pytest.mark.django_db
+def test_rule_trigger_history(django_assert_num_queries):
+    rule_a = RuleFactory.create(title="A")
+    rule_b = RuleFactory.create(title="B")
+    client_1, client_2, client_3 = ClientFactory.create_batch(size=3)
+    RuleTriggeredLogFactory.create(
+        rule=rule_a, client=client_1, requested_at=datetime(2023, 9, 1, 12, 0)
+    )
+    RuleTriggeredLogFactory.create(
+        rule=rule_a, client=client_1, requested_at=datetime(2023, 9, 30, 12, 0)
+    )
+    RuleTriggeredLogFactory.create(
+        rule=rule_b, client=client_2, requested_at=datetime(2023, 9, 29, 0, 0)
+    )
+    RuleTriggeredLogFactory.create(rule=rule_b, client=client_3)
+
+    with django_assert_num_queries(1):
+        history = RuleTriggerHistory.load([client_1.id, client_2.id])
+
+    assert history.last_triggered_at(rule_a.id, client_1.id) == datetime(2023, 9, 30, 12, 0)
+    assert history.last_triggered_at(rule_b.id, client_1.id) is None
+    assert history.triggered_since(rule_a.id, client_1.id, date(2023, 9, 30)) is True
+    assert history.triggered_since(rule_a.id, client_1.id, date(2023, 10, 1)) is False
+    assert history.triggered_since(rule_b.id, client_2.id, date(2023, 9, 29)) is True
+    assert (
+        history.triggered_since(rule_b.id, client_2.id, date(2023, 9, 29), inclusive=False) is False
+    )
+    with pytest.raises(ValueError):
+        history.last_triggered_at(rule_b.id, client_3.id)
+
+    history.record(rule_b.id, client_1.id, datetime(2023, 10, 1, 23, 59))
+    assert history.triggered_since(rule_b.id, client_1.id, date(2023, 10, 1)) is True
+    # Older triggerings do not overwrite newer ones
+    history.record(rule_b.id, client_1.id, datetime(2023, 9, 1, 0, 0))
+    assert history.last_triggered_at(rule_b.id, client_1.id) == datetime(2023, 10, 1, 23, 59)
+
+
+@pytest.mark.django_db
+def test_rule_triggering_allowed_with_trigger_history(django_assert_num_queries):
+    rule_db = RuleFactory.create(title=UNSTEADY_FOOD_INTAKE)
+    client = ClientFactory.create()
+    other_client = ClientFactory.create()
+    timestamp = datetime(2023, 10, 1, 23, 59, 59)
+    RuleTriggeredLogFactory.create(
+        rule=rule_db, client=client, requested_at=timestamp - timedelta(days=2)
+    )
+    history = RuleTriggerHistory.load([client.id, other_client.id])
+
+    rule = UnsteadyFoodIntakeRule(client.id, timestamp, trigger_history=history)
+    rule.rule  # load the rule registry
+    with django_assert_num_queries(0):
+        assert rule.triggering_allowed() is False
+        assert UnsteadyFoodIntakeRule.batch_triggering_allowed(
+            rule_db, {client.id, other_client.id}, timestamp, history
+        ) == {other_client.id}
+    # Same result without the preloaded history
+    assert UnsteadyFoodIntakeRule(client.id, timestamp).triggering_allowed() is False
+    assert UnsteadyFoodIntakeRule.batch_triggering_allowed(
+        rule_db, {client.id, other_client.id}, timestamp
+    ) == {other_client.id}
+
+    rule = UnsteadyFoodIntakeRule(other_client.id, timestamp, trigger_history=history)
+    assert rule.triggering_allowed() is True
+    rule.persist_rule_triggering()
+    assert rule.triggering_allowed() is False
@@ -5,6 +5,7 @@ from clients.tests.factories import ClientFactory
 from django.urls import reverse
 from rules.models import Rule, RuleClient
 from rules.tests.factories import RuleClientFactory, RuleFactory
+from rules.views import RuleListView
 
 
 @pytest.mark.django_db
@@ -18,7 +19,7 @@ def test_rules_list_view(user, create_response):
     # No rule subscribed by client
     response = create_response(user, url)
     assert response.status_code == http.HTTPStatus.OK
-    assert response.context_data["rules"].count() == 0
+    assert len(response.context_data["rules"]) == 0
     assert "rules/rules_list.html" in response.template_name
 
     # One subscribed by client
@@ -26,9 +27,9 @@ def test_rules_list_view(user, create_response):
     response = create_response(user, url)
     assert response.status_code == http.HTTPStatus.OK
     assert rule_a.title in (
-        response_entries := response.context_data["rules"].values_list("rule__title", flat=True)
+        response_entries := [entry.rule.title for entry in response.context_data["rules"]]
     )
-    assert response_entries.count() == 1
+    assert len(response_entries) == 1
     assert "rules/rules_list.html" in response.template_name
 
     # Both subscribed by client
@@ -36,10 +37,10 @@ def test_rules_list_view(user, create_response):
     response = create_response(user, url)
     assert response.status_code == http.HTTPStatus.OK
     assert rule_a.title in (
-        response_entries := response.context_data["rules"].values_list("rule__title", flat=True)
+        response_entries := [entry.rule.title for entry in response.context_data["rules"]]
     )
     assert rule_b.title in response_entries
-    assert response_entries.count() == 2
+    assert len(response_entries) == 2
     assert "rules/rules_list.html" in response.template_name
 
     # Rule A deactivated
@@ -47,8 +48,8 @@ def test_rules_list_view(user, create_response):
     response = create_response(user, url)
     assert response.status_code == http.HTTPStatus.OK
     assert (
-        response_entries := response.context_data["rules"].values_list("rule__title", flat=True)
-    ).count() == 2
+        len(response_entries := [entry.rule.title for entry in response.context_data["rules"]]) == 2
+    )
     assert response_entries[0] == rule_b.title
     assert response_entries[1] == rule_a.title
 
@@ -57,8 +58,8 @@ def test_rules_list_view(user, create_response):
     response = create_response(user, url)
     assert response.status_code == http.HTTPStatus.OK
     assert (
-        response_entries := response.context_data["rules"].values_list("rule__title", flat=True)
-    ).count() == 2
+        len(response_entries := [entry.rule.title for entry in response.context_data["rules"]]) == 2
+    )
     assert response_entries[0] == rule_a.title
     assert response_entries[1] == rule_b.title
 
@@ -109,3 +110,33 @@ def test_rules_update_to_active_view(create_response):
 
     assert response.status_code == http.HTTPStatus.FOUND
     assert RuleClient.objects.get(pk=rule_client.pk).active is False
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("language", ["en", "de"])
+def test_rules_list_view_pagination(user, client, monkeypatch, language):
+    monkeypatch.setattr(RuleListView, "page_size", 2)
+    rules = [RuleFactory.create(title=title) for title in "DBCA"]
+    user.client.subscribed_rules.add(*rules)
+    client.force_login(user)
+
+    response = client.get(reverse("rules:get_all_rules"), HTTP_ACCEPT_LANGUAGE=language)
+    paged_rules = [rule_client.rule for rule_client in response.context_data["rules"]]
+    while next_page_url := response.context_data["next_page_url"]:
+        response = client.get(
+            next_page_url, HTTP_X_REQUESTED_WITH="XMLHttpRequest", HTTP_ACCEPT_LANGUAGE=language
+        )
+        paged_rules += [rule_client.rule for rule_client in response.context_data["rules"]]
+    assert paged_rules == rules
+
+
+@pytest.mark.django_db
+def test_rules_list_view_queries(user, create_response, monkeypatch, assert_constant_queries):
+    user.client.subscribed_rules.add(*[RuleFactory.create(title=title) for title in "ABCDE"])
+    url = reverse("rules:get_all_rules")
+
+    def list_rules(page_size):
+        monkeypatch.setattr(RuleListView, "page_size", page_size)
+        assert len(create_response(user, url).context_data["rules"]) == page_size
+
+    assert_constant_queries(list_rules)
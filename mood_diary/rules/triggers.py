@@ -0,0 +1,129 @@
+from datetime import date, datetime, time
+from typing import Iterable, Optional
+
+from django.db.models import Max
+from django.utils import timezone
+from rules.models import RuleTriggeredLog
+
+
+def to_datetime(value: date) -> datetime:
+    """
+    Convert a date to a timestamp at the very beginning of that day.
+    Timestamps are returned unchanged.
+
+    Parameters
+    ----------
+    value: date
+
+    Returns
+    -------
+    datetime
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+class RuleTriggerHistory:
+    """
+    Timestamp of the last triggering of each rule for each client of a batch of clients.
+    The history is loaded with a single grouped query (backed by the composite index on
+    the rule triggered logs), so that the cooldown of all rules can be checked for many
+    clients without querying the database again.
+    """
+
+    def __init__(
+        self,
+        client_ids: Iterable[int],
+        last_triggered_at: dict[tuple[int, int], timezone.datetime],
+    ):
+        self.client_ids = set(client_ids)
+        self._last_triggered_at = last_triggered_at
+
+    @classmethod
+    def load(cls, client_ids: Iterable[int]) -> "RuleTriggerHistory":
+        """
+        Load the last triggering of each rule for the given clients from the database.
+
+        Parameters
+        ----------
+        client_ids: Iterable[int]
+
+        Returns
+        -------
+        RuleTriggerHistory
+        """
+        client_ids = set(client_ids)
+        last_triggered_at = {
+            (log["rule_id"], log["client_id"]): log["last_requested_at"]
+            for log in RuleTriggeredLog.objects.filter(client_id__in=client_ids)
+            .order_by()
+            .values("rule_id", "client_id")
+            .annotate(last_requested_at=Max("requested_at"))
+        }
+        return cls(client_ids, last_triggered_at)
+
+    def last_triggered_at(self, rule_id: int, client_id: int) -> Optional[timezone.datetime]:
+        """
+        Return the timestamp the rule was last triggered at for the client, if ever.
+
+        Parameters
+        ----------
+        rule_id: int
+        client_id: int
+
+        Returns
+        -------
+        Optional[timezone.datetime]
+
+        Raises
+        ------
+        ValueError
+            If the history of the client has not been loaded.
+        """
+        if client_id not in self.client_ids:
+            raise ValueError(f"Trigger history of client {client_id} has not been loaded.")
+        return self._last_triggered_at.get((rule_id, client_id))
+
+    def triggered_since(
+        self, rule_id: int, client_id: int, since: date, inclusive: bool = True
+    ) -> bool:
+        """
+        Check if the rule has been triggered for the client since the given point in time.
+
+        Parameters
+        ----------
+        rule_id: int
+        client_id: int
+        since: date
+            Date or timestamp, dates are interpreted as the beginning of the day.
+        inclusive: bool
+            Whether a triggering exactly at `since` counts.
+
+        Returns
+        -------
+        bool
+        """
+        last_triggered_at = self.last_triggered_at(rule_id, client_id)
+        if last_triggered_at is None:
+            return False
+        since = to_datetime(since)
+        return last_triggered_at >= since if inclusive else last_triggered_at > since
+
+    def record(self, rule_id: int, client_id: int, requested_at: timezone.datetime):
+        """
+        Record a new triggering of the rule for the client.
+
+        Parameters
+        ----------
+        rule_id: int
+        client_id: int
+        requested_at: timezone.datetime
+
+        Returns
+        -------
+        None
+        """
+        last_triggered_at = self._last_triggered_at.get((rule_id, client_id))
+        if last_triggered_at is None or requested_at > last_triggered_at:
+            self._last_triggered_at[(rule_id, client_id)] = requested_at
@@ -48,3 +48,15 @@ class RuleMessage(NamedTuple):
 
     def __str__(self) -> str:
         return f"Client {self.client_id} - {self.timestamp}"
+
+
+class RuleBatchMessage(NamedTuple):
+    """
+    An object bundling all information passed around
+    during asynchronous batch processing of rules for a cohort of clients."""
+
+    client_ids: list[int]
+    timestamp: timezone.datetime
+
+    def __str__(self) -> str:
+        return f"{len(self.client_ids)} clients - {self.timestamp}"
@@ -1,14 +1,16 @@
-from core.views import AuthenticatedClientRoleMixin
+from core.pagination import KeysetAjaxListView
+from core.views import AuthenticatedClientRoleMixin, ConditionalGetMixin
 from django.db.models import QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views import View
-from el_pagination.views import AjaxListView
+from notifications.unread import unread_notifications_of_request
 from rules.models import RuleClient
+from rules.registry import rule_registry
 
 
-class RuleListView(AuthenticatedClientRoleMixin, AjaxListView):
+class RuleListView(AuthenticatedClientRoleMixin, ConditionalGetMixin, KeysetAjaxListView):
     """
     View for displaying a list of rules.
     """
@@ -17,6 +19,10 @@ class RuleListView(AuthenticatedClientRoleMixin, AjaxListView):
     template_name = "rules/rules_list.html"
     page_template = "rules/rule_list_page.html"
     context_object_name = "rules"
+    # Titles are translated, so the cursor would hold the title in the active language
+    # while the query orders by the untranslated column: page by the rule id instead
+    ordering = ("-active", "rule_id", "id")
+    conditional_dependencies = (unread_notifications_of_request, rule_registry.get_version)
 
     def get_queryset(self) -> QuerySet[RuleClient]:
         """
@@ -26,7 +32,12 @@ class RuleListView(AuthenticatedClientRoleMixin, AjaxListView):
         -------
         QuerySet[RuleClient]
         """
-        return self.model.objects.filter(client_id=self.request.user.client.id).all()
+        return self.model.objects.filter(client_id=self.request.user.client.id).select_related(
+            "rule"
+        )
+
+    def get_conditional_queryset(self) -> QuerySet[RuleClient]:
+        return self.model.objects.filter(client_id=self.request.user.client.id)
 
 
 class RuleClientUpdateToInactiveView(AuthenticatedClientRoleMixin, View):
@@ -0,0 +1,25 @@
+// Ask the service worker to replay mood diary entries queued while offline (see serviceworker.js)
+// whenever a page is loaded online or the connection comes back. This covers browsers without
+// background sync.
+function replayQueuedEntries() {
+    if (!navigator.serviceWorker || !navigator.onLine) {
+        return;
+    }
+    navigator.serviceWorker.ready.then(function (registration) {
+        registration.active.postMessage({
+            type: 'replay-mood-diary-entries',
+            csrfToken: getCookie('csrftoken')
+        });
+    });
+}
+
+window.addEventListener('online', replayQueuedEntries);
+window.addEventListener('load', replayQueuedEntries);
+
+if (navigator.serviceWorker) {
+    navigator.serviceWorker.addEventListener('message', event => {
+        if (event.data && event.data.type === 'mood-diary-entries-synced') {
+            console.log('Queued mood diary entries synced: ', event.data.results);
+        }
+    });
+}
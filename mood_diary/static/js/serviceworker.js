@@ -86,8 +86,164 @@ self.addEventListener('activate', event => {
     }
 });
 
+// Offline queue of mood diary entries.
+// Entries created or updated while offline are stored in IndexedDB and replayed in batches
+// against the sync endpoint once the connection is back (upon background sync where
+// supported, otherwise when a page reports being online). Each write is given an
+// idempotency key when it is queued, so that the server applies it only once, however
+// often it is replayed.
+const entryQueueDatabaseName = 'mood-diary';
+const entryQueueStoreName = 'entry-queue';
+const entrySyncTag = 'sync-mood-diary-entries';
+const entrySyncUrl = '/diaries/mood_diary_entries/sync/';
+const entrySyncBatchSize = 50;
+const entryCreateUrlPattern = /^\/diaries\/mood_diary_entries\/create\/$/;
+const entryUpdateUrlPattern = /^\/diaries\/mood_diary_entries\/(\d+)\/update\/$/;
+const entryFields = ['date', 'end_date', 'start_time', 'end_time', 'activity', 'mood', 'details'];
+
+// Run a callback on the object store of the queue within a transaction,
+// resolving with the result of the request the callback returns once the transaction completes.
+function withEntryQueue(mode, callback) {
+    return new Promise((resolve, reject) => {
+        const openRequest = indexedDB.open(entryQueueDatabaseName, 1);
+        openRequest.onupgradeneeded = () => {
+            openRequest.result.createObjectStore(entryQueueStoreName, {keyPath: 'key'});
+        };
+        openRequest.onerror = () => reject(openRequest.error);
+        openRequest.onsuccess = () => {
+            const database = openRequest.result;
+            const transaction = database.transaction(entryQueueStoreName, mode);
+            const request = callback(transaction.objectStore(entryQueueStoreName));
+            transaction.oncomplete = () => {
+                database.close();
+                resolve(request ? request.result : undefined);
+            };
+            transaction.onerror = () => {
+                database.close();
+                reject(transaction.error);
+            };
+        };
+    });
+}
+
+function getQueuedEntries() {
+    return withEntryQueue('readonly', store => store.getAll())
+        .then(operations => operations.sort((a, b) => a.queuedAt - b.queuedAt));
+}
+
+function removeQueuedEntries(keys) {
+    return withEntryQueue('readwrite', store => {
+        keys.forEach(key => store.delete(key));
+    });
+}
+
+// Store the entry submitted with a create or update form in the queue.
+function queueEntry(request) {
+    const updateMatch = new URL(request.url).pathname.match(entryUpdateUrlPattern);
+    return request.formData().then(formData => {
+        const entry = {};
+        entryFields.filter(field => formData.has(field)).forEach(field => {
+            entry[field] = formData.get(field);
+        });
+        const operation = {
+            key: self.crypto.randomUUID(),
+            id: updateMatch ? Number(updateMatch[1]) : null,
+            entry: entry,
+            csrfToken: formData.get('csrfmiddlewaretoken'),
+            queuedAt: Date.now(),
+        };
+        return withEntryQueue('readwrite', store => store.add(operation));
+    }).then(() => {
+        if ('sync' in self.registration) {
+            return self.registration.sync.register(entrySyncTag).catch(err => {
+                console.error('Registering background sync caused an error: ', err);
+            });
+        }
+    });
+}
+
+// Submit an entry form, queueing the entry if the network is unavailable.
+function submitOrQueueEntry(request) {
+    const queuedRequest = request.clone();
+    return fetch(request).catch(() => {
+        return queueEntry(queuedRequest).then(() => Response.redirect('/offline/?queued=1', 303));
+    });
+}
+
+// Send the queued entries in batches, oldest first. Operations are removed from the queue
+// once the server reports their outcome. The promise is rejected if a batch fails, so that
+// background sync retries later.
+function sendQueuedEntries(operations, csrfToken) {
+    if (!operations.length) {
+        return Promise.resolve();
+    }
+    const batch = operations.slice(0, entrySyncBatchSize);
+    return fetch(entrySyncUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        redirect: 'manual',
+        headers: {
+            'X-CSRFToken': csrfToken || batch[batch.length - 1].csrfToken,
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            operations: batch.map(operation => ({
+                key: operation.key, id: operation.id, entry: operation.entry
+            }))
+        })
+    }).then(response => {
+        if (response.status !== 200) {
+            throw new Error('Syncing mood diary entries failed with status ' + response.status);
+        }
+        return response.json();
+    }).then(data => {
+        return removeQueuedEntries(data.results.map(result => result.key)).then(() => {
+            return self.clients.matchAll().then(clients => {
+                clients.forEach(client => client.postMessage({
+                    type: 'mood-diary-entries-synced', results: data.results
+                }));
+            });
+        });
+    }).then(() => sendQueuedEntries(operations.slice(entrySyncBatchSize), csrfToken));
+}
+
+let replayingEntries = null;
+
+// Replay all queued entries, unless a replay is running already.
+function replayQueuedEntries(csrfToken) {
+    if (!replayingEntries) {
+        replayingEntries = getQueuedEntries()
+            .then(operations => sendQueuedEntries(operations, csrfToken))
+            .finally(() => {
+                replayingEntries = null;
+            });
+    }
+    return replayingEntries;
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === entrySyncTag) {
+        event.waitUntil(replayQueuedEntries());
+    }
+});
+
+// Pages ask for a replay when they are (back) online, passing their current CSRF token.
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'replay-mood-diary-entries') {
+        event.waitUntil(replayQueuedEntries(event.data.csrfToken).catch(err => {
+            console.error('Replaying mood diary entries caused an error: ', err);
+        }));
+    }
+});
+
 // Serve from Cache.
 self.addEventListener("fetch", event => {
+    const url = new URL(event.request.url);
+    if (event.request.method === 'POST' && url.origin === self.location.origin
+        && (entryCreateUrlPattern.test(url.pathname) || entryUpdateUrlPattern.test(url.pathname))) {
+        event.respondWith(submitOrQueueEntry(event.request));
+        return;
+    }
     event.respondWith(
         caches.match(event.request)
             .then(response => {
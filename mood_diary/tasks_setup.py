@@ -25,5 +25,21 @@ celery_beat_schedule = {
         "task": "diaries.tasks.task_time_based_rules_init",
         "schedule": crontab(hour="6", minute="0"),
     },
+    "Retry of push notification deliveries": {
+        "task": "notifications.tasks.task_retry_push_deliveries",
+        "schedule": crontab(minute="*"),
+    },
+    "Pruning of push subscriptions and deliveries": {
+        "task": "notifications.tasks.task_prune_push_subscriptions",
+        "schedule": crontab(hour="4", minute="0"),
+    },
+    "Refresh of client statistics": {
+        "task": "dashboards.tasks.task_refresh_client_statistics",
+        "schedule": crontab(hour="0", minute="5"),
+    },
+    "Pruning of sync keys": {
+        "task": "diaries.tasks.task_prune_sync_keys",
+        "schedule": crontab(hour="4", minute="30"),
+    },
 }
 app.conf.beat_schedule = celery_beat_schedule